@@ -0,0 +1,92 @@
+"""
+Audio dropout under load: the synthetic capture source (48 kHz stereo, 10 ms
+blocks, 30 ms of device buffering) records into the ring on a thread in this
+process ("thread") or in a child process writing to shared memory ("process"),
+while --load-threads threads keep this process's GIL busy (sorting, JSON).
+A block the recorder picks up later than the device buffer allows is lost.
+Also times get_last_audio_wav_bytes(30) while the load is running.
+
+Run from the repository root:
+    python -m benchmarks.bench_audio_dropout --seconds 10
+Exit status 1 if process mode drops more than --max-dropout-pct.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+
+def _load(stop: threading.Event) -> None:
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(200_000)]
+    doc = {str(i): [i, str(i), i * 0.5] for i in range(20_000)}
+    while not stop.is_set():
+        sorted(data)
+        json.dumps(doc)
+
+
+def _run(mode: str, seconds: float, load_threads: int) -> Dict[str, float]:
+    # Imported here: the recorder process re-imports this module and needs no config
+    from services.audio_service import AudioService
+
+    os.environ["AUDIO_RECORDER_MODE"] = mode
+    os.environ["AUDIO_SOURCE"] = "synthetic"
+    service = AudioService()
+    service.ensure_recorder_running()
+    recorder = service._recorder
+    if mode == "process" and not recorder.wait_ready():
+        raise RuntimeError("recorder process did not start")
+    time.sleep(1.0)  # fill some audio before loading the process
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=_load, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for w in workers:
+        w.start()
+    read_ms: List[float] = []
+    deadline = time.perf_counter() + seconds
+    wav_len = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        wav = service.get_last_audio_wav_bytes(30)
+        read_ms.append((time.perf_counter() - t0) * 1000)
+        wav_len = len(wav or b"")
+        time.sleep(0.5)
+    stop.set()
+    for w in workers:
+        w.join()
+    stats = service.recorder_stats()
+    service.shutdown()
+    stats["read_ms"] = round(statistics.median(read_ms), 2) if read_ms else 0.0
+    stats["wav_kb"] = wav_len // 1024
+    return stats
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--seconds", type=float, default=10.0, help="load time per mode")
+    p.add_argument("--load-threads", type=int, default=4)
+    p.add_argument("--max-dropout-pct", type=float, default=0.5, help="process-mode failure threshold")
+    args = p.parse_args()
+
+    print(f"{args.seconds:.0f}s per mode, {args.load_threads} GIL-bound load threads")
+    print(f"{'mode':8} {'blocks':>7} {'dropped':>8} {'dropout %':>10} {'max late ms':>12} {'read ms':>8} {'wav KB':>7}")
+    results = {}
+    for mode in ("thread", "process"):
+        s = _run(mode, args.seconds, args.load_threads)
+        results[mode] = s
+        print(
+            f"{mode:8} {s['delivered_blocks']:7d} {s['dropped_blocks']:8d} {s['dropout_pct']:10.3f} "
+            f"{s['max_late_ms']:12.2f} {s['read_ms']:8.2f} {s['wav_kb']:7d}"
+        )
+    if results["process"]["dropout_pct"] > args.max_dropout_pct:
+        print(f"FAIL: process-mode dropout above {args.max_dropout_pct}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Disk audio history: writes --minutes of synthetic 48 kHz stereo PCM (10 ms
+blocks, as fast as possible) through HistoryWriter, reporting process RSS as
+the history grows (it should stay flat, unlike an in-RAM ring of the same
+horizon), disk use with and without compression, then the time to read a
+30 s window at several distances in the past. --max-mb exercises retention
+by size.
+
+Run from the repository root:
+    python -m benchmarks.bench_audio_history --minutes 30
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from services.audio_capture import SyntheticSource
+from services.audio_history import HistoryReader, HistoryWriter
+from services.audio_processing import wav_header
+
+SAMPLERATE, CHANNELS, BLOCK = 48000, 2, 480
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil  # type: ignore[import-not-found]
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        import os
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _run(minutes: float, level: int, max_mb: int, root: Path) -> None:
+    src = SyntheticSource(SAMPLERATE, CHANNELS, BLOCK)
+    blocks = src._blocks
+    writer = HistoryWriter(str(root), segment_sec=10, compress_level=level, max_age_sec=0, max_bytes=max_mb * 2**20)
+    writer.open(SAMPLERATE, CHANNELS)
+    reader = HistoryReader(str(root))
+    total_blocks = int(minutes * 60 * SAMPLERATE / BLOCK)
+    report_every = total_blocks // 5
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    print(f"  zlib {level or 'off'}: RSS {rss0:.0f} MB at start")
+    for i in range(total_blocks):
+        writer.write(blocks[i % len(blocks)])
+        if (i + 1) % report_every == 0:
+            print(f"    {(i + 1) * BLOCK / SAMPLERATE / 60:5.1f} min written  RSS {_rss_mb():6.1f} MB")
+    elapsed = time.perf_counter() - t0
+    writer._sealer.submit(lambda: None).result()  # let pending seals finish
+    disk = sum(p.stat().st_size for p in root.glob("seg_*")) / 2**20
+    raw = total_blocks * BLOCK * CHANNELS * 2 / 2**20
+    print(
+        f"    {elapsed / (minutes * 60) * 100:.2f}% of real time spent writing, "
+        f"disk {disk:.0f} MB (raw {raw:.0f} MB), kept {reader.seconds_available / 60:.1f} min, "
+        f"an in-RAM ring of the same span: {reader.seconds_available * SAMPLERATE * CHANNELS * 2 / 2**20:.0f} MB"
+    )
+    for ago in (60, 600, 1200, 1800, 3600):
+        if ago > reader.seconds_available:
+            continue
+        times: List[float] = []
+        for _ in range(5):
+            t = time.perf_counter()
+            wav = reader.read_ago(ago, ago - 30, prefix=lambda n: wav_header(n, SAMPLERATE, CHANNELS))
+            times.append((time.perf_counter() - t) * 1000)
+        print(f"    30 s window {ago // 60:3d} min ago: {statistics.median(times):6.2f} ms, {len(wav) / 2**20:.1f} MB WAV")
+    reader.close()
+    writer.close()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--minutes", type=float, default=30.0)
+    p.add_argument("--max-mb", type=int, default=0, help="retention by size (0 = keep all)")
+    p.add_argument("--dir", default="", help="history directory (default: a temp dir, removed afterwards)")
+    args = p.parse_args()
+
+    base = Path(args.dir or tempfile.mkdtemp(prefix="audio_history_"))
+    print(f"{args.minutes:.0f} min of 48 kHz stereo into {base}")
+    try:
+        for level in (0, 1):
+            _run(args.minutes, level, args.max_mb, base / f"zlib{level}")
+    finally:
+        if not args.dir:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
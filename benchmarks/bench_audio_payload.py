@@ -0,0 +1,76 @@
+"""
+Audio upload reduction on synthetic tones: size, encode time and a spectral sanity check,
+plus voice-activity trimming speed on a full 40 s ring.
+
+Run from the repository root:
+    python -m benchmarks.bench_audio_payload
+"""
+import io
+import time
+import wave
+
+import numpy as np
+
+from services.audio_processing import prepare_audio_payload, trim_silence
+
+SECONDS = 30.0
+TONES_HZ = (440.0, 1000.0, 3000.0)
+ALIAS_HZ = 12000.0  # above the 8 kHz Nyquist of 16 kHz output; must be filtered out
+
+
+def _stereo_tones(sr: int) -> np.ndarray:
+    t = np.arange(int(SECONDS * sr)) / sr
+    left = sum(np.sin(2 * np.pi * f * t) for f in TONES_HZ) / (len(TONES_HZ) + 1)
+    right = left + np.sin(2 * np.pi * ALIAS_HZ * t) / (len(TONES_HZ) + 1)
+    return (np.stack([left, right], axis=1) * 32767).astype(np.int16)
+
+
+def _spectrum(data: bytes):
+    with wave.open(io.BytesIO(data)) as wf:
+        sr = wf.getframerate()
+        x = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32)
+    return np.fft.rfftfreq(x.size, 1 / sr), np.abs(np.fft.rfft(x))
+
+
+def _bench_vad(sr: int = 48000, seconds: float = 40.0) -> None:
+    rng = np.random.default_rng(0)
+    signal = (rng.standard_normal((int(seconds * sr), 2)) * 1e-3).astype(np.float32)
+    speech = [(5.0, 8.0), (12.0, 15.0), (15.3, 20.0)]
+    for a, b in speech:
+        t = np.arange(int((b - a) * sr)) / sr
+        signal[int(a * sr): int(a * sr) + t.size] += 0.3 * np.sin(2 * np.pi * 300 * t)[:, None]
+    trim_silence(signal, sr)  # warm up
+    t0 = time.perf_counter()
+    trimmed = trim_silence(signal, sr)
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"vad {seconds:.0f}s @ {sr} Hz stereo -> {trimmed.shape[0] / sr:.1f}s kept in {elapsed:.1f} ms")
+
+
+def main() -> None:
+    for sr in (44100, 48000):
+        pcm = _stereo_tones(sr)
+        for fmt in ("wav", "flac", "opus"):
+            t0 = time.perf_counter()
+            payload = prepare_audio_payload(pcm, sr, mono=True, target_samplerate=16000, fmt=fmt)
+            elapsed = (time.perf_counter() - t0) * 1000
+            ratio = payload.bytes_before / payload.bytes_after
+            line = (
+                f"sr={sr} {fmt:5} -> {payload.mime_type:10} {payload.bytes_before:>9} -> "
+                f"{payload.bytes_after:>8} bytes (x{ratio:.1f}) in {elapsed:.1f} ms"
+            )
+            if payload.mime_type == "audio/wav":
+                freqs, mag = _spectrum(payload.data)
+                peaks = sorted(float(f) for f in freqs[np.argsort(mag)[-len(TONES_HZ):]])
+                assert all(abs(p - f) < 1.0 for p, f in zip(peaks, TONES_HZ)), peaks
+                # 12 kHz would fold to 4 kHz without the anti-alias cut
+                alias = mag[np.abs(freqs - (16000 - ALIAS_HZ)) < 5].max()
+                assert alias < mag.max() * 0.01, alias
+                # stereo -> mono halves, sr -> 16 kHz divides by sr / 16000
+                assert ratio >= 2 * sr / 16000 * 0.99, ratio
+                line += f" peaks={[round(p) for p in peaks]}"
+            print(line)
+    _bench_vad()
+
+
+if __name__ == "__main__":
+    main()
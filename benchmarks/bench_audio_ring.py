@@ -0,0 +1,106 @@
+"""
+Microbenchmark: PcmRing vs the previous deque-of-bytes ring. Writes are timed
+with bytes blocks (synthetic source) and with array.array blocks (what
+miniaudio hands the capture generator), on a ring that already wrapped once.
+
+Run from the repository root:
+    python -m benchmarks.bench_audio_ring
+"""
+import array
+import collections
+import threading
+import time
+from typing import Deque
+
+import numpy as np
+
+from services.audio_ring import PcmRing
+
+SAMPLERATE = 48000
+CHANNELS = 2
+BUFFER_SECONDS = 40.0
+READ_SECONDS = 30.0
+BLOCK_FRAMES = 480  # 10 ms WASAPI period
+
+
+class _DequeRing:
+    """The previous _RingRecorder storage, kept here for comparison."""
+
+    def __init__(self, buffer_seconds: float, sr: int, channels: int) -> None:
+        self._lock = threading.Lock()
+        self._pcm: Deque[bytes] = collections.deque()
+        self._total_bytes = 0
+        self._max_bytes = int(buffer_seconds * sr * channels * 2)
+        self._sr = sr
+        self._channels = channels
+
+    def write(self, data) -> None:
+        with self._lock:
+            self._pcm.append(bytes(data))
+            self._total_bytes += len(data)
+            while self._total_bytes > self._max_bytes and self._pcm:
+                dropped = self._pcm.popleft()
+                self._total_bytes -= len(dropped)
+
+    def read_last(self, seconds: float) -> bytes:
+        with self._lock:
+            needed = int(seconds * self._sr * self._channels * 2)
+            data = b"".join(self._pcm)
+            if len(data) > needed > 0:
+                data = data[-needed:]
+            return data
+
+
+def _fill(write, blocks: list) -> float:
+    t0 = time.perf_counter()
+    for b in blocks:
+        write(b)
+    return (time.perf_counter() - t0) / len(blocks)
+
+
+def _read(read, repeat: int = 20) -> float:
+    read()  # warm up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        read()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    n_blocks = int(BUFFER_SECONDS * 1.5 * SAMPLERATE / BLOCK_FRAMES)
+    blocks = [
+        rng.integers(-32768, 32767, BLOCK_FRAMES * CHANNELS, dtype=np.int16).tobytes()
+        for _ in range(n_blocks)
+    ]
+    arrays = [array.array("h", b) for b in blocks]
+
+    legacy = _DequeRing(BUFFER_SECONDS, SAMPLERATE, CHANNELS)
+    ring = PcmRing(int(BUFFER_SECONDS * SAMPLERATE), CHANNELS)
+
+    _fill(legacy.write, blocks)  # warm up: both rings full
+    _fill(ring.write, blocks)
+    legacy_write = _fill(legacy.write, blocks)
+    ring_write = _fill(ring.write, blocks)
+    legacy_write_array = _fill(legacy.write, arrays)
+    ring_write_array = _fill(ring.write, arrays)
+    _fill(legacy.write, blocks)  # same content again for the read comparison
+    _fill(ring.write, blocks)
+
+    read_frames = int(READ_SECONDS * SAMPLERATE)
+    legacy_read = _read(lambda: legacy.read_last(READ_SECONDS))
+    ring_read = _read(lambda: ring.read_last(read_frames))
+
+    assert legacy.read_last(READ_SECONDS) == ring.read_last(read_frames).tobytes()
+
+    print(f"sr={SAMPLERATE} ch={CHANNELS} buffer={BUFFER_SECONDS}s read={READ_SECONDS}s block={BLOCK_FRAMES} frames")
+    print(f"{'':10}{'write (bytes)':>16}{'write (array)':>16}{'read_last':>12}")
+    for name, write_b, write_a, read in (
+        ("deque", legacy_write, legacy_write_array, legacy_read),
+        ("PcmRing", ring_write, ring_write_array, ring_read),
+    ):
+        print(f"{name:10}{write_b * 1e6:>13.2f} us{write_a * 1e6:>13.2f} us{read * 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
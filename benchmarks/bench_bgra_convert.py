@@ -0,0 +1,88 @@
+"""
+BGRA grab -> PIL conversion: previous path (mss .rgb + Image.frombytes + mss.tools.to_png)
+vs bgra_to_image (one Image.frombuffer "BGRX" decode, PNG written from that image).
+
+Run from the repository root:
+    python -m benchmarks.bench_bgra_convert
+"""
+import io
+import statistics
+import struct
+import time
+import zlib
+from typing import Callable
+
+from PIL import Image
+
+from benchmarks.fakes import FakeMss
+from services.screenshot import bgra_to_image
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4K": (3840, 2160),
+}
+REPEAT = 5
+
+
+def _mss_to_png(data: bytes, size: tuple, level: int = 6) -> bytes:
+    """mss.tools.to_png, reproduced so the benchmark does not need mss installed."""
+    width, height = size
+    line = width * 3
+    png_filter = struct.pack(">B", 0)
+    scanlines = b"".join([png_filter + data[y * line: y * line + line] for y in range(height)])
+    magic = struct.pack(">8B", 137, 80, 78, 71, 13, 10, 26, 10)
+    ihdr = [b"", b"IHDR", b"", b""]
+    ihdr[2] = struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0)
+    ihdr[3] = struct.pack(">I", zlib.crc32(b"".join(ihdr[1:3])) & 0xFFFFFFFF)
+    ihdr[0] = struct.pack(">I", len(ihdr[2]))
+    idat = [b"", b"IDAT", zlib.compress(scanlines, level), b""]
+    idat[3] = struct.pack(">I", zlib.crc32(b"".join(idat[1:3])) & 0xFFFFFFFF)
+    idat[0] = struct.pack(">I", len(idat[2]))
+    iend = [b"", b"IEND", b"", b""]
+    iend[3] = struct.pack(">I", zlib.crc32(iend[1]) & 0xFFFFFFFF)
+    iend[0] = struct.pack(">I", len(iend[2]))
+    return magic + b"".join(ihdr + idat + iend)
+
+
+def _median_ms(fn: Callable[[], object]) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    print(f"{'':7}{'old convert':>13}{'new convert':>13}{'old +png':>11}{'new +png':>11}")
+    for name, (w, h) in RESOLUTIONS.items():
+        monitor = {"left": 0, "top": 0, "width": w, "height": h}
+        sct = FakeMss(monitors=[monitor], open_cost_ms=0)
+
+        def old_convert():
+            shot = sct.grab(monitor)
+            return Image.frombytes("RGB", shot.size, shot.rgb)
+
+        def new_convert():
+            return bgra_to_image(sct.grab(monitor))
+
+        def old_full():
+            shot = sct.grab(monitor)
+            _mss_to_png(shot.rgb, shot.size)
+            return Image.frombytes("RGB", shot.size, shot.rgb)
+
+        def new_full():
+            img = bgra_to_image(sct.grab(monitor))
+            img.save(io.BytesIO(), format="PNG")
+            return img
+
+        assert old_convert().tobytes() == new_convert().tobytes()
+        print(
+            f"{name:7}{_median_ms(old_convert):>10.1f} ms{_median_ms(new_convert):>10.1f} ms"
+            f"{_median_ms(old_full):>8.1f} ms{_median_ms(new_full):>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Grab latency per call: a fresh mss handle per shot (previous behaviour) vs the
+persistent CaptureEngine, directly and through the capture thread.
+Uses benchmarks.fakes.FakeMss, so no display is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_capture
+"""
+import statistics
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.fakes import FakeMss
+from services.screenshot import CaptureEngine, ScreenshotService
+
+REPEAT = 50
+OPEN_COST_MS = 3.0
+
+
+def _factory() -> FakeMss:
+    return FakeMss(open_cost_ms=OPEN_COST_MS)
+
+
+def _measure(fn: Callable[[], object]) -> list:
+    fn()
+    samples = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _cold() -> None:
+    engine = CaptureEngine(_factory)
+    engine.grab(1)
+    engine.close()
+
+
+def main() -> None:
+    warm_engine = CaptureEngine(_factory)
+    with tempfile.TemporaryDirectory() as tmp:
+        service = ScreenshotService(output_dir=tmp, backend_factory=_factory)
+        results = {
+            "cold (new handle per shot)": _measure(_cold),
+            "warm (persistent engine)": _measure(lambda: warm_engine.grab(1)),
+            "warm via capture thread": _measure(lambda: service.grab_async(1).result()),
+        }
+        service.shutdown()
+
+    print(f"1920x1080 fake backend, open cost {OPEN_COST_MS} ms, {REPEAT} grabs")
+    for name, samples in results.items():
+        print(f"{name:30} median {statistics.median(samples):6.2f} ms   max {max(samples):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
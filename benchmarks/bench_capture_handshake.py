@@ -0,0 +1,94 @@
+"""
+Hotkey -> grab latency of MainWindow's capture handshake per CAPTURE_HIDE_MODE,
+plus the longest UI event-loop stall while a capture is in flight (a 1 ms
+heartbeat timer; the old hide + sleep(0.15) stalled it for the full 150 ms).
+
+Modes: "delay" (fixed timeout), "wait" (poll until the window is gone) and
+"skip" ("auto" with the window excluded from capture, so it is never hidden).
+Fake mss frames and the fake model backend; no screen or network needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_capture_handshake --captures 20
+Headless: set QT_QPA_PLATFORM=offscreen.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+
+def _pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--captures", type=int, default=20, help="captures per mode")
+    p.add_argument("--size", default="1920x1080", help="synthetic screen size")
+    args = p.parse_args()
+
+    # Must be set before config is imported
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from benchmarks.fakes import FakeMss
+    from config import CAPTURE_HIDE_TIMEOUT_MS
+    from services.screenshot import ScreenshotService
+    from ui.main_window import MainWindow
+
+    app = QApplication(sys.argv[:1])
+    width, height = (int(v) for v in args.size.split("x"))
+    monitor = {"left": 0, "top": 0, "width": width, "height": height}
+
+    window = MainWindow()
+    window.screenshot_service = ScreenshotService(
+        backend_factory=lambda: FakeMss([monitor], frame_variants=4), save_debug=False
+    )
+    window.show()
+    app.processEvents()
+
+    state = {"last_tick": time.perf_counter(), "max_gap": 0.0}
+
+    def tick() -> None:
+        now = time.perf_counter()
+        state["max_gap"] = max(state["max_gap"], now - state["last_tick"])
+        state["last_tick"] = now
+
+    heartbeat = QTimer()
+    heartbeat.setInterval(1)
+    heartbeat.timeout.connect(tick)
+    heartbeat.start()
+
+    print(f"{args.captures} captures per mode, {width}x{height}, hide timeout {CAPTURE_HIDE_TIMEOUT_MS} ms")
+    print(f"{'mode':8} {'p50 ms':>8} {'p95 ms':>8} {'max UI stall ms':>16}")
+    results: Dict[str, List[float]] = {}
+    for label, mode, excluded in (("delay", "delay", False), ("wait", "wait", False), ("skip", "auto", True)):
+        window._capture_mode = mode
+        window._excluded_from_capture = excluded
+        latencies: List[float] = []
+        stalls: List[float] = []
+        for _ in range(args.captures):
+            window.image_buffer.clear()
+            window.last_hotkey_to_grab_ms = None
+            state["last_tick"], state["max_gap"] = time.perf_counter(), 0.0
+            window.hotkey_listener.add_to_stack_signal.emit(time.perf_counter())
+            while window.last_hotkey_to_grab_ms is None or window._pending_captures:
+                app.processEvents()
+                time.sleep(0.0005)
+            latencies.append(window.last_hotkey_to_grab_ms)
+            stalls.append(state["max_gap"] * 1000)
+        results[label] = latencies
+        print(f"{label:8} {statistics.median(latencies):8.1f} {_pct(latencies, 0.95):8.1f} {max(stalls):16.1f}")
+
+    heartbeat.stop()
+    window.screenshot_service.shutdown()
+    window.gemini_handler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Grab + encode cost and upload size per capture mode, on a fake two-monitor
+desktop (2560x1440 primary, 1920x1080 to its right; fake mss frames):
+
+  primary  whole primary monitor
+  cursor   monitor under the cursor (here: the secondary)
+  all      both monitors stitched
+  region   fixed 1280x800 region
+  window   a 1400x900 foreground window
+
+Run from the repository root:
+    python -m benchmarks.bench_capture_modes --repeat 10
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Callable, List, Tuple
+
+from benchmarks.fakes import FakeMss
+from services.image_encoder import ImageEncoder, estimate_image_tokens
+from services.screenshot import CaptureTarget, ScreenshotService, resolve_region
+
+MONITORS = [
+    {"left": 0, "top": 0, "width": 2560, "height": 1440},
+    {"left": 2560, "top": 0, "width": 1920, "height": 1080},
+]
+TARGETS = [
+    CaptureTarget("primary"),
+    CaptureTarget("cursor", cursor=(3000, 500)),
+    CaptureTarget("all"),
+    CaptureTarget("region", cursor=(3000, 500), region=(200, 150, 1480, 950)),
+    CaptureTarget("window", cursor=(3000, 500), window=(400, 200, 1800, 1100)),
+]
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    result = fn()
+    times: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--max-edge", type=int, default=1920, help="encoder downscale limit (IMAGE_MAX_EDGE)")
+    args = p.parse_args()
+
+    service = ScreenshotService(backend_factory=lambda: FakeMss(MONITORS, open_cost_ms=0), save_debug=False)
+    encoder = ImageEncoder(max_edge=args.max_edge, fmt="jpeg", quality=85, workers=1)
+    monitors = FakeMss(MONITORS, open_cost_ms=0).monitors
+    print(f"{args.repeat} runs per mode, encoder max edge {args.max_edge}, JPEG q85")
+    print(f"{'mode':8} {'region':>10} {'Mpx':>5} {'grab ms':>8} {'encode ms':>10} {'upload KB':>10} {'tokens':>7}")
+    for target in TARGETS:
+        region = resolve_region(target, monitors)
+        grab_ms, (_, img) = _median_ms(lambda: service.take_screenshot(target=target), args.repeat)
+        encode_ms, encoded = _median_ms(lambda: encoder.encode(img), args.repeat)
+        print(
+            f"{target.mode:8} {region['width']:>5}x{region['height']:<4} {img.width * img.height / 1e6:5.2f} "
+            f"{grab_ms:8.1f} {encode_ms:10.1f} {len(encoded.data) / 1024:10.0f} "
+            f"{estimate_image_tokens(*encoded.size):7d}"
+        )
+    encoder.shutdown()
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
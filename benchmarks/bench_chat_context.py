@@ -0,0 +1,67 @@
+"""
+History size over a long session (screenshots every few turns, text follow-ups),
+with and without ChatContext, through FakeChatSession. Request tokens per turn
+is what drives model latency; it should stay flat with the context manager.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_context
+"""
+import io
+import time
+
+from PIL import Image
+
+from benchmarks.fakes import synthetic_bgra
+from services.chat_context import ChatContext, transcript, turn_tokens
+from services.fake_chat import FakeChatSession
+
+TURNS = 40
+SCREENSHOT_EVERY = 3
+BUDGET = 12000
+
+
+def _screenshot_part(seed: int) -> dict:
+    img = Image.frombuffer("RGB", (1920, 1080), synthetic_bgra(1920, 1080, seed), "raw", "BGRX", 0, 1)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return {"mime_type": "image/jpeg", "data": buf.getvalue()}
+
+
+def _run(context: ChatContext = None) -> list:
+    session = FakeChatSession(0, 0, 20, reply="Answer with some detail about the code on screen. " * 40)
+    shots = [_screenshot_part(seed) for seed in range(3)]
+    rows = []
+    for turn in range(TURNS):
+        if turn % SCREENSHOT_EVERY == 0:
+            content = [shots[turn % 3], shots[(turn + 1) % 3], "Analyze these screenshots and provide a solution."]
+        else:
+            content = f"Follow-up question {turn}: why does line {turn * 7} fail?"
+        parts = content if isinstance(content, list) else [content]
+        request_tokens = sum(turn_tokens(t) for t in session.history) + turn_tokens({"parts": parts})
+        session.send_message(content)
+        t0 = time.perf_counter()
+        if context is not None:
+            context.maintain(session)
+        rows.append((turn, request_tokens, (time.perf_counter() - t0) * 1000))
+    return rows
+
+
+def main() -> None:
+    summarize = lambda text: transcript([{"role": "model", "parts": [text[-600:]]}])
+    runs = {
+        "unbounded": _run(),
+        "placeholders+fold": _run(ChatContext(BUDGET, 1, 4, summarize)),
+        "placeholders+drop": _run(ChatContext(BUDGET, 1, 4, None)),
+    }
+    print(f"{TURNS} turns, 2 screenshots every {SCREENSHOT_EVERY} turns, budget {BUDGET} tokens")
+    print(f"{'turn':>5} " + " ".join(f"{name:>20}" for name in runs))
+    for i in range(0, TURNS, 5):
+        print(f"{i:5d} " + " ".join(f"{runs[name][i][1]:20d}" for name in runs))
+    for name, rows in runs.items():
+        tokens = [r[1] for r in rows]
+        worst = max(r[2] for r in rows)
+        print(f"{name:20} request tokens: last {tokens[-1]:6d}  max {max(tokens):6d}   maintain worst {worst:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+CPU and memory cost of the background FrameSampler per screen size and rate,
+against fake mss frames whose content changes every --change-every samples.
+Reports process CPU %, sampler per-sample cost, kept/skipped frames and the
+ring's memory, plus the ring size when full (the ceiling for long sessions).
+
+Run from the repository root:
+    python -m benchmarks.bench_frame_sampler --seconds 10
+"""
+import argparse
+import time
+from typing import List, Optional
+
+from benchmarks.fakes import FakeMss, FakeScreenShot, synthetic_bgra
+from services.frame_sampler import FrameSampler
+from services.screenshot import ScreenshotService
+
+SIZES = [(1920, 1080), (3840, 2160)]
+RATES = [0.5, 1.0, 2.0]
+
+
+class ChangingMss(FakeMss):
+    """FakeMss whose screen content changes every `change_every` grabs."""
+
+    def __init__(self, monitors: Optional[List[dict]] = None, change_every: int = 3) -> None:
+        super().__init__(monitors, open_cost_ms=0, frame_variants=8)
+        self._change_every = max(1, change_every)
+
+    def grab(self, monitor: dict) -> FakeScreenShot:
+        seed = (self._grabs // self._change_every) % self._frame_variants
+        self._grabs += 1
+        return FakeScreenShot(bytearray(synthetic_bgra(monitor["width"], monitor["height"], seed)), monitor)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--seconds", type=float, default=10.0, help="sampling time per case")
+    p.add_argument("--change-every", type=int, default=3, help="samples between screen changes")
+    p.add_argument("--max-edge", type=int, default=1280)
+    p.add_argument("--ring", type=int, default=30)
+    args = p.parse_args()
+
+    print(
+        f"{args.seconds:.0f}s per case, screen changes every {args.change_every} samples, "
+        f"max edge {args.max_edge}, ring {args.ring}"
+    )
+    print(
+        f"{'screen':10} {'fps':>4} {'proc CPU %':>10} {'grab ms':>8} {'cpu ms':>7} "
+        f"{'kept':>5} {'skipped':>7} {'ring MB':>8} {'full ring MB':>12}"
+    )
+    for w, h in SIZES:
+        monitor = {"left": 0, "top": 0, "width": w, "height": h}
+        synthetic_bgra(w, h, 0)  # build the fake frames outside the measurement
+        for rate in RATES:
+            service = ScreenshotService(backend_factory=lambda: ChangingMss([monitor], args.change_every),
+                                        save_debug=False)
+            service.prewarm().result()
+            sampler = FrameSampler(service, fps=rate, max_edge=args.max_edge, ring_size=args.ring)
+            cpu0, t0 = time.process_time(), time.perf_counter()
+            sampler.start()
+            time.sleep(args.seconds)
+            sampler.stop()
+            cpu_pct = (time.process_time() - cpu0) / (time.perf_counter() - t0) * 100
+            s = sampler.stats()
+            per_frame = s["ring_mb"] / s["ring_frames"] if s["ring_frames"] else 0.0
+            print(
+                f"{w}x{h:<5} {rate:4.1f} {cpu_pct:10.2f} {s['grab_ms']:8.1f} {s['cpu_ms']:7.1f} "
+                f"{s['kept']:5d} {s['skipped']:7d} {s['ring_mb']:8.2f} {per_frame * args.ring:12.1f}"
+            )
+            service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
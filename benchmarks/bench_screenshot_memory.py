@@ -0,0 +1,135 @@
+"""
+Peak memory of buffering N synthetic 4K screenshots and sending them, per
+buffer variant, each in a fresh subprocess (peak RSS is per process):
+
+  legacy   decoded PIL images in a list; send copies the list and every image
+  compact  ScreenshotBuffer with background zlib compaction, frames sent as-is
+  capped   compact, plus a memory ceiling (--cap-mb) with oldest-first eviction
+
+Frames arrive every --interval-ms (hotkey cadence); 0 adds them back to back,
+so compaction lags and more frames are briefly held decoded.
+
+"Send" runs the request preparation (frame diff + encoder pool) the way the
+request thread does. Peak RSS comes from resource (POSIX) or psutil (Windows).
+
+Run from the repository root:
+    python -m benchmarks.bench_screenshot_memory --frames 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+VARIANTS = ("legacy", "compact", "capped")
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / 2**20
+
+
+def _frames(count: int, width: int, height: int) -> Any:
+    from PIL import Image
+    from benchmarks.fakes import synthetic_bgra
+
+    for i in range(count):
+        # Uncached: keep generated frames from piling up in the lru_cache
+        raw = synthetic_bgra.__wrapped__(width, height, i)
+        yield Image.frombytes("RGB", (width, height), raw, "raw", "BGRX")
+
+
+def run_variant(variant: str, count: int, width: int, height: int, cap_mb: int, interval_ms: int) -> Dict[str, Any]:
+    os.environ.update(FRAME_DIFF="1", IMAGE_ENCODE_WORKERS="2")
+    from services.ai_handler import GeminiHandler
+    from services.image_encoder import ImageEncoder
+    from services.screenshot_buffer import ScreenshotBuffer
+
+    baseline = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if variant == "legacy":
+        buffered: List[Any] = []
+        for img in _frames(count, width, height):
+            buffered.append(img)
+            time.sleep(interval_ms / 1000)
+        to_send = [img.copy() for img in list(buffered)]
+        buffer_mb = sum(img.width * img.height * 3 for img in buffered) / 2**20
+    else:
+        buf = ScreenshotBuffer(threshold=-1, max_bytes=cap_mb * 2**20 if variant == "capped" else 0)
+        for img in _frames(count, width, height):
+            buf.add(img)
+            time.sleep(interval_ms / 1000)
+        while not all(f.compacted for f in buf.frames()):
+            time.sleep(0.01)
+        to_send = buf.frames()
+        buffer_mb = buf.nbytes / 2**20
+    buffered_at = time.perf_counter()
+    peak_buffered = _peak_rss_mb()
+
+    # Request preparation without a Qt event loop or model: only the encoder is needed
+    handler = GeminiHandler.__new__(GeminiHandler)
+    handler.image_encoder = ImageEncoder(workers=2)
+    parts = handler._prepare_image_content(list(to_send))
+    for part in parts:
+        if hasattr(part, "result"):
+            part.result()
+    handler.image_encoder.shutdown()
+    return {
+        "variant": variant,
+        "frames": len(to_send),
+        "buffer_mb": round(buffer_mb, 1),
+        "baseline_mb": round(baseline, 1),
+        "peak_buffered_mb": round(peak_buffered, 1),
+        "peak_send_mb": round(_peak_rss_mb(), 1),
+        "buffer_s": round(buffered_at - t0, 2),
+        "send_s": round(time.perf_counter() - buffered_at, 2),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--frames", type=int, default=20)
+    p.add_argument("--size", default="3840x2160")
+    p.add_argument("--cap-mb", type=int, default=16, help="memory ceiling of the capped variant")
+    p.add_argument("--interval-ms", type=int, default=250, help="time between captures")
+    p.add_argument("--variant", choices=VARIANTS, help="run one variant in this process (JSON output)")
+    args = p.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    if args.variant:
+        result = run_variant(args.variant, args.frames, width, height, args.cap_mb, args.interval_ms)
+        print("RESULT " + json.dumps(result))
+        return
+
+    print(f"{args.frames} frames of {width}x{height} every {args.interval_ms} ms, cap {args.cap_mb} MB")
+    print(
+        f"{'variant':8} {'kept':>5} {'buffer MB':>10} {'base MB':>8} {'peak buffered':>14} "
+        f"{'peak send':>10} {'buffer s':>9} {'send s':>7}"
+    )
+    for variant in VARIANTS:
+        cmd = [sys.executable, "-m", "benchmarks.bench_screenshot_memory", "--variant", variant,
+               "--frames", str(args.frames), "--size", args.size, "--cap-mb", str(args.cap_mb),
+               "--interval-ms", str(args.interval_ms)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if line is None:
+            print(f"{variant:8} failed:\n{proc.stderr[-2000:]}")
+            continue
+        r = json.loads(line[len("RESULT "):])
+        print(
+            f"{variant:8} {r['frames']:5d} {r['buffer_mb']:10.1f} {r['baseline_mb']:8.1f} "
+            f"{r['peak_buffered_mb']:14.1f} {r['peak_send_mb']:10.1f} {r['buffer_s']:9.2f} {r['send_s']:7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Startup check: import-time report for the UI module (python -X importtime),
+a guard that slow subsystems stay off the startup import path, and
+time-to-window-shown of main.py (median of several runs, fails above --max-ms).
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5 --max-ms 1500
+Headless: set QT_QPA_PLATFORM=offscreen.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Must not be imported before the window is shown (loaded lazily / in the background)
+DEFERRED_MODULES = ("google.generativeai", "soundcard", "miniaudio", "keyboard", "mss", "numpy")
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+_SHOWN = re.compile(r"\[Startup\]\s+([\d.]+) ms\s+window shown")
+
+
+def import_report(module: str = "ui.main_window") -> List[Tuple[str, int, int, int]]:
+    """(name, self_us, cumulative_us, depth) for every module imported by `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def time_to_window_shown(runs: int) -> List[float]:
+    env = dict(os.environ, STARTUP_REPORT="1", STARTUP_QUIT_AFTER_MS="1")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "main.py"], capture_output=True, text=True, env=env, timeout=60)
+        m = _SHOWN.search(proc.stdout)
+        if not m:
+            raise RuntimeError(f"main.py did not report 'window shown':\n{proc.stdout}\n{proc.stderr}")
+        results.append(float(m.group(1)))
+    return results
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--max-ms", type=float, default=1500.0, help="fail if median time-to-window-shown is above")
+    p.add_argument("--top", type=int, default=15)
+    args = p.parse_args()
+
+    rows = import_report()
+    total = next((cum for name, _, cum, depth in rows if name == "ui.main_window"), 0)
+    print(f"import ui.main_window: {total / 1000:.1f} ms cumulative; slowest (cumulative):")
+    for name, self_us, cum_us, depth in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"  {cum_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f})  {'  ' * depth}{name}")
+
+    imported: Dict[str, int] = {name: cum for name, _, cum, _ in rows}
+    leaked = [m for m in DEFERRED_MODULES if m in imported]
+    print(f"deferred modules imported at startup: {leaked or 'none'}")
+
+    shown = time_to_window_shown(args.runs)
+    median = statistics.median(shown)
+    print(
+        f"time to window shown over {args.runs} runs: median {median:.1f} ms, "
+        f"min {min(shown):.1f}, max {max(shown):.1f} (limit {args.max_ms:.0f})"
+    )
+    if leaked or median > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Time to first visible text, streaming vs blocking, through GeminiWorker and a
+FakeChatSession with configurable delays (no network, no window).
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming
+"""
+import sys
+import threading
+import time
+
+from PyQt6.QtCore import QCoreApplication
+
+from services.ai_handler import GeminiWorker
+from services.fake_chat import FakeChatSession
+
+FIRST_CHUNK_DELAY = 0.4
+CHUNK_DELAY = 0.03
+CHUNKS = 30
+
+
+def _run(app: QCoreApplication, stream: bool) -> dict:
+    session = FakeChatSession(FIRST_CHUNK_DELAY, CHUNK_DELAY, CHUNKS)
+    worker = GeminiWorker(session, "question", stream=stream)
+    result = {"first_text": None, "done": None, "chunks": 0}
+
+    def on_chunk(_text: str) -> None:
+        result["chunks"] += 1
+        if result["first_text"] is None:
+            result["first_text"] = time.perf_counter() - worker.submitted_at
+
+    def on_done(_text: str) -> None:
+        result["done"] = time.perf_counter() - worker.submitted_at
+        if result["first_text"] is None:
+            result["first_text"] = result["done"]
+
+    worker.chunk_signal.connect(on_chunk)
+    worker.finished_signal.connect(on_done)
+    worker.error_signal.connect(lambda e: print(f"error: {e}"))
+    worker.completed.connect(app.quit)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    app.exec()
+    thread.join()
+    return result
+
+
+def main() -> None:
+    app = QCoreApplication(sys.argv)
+    print(f"fake model: first chunk {FIRST_CHUNK_DELAY}s, {CHUNKS} chunks every {CHUNK_DELAY}s")
+    for stream in (False, True):
+        r = _run(app, stream)
+        print(
+            f"{'streaming' if stream else 'blocking':10} first text {r['first_text']:.3f}s   "
+            f"complete {r['done']:.3f}s   chunk signals {r['chunks']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Headless stand-ins for capture backends used by the benchmarks.
+"""
+import functools
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+
+class FakeScreenShot:
+    """Mimics mss.screenshot.ScreenShot: BGRA raw buffer + lazily converted rgb."""
+
+    def __init__(self, raw: bytearray, monitor: dict) -> None:
+        self.raw = raw
+        self.width = monitor["width"]
+        self.height = monitor["height"]
+        self.left = monitor["left"]
+        self.top = monitor["top"]
+        self.size = (self.width, self.height)
+        self.__rgb: Optional[bytes] = None
+
+    @property
+    def bgra(self) -> bytes:
+        return bytes(self.raw)
+
+    @property
+    def rgb(self) -> bytes:
+        # Same conversion mss performs in pure Python
+        if self.__rgb is None:
+            rgb = bytearray(self.height * self.width * 3)
+            raw = self.raw
+            rgb[0::3] = raw[2::4]
+            rgb[1::3] = raw[1::4]
+            rgb[2::3] = raw[0::4]
+            self.__rgb = bytes(rgb)
+        return self.__rgb
+
+
+class FakeMss:
+    """
+    Mimics an mss.mss() instance. Opening costs `open_cost_ms` (device contexts,
+    monitor enumeration); each grab copies a synthetic BGRA frame, cycling
+    through `frame_variants` different screen contents.
+    """
+
+    def __init__(
+        self,
+        monitors: Optional[List[dict]] = None,
+        open_cost_ms: float = 3.0,
+        frame_variants: int = 1,
+    ) -> None:
+        time.sleep(open_cost_ms / 1000)
+        self._monitors = monitors or [{"left": 0, "top": 0, "width": 1920, "height": 1080}]
+        self._frame_variants = max(1, frame_variants)
+        self._grabs = 0
+
+    @property
+    def monitors(self) -> List[dict]:
+        lefts = [m["left"] for m in self._monitors]
+        tops = [m["top"] for m in self._monitors]
+        rights = [m["left"] + m["width"] for m in self._monitors]
+        bottoms = [m["top"] + m["height"] for m in self._monitors]
+        virtual = {
+            "left": min(lefts),
+            "top": min(tops),
+            "width": max(rights) - min(lefts),
+            "height": max(bottoms) - min(tops),
+        }
+        return [virtual] + list(self._monitors)
+
+    def grab(self, monitor: dict) -> FakeScreenShot:
+        frame = synthetic_bgra(monitor["width"], monitor["height"], self._grabs % self._frame_variants)
+        self._grabs += 1
+        return FakeScreenShot(bytearray(frame), monitor)
+
+    def close(self) -> None:
+        pass
+
+
+@functools.lru_cache(maxsize=8)
+def synthetic_bgra(width: int, height: int, seed: int = 0) -> bytes:
+    """Screen-like BGRA frame: flat panels, text-ish noise rows, opaque alpha."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 4), 30, dtype=np.uint8)
+    img[..., 3] = 255
+    img[: height // 12, :, :3] = (60, 60, 60)
+    rows = rng.integers(0, height, size=height // 8)
+    img[rows, : width * 2 // 3, :3] = rng.integers(0, 255, size=(rows.size, width * 2 // 3, 3), dtype=np.uint8)
+    return img.tobytes()
+
+
+def synthetic_capture_feed(
+    seconds: float, samplerate: int = 48000, channels: int = 2, block_frames: int = 480
+) -> Iterator[bytes]:
+    """
+    Stand-in for the miniaudio capture callback: PCM16 blocks (tone + noise,
+    with silent stretches) of block_frames frames, as delivered to the recorder.
+    """
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.02 * rng.standard_normal(t.size)
+    signal[(t % 4.0) > 3.0] *= 0.01  # one quiet second out of four
+    pcm = (np.repeat(signal[:, None], channels, axis=1) * 32767).astype(np.int16)
+    raw = pcm.tobytes()
+    step = block_frames * channels * 2
+    for i in range(0, len(raw), step):
+        yield raw[i:i + step]
@@ -0,0 +1,168 @@
+"""
+Load test of the full capture -> encode -> send -> render pipeline against the
+fake model backend (no network, no screen): synthetic screen grabs through
+ScreenshotService, image requests through GeminiHandler (scheduler, frame diff,
+encoder pool, request pool) and streamed answers rendered into a QTextEdit the
+way MainWindow does.
+
+Run from the repository root:
+    python -m benchmarks.load_pipeline --requests 20 --interval-ms 250
+Headless: set QT_QPA_PLATFORM=offscreen.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--requests", type=int, default=20, help="image requests to send")
+    p.add_argument("--frames", type=int, default=2, help="screenshots per request")
+    p.add_argument("--interval-ms", type=int, default=250, help="time between requests")
+    p.add_argument("--first-token-ms", type=int, default=400)
+    p.add_argument("--tokens-per-sec", type=int, default=80)
+    p.add_argument("--reply-tokens", type=int, default=200)
+    p.add_argument("--failure-pct", type=int, default=0)
+    p.add_argument("--size", default="1920x1080", help="synthetic screen size")
+    return p.parse_args()
+
+
+def _pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+def main() -> None:
+    args = _parse_args()
+    # Backend selection is read from the environment when config is imported
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ["FAKE_MODEL_FIRST_TOKEN_MS"] = str(args.first_token_ms)
+    os.environ["FAKE_MODEL_TOKENS_PER_SEC"] = str(args.tokens_per_sec)
+    os.environ["FAKE_MODEL_REPLY_TOKENS"] = str(args.reply_tokens)
+    os.environ["FAKE_MODEL_FAILURE_PCT"] = str(args.failure_pct)
+    os.environ["RESPONSE_CACHE"] = "0"
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtGui import QTextCursor
+    from PyQt6.QtWidgets import QApplication, QTextEdit
+
+    from benchmarks.fakes import FakeMss
+    from config import STREAM_RENDER_INTERVAL_MS
+    from services.ai_handler import GeminiHandler
+    from services.screenshot import ScreenshotService
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    monitors = [{"left": 0, "top": 0, "width": width, "height": height}]
+
+    app = QApplication(sys.argv)
+    view = QTextEdit()
+    capture = ScreenshotService(
+        backend_factory=lambda: FakeMss(monitors, frame_variants=4), save_debug=False
+    )
+    handler = GeminiHandler()
+
+    stats: Dict[str, List[float]] = {"capture_ms": [], "render_ms": [], "first_render": [], "answer": []}
+    counts = {"sent": 0, "answers": 0, "errors": 0, "chunks": 0}
+    pending: List[str] = []
+    state = {"request_start": None, "first_rendered": False}
+
+    def flush() -> None:
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        cursor = QTextCursor(view.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText("".join(pending))
+        pending.clear()
+        stats["render_ms"].append((time.perf_counter() - t0) * 1000)
+        if not state["first_rendered"] and state["request_start"] is not None:
+            state["first_rendered"] = True
+            stats["first_render"].append(time.perf_counter() - state["request_start"])
+
+    render_timer = QTimer()
+    render_timer.setInterval(STREAM_RENDER_INTERVAL_MS)
+    render_timer.timeout.connect(flush)
+    render_timer.start()
+
+    def on_started() -> None:
+        state["request_start"] = time.perf_counter()
+        state["first_rendered"] = False
+
+    def on_chunk(text: str) -> None:
+        counts["chunks"] += 1
+        pending.append(text)
+
+    def on_done(_text: str = "") -> None:
+        flush()
+        if state["request_start"] is not None:
+            stats["answer"].append(time.perf_counter() - state["request_start"])
+        if not counts["chunks"]:
+            view.append(_text)
+
+    def on_error(_error: str) -> None:
+        counts["errors"] += 1
+        on_done()
+
+    handler.processing_started.connect(on_started)
+    handler.response_chunk.connect(on_chunk)
+    handler.response_received.connect(lambda t: (counts.__setitem__("answers", counts["answers"] + 1), on_done(t)))
+    handler.error_occurred.connect(on_error)
+
+    def send_one() -> None:
+        t0 = time.perf_counter()
+        frames = [capture.capture_async().result()[1] for _ in range(args.frames)]
+        stats["capture_ms"].append((time.perf_counter() - t0) * 1000 / args.frames)
+        handler.send_request(frames, use_cache=False)
+        counts["sent"] += 1
+        if counts["sent"] >= args.requests:
+            send_timer.stop()
+
+    def check_idle() -> None:
+        if counts["sent"] >= args.requests and handler.worker is None and not len(handler.scheduler):
+            app.quit()
+
+    send_timer = QTimer()
+    send_timer.setInterval(args.interval_ms)
+    send_timer.timeout.connect(send_one)
+    idle_timer = QTimer()
+    idle_timer.setInterval(50)
+    idle_timer.timeout.connect(check_idle)
+
+    wall = time.perf_counter()
+    send_one()
+    send_timer.start()
+    idle_timer.start()
+    app.exec()
+    wall = time.perf_counter() - wall
+
+    m = handler.metrics()
+    handler.shutdown()
+    capture.shutdown()
+
+    print()
+    print(f"fake model: first token {args.first_token_ms} ms, {args.tokens_per_sec} tok/s, "
+          f"{args.reply_tokens} tokens/answer, {args.failure_pct}% failures")
+    print(f"{args.requests} requests x {args.frames} frames {width}x{height}, one every {args.interval_ms} ms")
+    print(f"wall {wall:.2f}s   answers {counts['answers']}   errors {counts['errors']}   "
+          f"coalesced {m['coalesced']}   dropped {m['dropped']}   max queue {m['max_depth']}")
+    print(f"throughput {counts['answers'] / wall:.2f} answers/s")
+    rows = [
+        ("capture per frame (ms)", stats["capture_ms"]),
+        ("queue wait (s)", [m.get("wait_p50", float("nan")), m.get("wait_p95", float("nan"))]),
+        ("request run (s)", [m.get("task_run_p50", float("nan")), m.get("task_run_p95", float("nan"))]),
+        ("dispatch -> first render (s)", stats["first_render"]),
+        ("dispatch -> answer (s)", stats["answer"]),
+        ("render flush (ms)", stats["render_ms"]),
+    ]
+    for name, values in rows:
+        if name in ("queue wait (s)", "request run (s)"):
+            p50, p95 = values
+        else:
+            p50, p95 = _pct(values, 0.5), _pct(values, 0.95)
+        print(f"{name:30} p50 {p50:8.3f}   p95 {p95:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
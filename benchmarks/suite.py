@@ -0,0 +1,275 @@
+"""
+Headless benchmark suite for every pipeline stage, with a JSON report that can
+be compared between commits. No display, audio device or network: fake mss
+frames, a synthetic capture feed, the fake model backend and an offscreen Qt.
+
+Stages (per resolution / buffer length / transcript size):
+  capture_convert  fake mss grab + BGRA -> PIL conversion
+  encode           ImageEncoder (downscale + JPEG) of one frame
+  ring_write       capture feed blocks written into PcmRing (per second of audio)
+  ring_read        last N seconds as int16 array
+  wav_build        last N seconds as WAV bytes (header + ring in one copy)
+  audio_payload    upload payload (mono, 16 kHz, VAD) from the last N seconds
+  dispatch         send_request -> response_received with an instant fake model
+  render_append    appending an answer to a transcript of the given size
+  render_stream    inserting one streamed chunk at the end of that transcript
+
+Run from the repository root:
+    python -m benchmarks.suite --out bench-report.json
+    python -m benchmarks.suite --compare old.json new.json --threshold 15
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+RESOLUTIONS = [(1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+BUFFER_SECONDS = [10, 30, 60]
+TRANSCRIPT_CHARS = [0, 100_000, 1_000_000]
+SAMPLERATE = 48000
+CHANNELS = 2
+
+Result = Dict[str, float]
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Result:
+    """Median / p95 / min wall time (ms) of fn over `repeat` runs, after one warm-up."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times), 4),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+        "min_ms": round(times[0], 4),
+        "runs": repeat,
+    }
+
+
+# --- stages ---------------------------------------------------------------
+
+def bench_capture_convert(repeat: int) -> Dict[str, Result]:
+    from benchmarks.fakes import FakeMss
+    from services.screenshot import bgra_to_image
+
+    out = {}
+    for w, h in RESOLUTIONS:
+        monitor = {"left": 0, "top": 0, "width": w, "height": h}
+        sct = FakeMss([monitor], open_cost_ms=0)
+        out[f"capture_convert/{w}x{h}"] = _measure(lambda: bgra_to_image(sct.grab(monitor)), repeat)
+    return out
+
+
+def bench_encode(repeat: int) -> Dict[str, Result]:
+    from PIL import Image
+    from benchmarks.fakes import synthetic_bgra
+    from services.image_encoder import ImageEncoder
+
+    encoder = ImageEncoder(max_edge=1920, fmt="jpeg", quality=85, workers=1)
+    out = {}
+    for w, h in RESOLUTIONS:
+        img = Image.frombuffer("RGB", (w, h), synthetic_bgra(w, h), "raw", "BGRX", 0, 1)
+        out[f"encode/{w}x{h}"] = _measure(lambda: encoder.encode(img), max(3, repeat // 2))
+    encoder.shutdown()
+    return out
+
+
+def bench_audio(repeat: int) -> Dict[str, Result]:
+    from benchmarks.fakes import synthetic_capture_feed
+    from services.audio_processing import prepare_audio_payload, wav_header
+    from services.audio_ring import PcmRing
+
+    out = {}
+    one_second = list(synthetic_capture_feed(1.0, SAMPLERATE, CHANNELS))
+    for seconds in BUFFER_SECONDS:
+        ring = PcmRing(int(seconds * SAMPLERATE), CHANNELS)
+        feed = list(synthetic_capture_feed(seconds, SAMPLERATE, CHANNELS))
+        for block in feed:
+            ring.write(block)
+        frames = seconds * SAMPLERATE
+
+        def write_second() -> None:
+            for block in one_second:
+                ring.write(block)
+
+        out[f"ring_write/{seconds}s"] = _measure(write_second, repeat)
+        out[f"ring_read/{seconds}s"] = _measure(lambda: ring.read_last(frames), repeat)
+        header = lambda n: wav_header(n, SAMPLERATE, CHANNELS)
+        out[f"wav_build/{seconds}s"] = _measure(lambda: ring.read_last_bytes(frames, header), repeat)
+        pcm = ring.read_last(frames)
+        out[f"audio_payload/{seconds}s"] = _measure(
+            lambda: prepare_audio_payload(pcm, SAMPLERATE, mono=True, target_samplerate=16000, vad=True),
+            max(3, repeat // 2),
+        )
+    return out
+
+
+def bench_dispatch(repeat: int, app: Any) -> Dict[str, Result]:
+    from services.ai_handler import GeminiHandler
+
+    handler = GeminiHandler()
+    while not handler._loaded:
+        app.processEvents()
+        time.sleep(0.001)
+    state = {"done": False}
+    handler.response_received.connect(lambda _t: state.__setitem__("done", True))
+    handler.error_occurred.connect(lambda e: print(f"dispatch error: {e}"))
+
+    def roundtrip() -> None:
+        state["done"] = False
+        handler.send_request("ping", use_cache=False)
+        while not state["done"] or handler.worker is not None:
+            app.processEvents()
+
+    result = {"dispatch/text": _measure(roundtrip, repeat * 4)}
+    handler.shutdown()
+    return result
+
+
+def bench_render(repeat: int, app: Any) -> Dict[str, Result]:
+    from PyQt6.QtGui import QTextCursor
+    from PyQt6.QtWidgets import QTextEdit
+
+    answer = "Answer line with `code` and some explanation.\n" * 40
+    chunk = "streamed piece of text "
+    out = {}
+    for chars in TRANSCRIPT_CHARS:
+        view = QTextEdit()
+        view.setReadOnly(True)
+        view.resize(1000, 800)
+        line = "Previous answer text in the transcript.\n"
+        view.setPlainText(line * (chars // len(line)))
+        view.show()
+        app.processEvents()
+
+        def append() -> None:
+            view.append(f"\n\n**Gemini:**\n{answer}")
+            sb = view.verticalScrollBar()
+            sb.setValue(sb.maximum())
+            view.viewport().repaint()
+
+        def stream() -> None:
+            cursor = QTextCursor(view.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(chunk)
+            sb = view.verticalScrollBar()
+            sb.setValue(sb.maximum())
+            view.viewport().repaint()
+
+        label = f"{chars // 1000}k" if chars else "empty"
+        out[f"render_append/{label}"] = _measure(append, repeat)
+        out[f"render_stream/{label}"] = _measure(stream, repeat)
+        view.close()
+        view.deleteLater()
+    return out
+
+
+# --- report -----------------------------------------------------------------
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(repeat: int, only: str = "") -> Dict[str, Any]:
+    # Environment for the fake model must be set before config is imported
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.update(MODEL_BACKEND="fake", FAKE_MODEL_FIRST_TOKEN_MS="0", FAKE_MODEL_TOKENS_PER_SEC="1000000",
+                      FAKE_MODEL_REPLY_TOKENS="64", RESPONSE_CACHE="0", TRACING="0", CONTEXT_SUMMARY="0")
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    stages: List[Tuple[str, Callable[[], Dict[str, Result]]]] = [
+        ("capture_convert", lambda: bench_capture_convert(repeat)),
+        ("encode", lambda: bench_encode(repeat)),
+        ("audio", lambda: bench_audio(repeat)),
+        ("dispatch", lambda: bench_dispatch(repeat, app)),
+        ("render", lambda: bench_render(repeat, app)),
+    ]
+    results: Dict[str, Result] = {}
+    for name, fn in stages:
+        if only and only not in name:
+            continue
+        t0 = time.perf_counter()
+        results.update(fn())
+        print(f"[suite] {name} done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    meta = report["meta"]
+    print(f"revision {meta['revision']}  python {meta['python']}  {meta['platform']}")
+    print(f"{'case':32} {'median ms':>10} {'p95 ms':>10} {'min ms':>10}")
+    for case, r in report["results"].items():
+        print(f"{case:32} {r['median_ms']:10.3f} {r['p95_ms']:10.3f} {r['min_ms']:10.3f}")
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold_pct: float) -> int:
+    """Print median changes; return the number of cases slower than threshold_pct."""
+    print(f"{old['meta']['revision']} -> {new['meta']['revision']} (regression threshold {threshold_pct:.0f}%)")
+    print(f"{'case':32} {'old ms':>10} {'new ms':>10} {'change':>9}")
+    regressions = 0
+    for case in sorted(set(old["results"]) | set(new["results"])):
+        a, b = old["results"].get(case), new["results"].get(case)
+        if a is None or b is None:
+            cells = [f"{r['median_ms']:10.3f}" if r else f"{'-':>10}" for r in (a, b)]
+            print(f"{case:32} {cells[0]} {cells[1]}")
+            continue
+        change = (b["median_ms"] - a["median_ms"]) / a["median_ms"] * 100 if a["median_ms"] else 0.0
+        flag = ""
+        if change > threshold_pct:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -threshold_pct:
+            flag = "  faster"
+        print(f"{case:32} {a['median_ms']:10.3f} {b['median_ms']:10.3f} {change:+8.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--out", help="write the JSON report here")
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--quick", action="store_true", help="fewer repetitions (smoke run)")
+    p.add_argument("--only", default="", help="run stages whose name contains this")
+    p.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two reports")
+    p.add_argument("--threshold", type=float, default=15.0, help="%% slowdown counted as a regression")
+    args = p.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f_old, open(args.compare[1], encoding="utf-8") as f_new:
+            regressions = compare(json.load(f_old), json.load(f_new), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    report = run(3 if args.quick else args.repeat, args.only)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
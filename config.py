@@ -15,6 +15,28 @@ else:
 env_path = base_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    try:
+        return int(raw) if raw else default
+    except ValueError:
+        print(f"WARNING: invalid {name}='{raw}', using {default}")
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        print(f"WARNING: invalid {name}='{raw}', using {default}")
+        return default
+
 # API Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 AUDIO_PROMPT = os.getenv("AUDIO_PROMPT")
@@ -26,11 +48,111 @@ You are a concise desktop assistant. Analyze provided context (text, code, image
 """
 raw_prompt = os.getenv("CUSTOM_SYSTEM_PROMPT", DEFAULT_SYSTEM_PROMPT)
 SYSTEM_PROMPT = raw_prompt.replace("\\n", "\n")
+
+# Model backend: "gemini" or "fake" (local stand-in for latency / load testing)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini").strip().lower()
+FAKE_MODEL_FIRST_TOKEN_MS = _env_int("FAKE_MODEL_FIRST_TOKEN_MS", 400)
+FAKE_MODEL_TOKENS_PER_SEC = _env_int("FAKE_MODEL_TOKENS_PER_SEC", 80)
+FAKE_MODEL_REPLY_TOKENS = _env_int("FAKE_MODEL_REPLY_TOKENS", 200)
+FAKE_MODEL_FAILURE_PCT = _env_int("FAKE_MODEL_FAILURE_PCT", 0)  # % of requests that fail
+
+# Image upload encoding (downscale + compress before send)
+IMAGE_MAX_EDGE = _env_int("IMAGE_MAX_EDGE", 1920)  # px, 0 = keep full resolution
+IMAGE_TOKEN_BUDGET = _env_int("IMAGE_TOKEN_BUDGET", 0)  # per image, 0 = unlimited
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "jpeg").strip().lower()  # jpeg | webp | png
+IMAGE_QUALITY = _env_int("IMAGE_QUALITY", 85)
+IMAGE_ENCODE_WORKERS = _env_int("IMAGE_ENCODE_WORKERS", 2)
+
+# Requests made while an answer is in flight are queued (up to this many)
+REQUEST_QUEUE_SIZE = _env_int("REQUEST_QUEUE_SIZE", 8)
+REQUEST_MAX_IMAGES = _env_int("REQUEST_MAX_IMAGES", 16)  # per merged image request (newest kept), 0 = unlimited
+GEMINI_WORKERS = _env_int("GEMINI_WORKERS", 2)  # request threads, reused across requests
+
+# Chat history bounds: attachments older than the last N user turns become placeholders;
+# above the token budget the oldest turns (beyond the last CONTEXT_KEEP_TURNS exchanges)
+# are dropped, and summarized in the background (CONTEXT_SUMMARY) for a later request
+CONTEXT_TOKEN_BUDGET = _env_int("CONTEXT_TOKEN_BUDGET", 12000)  # estimated tokens, 0 = unlimited
+CONTEXT_KEEP_MEDIA_TURNS = _env_int("CONTEXT_KEEP_MEDIA_TURNS", 1)  # -1 = keep all attachments
+CONTEXT_KEEP_TURNS = _env_int("CONTEXT_KEEP_TURNS", 4)
+CONTEXT_SUMMARY = _env_flag("CONTEXT_SUMMARY", True)
+
+# Stream answers chunk by chunk (rendered in batches every STREAM_RENDER_INTERVAL_MS)
+STREAM_RESPONSES = _env_flag("STREAM_RESPONSES", True)
+STREAM_RENDER_INTERVAL_MS = _env_int("STREAM_RENDER_INTERVAL_MS", 50)
+
+# Response cache (identical requests are answered without a model call)
+RESPONSE_CACHE = _env_flag("RESPONSE_CACHE", True)
+RESPONSE_CACHE_SIZE = _env_int("RESPONSE_CACHE_SIZE", 128)  # entries
+RESPONSE_CACHE_TTL_SEC = _env_int("RESPONSE_CACHE_TTL_SEC", 24 * 3600)  # 0 = never expire
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "").strip()  # JSON file; empty = memory only
+
+# Multi-screenshot requests: send later frames as crops of changed regions
+FRAME_DIFF = _env_flag("FRAME_DIFF", True)
+FRAME_DIFF_TILE = _env_int("FRAME_DIFF_TILE", 32)  # px
+FRAME_DIFF_THRESHOLD = _env_int("FRAME_DIFF_THRESHOLD", 12)  # max gray-level delta ignored inside a tile
+FRAME_DIFF_MAX_RATIO = 0.5  # send the frame in full if more than this share of tiles changed
+
+# Screenshot buffer deduplication (256-bit dHash)
+SCREENSHOT_DEDUP_THRESHOLD = _env_int("SCREENSHOT_DEDUP_THRESHOLD", 4)  # max differing bits, -1 = off
+SCREENSHOT_DEDUP_POLICY = os.getenv("SCREENSHOT_DEDUP_POLICY", "replace").strip().lower()  # replace | drop
+
+# Screenshot buffer memory: captures are compressed (lossless) in the background;
+# above the ceiling the oldest buffered captures are evicted
+SCREENSHOT_BUFFER_MAX_MB = _env_int("SCREENSHOT_BUFFER_MAX_MB", 256)  # 0 = unlimited
+SCREENSHOT_BUFFER_COMPACT = _env_flag("SCREENSHOT_BUFFER_COMPACT", True)
+SCREENSHOT_BUFFER_ZLIB_LEVEL = 1  # compaction level, 1 (fast) .. 9 (small)
+
+# Background frame sampler (off by default): keeps the last FRAME_SAMPLER_RING distinct
+# downscaled grabs of the CAPTURE_MODE_ANALYZE target; Ctrl+Alt+Space with an empty
+# buffer attaches the last FRAME_SAMPLER_ATTACH of them instead of taking a screenshot
+FRAME_SAMPLER = _env_flag("FRAME_SAMPLER", False)
+FRAME_SAMPLER_FPS = _env_float("FRAME_SAMPLER_FPS", 1.0)
+FRAME_SAMPLER_MAX_EDGE = _env_int("FRAME_SAMPLER_MAX_EDGE", 1280)  # px, 0 = full resolution
+FRAME_SAMPLER_RING = _env_int("FRAME_SAMPLER_RING", 30)  # frames kept
+FRAME_SAMPLER_ATTACH = _env_int("FRAME_SAMPLER_ATTACH", 3)
+FRAME_SAMPLER_THRESHOLD = _env_int("FRAME_SAMPLER_THRESHOLD", 6)  # dHash bits counted as "no change", -1 = keep all
+FRAME_SAMPLER_REPORT_SEC = _env_int("FRAME_SAMPLER_REPORT_SEC", 0)  # log CPU/memory stats this often, 0 = never
+
+# Audio sent by Ctrl+Alt+A (last N seconds) and Ctrl+Alt+Shift+A (last N seconds,
+# beyond the 40 s ring only with AUDIO_HISTORY=1)
+AUDIO_SNIPPET_SEC = _env_float("AUDIO_SNIPPET_SEC", 30.0)
+AUDIO_LOOKBACK_SEC = _env_float("AUDIO_LOOKBACK_SEC", 300.0)  # longer uploads are cut to AUDIO_UPLOAD_MAX_MB
+
 # Windows Display Affinity Constants
 WDA_NONE = 0x00000000
 WDA_MONITOR = 0x00000001
 WDA_EXCLUDEFROMCAPTURE = 0x00000011  # Excludes window from screen capture (privacy feature)
 
+# How the window gets out of the way before a capture:
+#   "auto"  - don't hide when the window is excluded from capture, otherwise "wait"
+#   "wait"  - hide, poll until the window is actually gone (up to CAPTURE_HIDE_TIMEOUT_MS)
+#   "delay" - hide and wait a fixed CAPTURE_HIDE_TIMEOUT_MS (timer, UI stays responsive)
+CAPTURE_HIDE_MODE = os.getenv("CAPTURE_HIDE_MODE", "auto").strip().lower()
+CAPTURE_HIDE_TIMEOUT_MS = _env_int("CAPTURE_HIDE_TIMEOUT_MS", 150)
+CAPTURE_HIDE_POLL_MS = 5
+
+# What each hotkey captures: primary | cursor (monitor under the cursor) | all (every
+# monitor, stitched) | region (CAPTURE_REGION) | window (foreground window)
+CAPTURE_MODE_ADD = os.getenv("CAPTURE_MODE_ADD", "primary").strip().lower()  # Ctrl+Alt+S
+CAPTURE_MODE_ANALYZE = os.getenv("CAPTURE_MODE_ANALYZE", "primary").strip().lower()  # Ctrl+Alt+Space, empty buffer
+CAPTURE_REGION = os.getenv("CAPTURE_REGION", "")  # "x,y,width,height" in screen pixels
+
 # Paths
 DEBUG_SCREENSHOTS_DIR = "debug_screenshots"
 
+# Debug screenshot dump (written in the background, off by default)
+DEBUG_SCREENSHOTS = _env_flag("DEBUG_SCREENSHOTS", False)
+DEBUG_PNG_COMPRESS_LEVEL = _env_int("DEBUG_PNG_COMPRESS_LEVEL", 1)  # 0 (fast) .. 9 (small)
+DEBUG_SCREENSHOTS_MAX_FILES = _env_int("DEBUG_SCREENSHOTS_MAX_FILES", 50)  # 0 = unlimited
+DEBUG_SCREENSHOTS_MAX_MB = _env_int("DEBUG_SCREENSHOTS_MAX_MB", 200)  # 0 = unlimited
+DEBUG_WRITER_QUEUE_SIZE = 4  # pending images; further captures are not dumped while full
+
+
+# Per-request stage tracing: JSONL per user action + rolling p50/p95 (off: near-zero cost)
+TRACING = _env_flag("TRACING", False)
+TRACE_PATH = os.getenv("TRACE_PATH", "traces/trace.jsonl")  # empty = aggregates only
+TRACE_OVERLAY = _env_flag("TRACE_OVERLAY", False)  # on-screen p50/p95 stats line (needs TRACING)
+
+# Startup timing: print milestones (imports, window shown, model/audio ready)
+STARTUP_REPORT = _env_flag("STARTUP_REPORT", False)
+STARTUP_QUIT_AFTER_MS = _env_int("STARTUP_QUIT_AFTER_MS", 0)  # quit this long after the window is shown (benchmarks), 0 = never
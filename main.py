@@ -1,17 +1,53 @@
+import time
+_STARTED = time.perf_counter()  # before any heavy import, for the startup report
+
+import multiprocessing
 import sys
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+from typing import TYPE_CHECKING
+
+# Qt, config and the UI are imported in main(): the audio recorder process
+# (spawned) re-imports this module as __mp_main__ and needs none of them.
+if TYPE_CHECKING:
+    from PyQt6.QtWidgets import QApplication
+
+
+def _mark(label: str) -> None:
+    from config import STARTUP_REPORT
+
+    if STARTUP_REPORT:
+        print(f"[Startup] {(time.perf_counter() - _STARTED) * 1000:8.1f} ms  {label}", flush=True)
+
+
+def _on_shown(app: "QApplication") -> None:
+    from PyQt6.QtCore import QTimer
+    from config import STARTUP_QUIT_AFTER_MS
+
+    _mark("window shown")
+    if STARTUP_QUIT_AFTER_MS:
+        QTimer.singleShot(STARTUP_QUIT_AFTER_MS, app.quit)
+
 
 def main() -> None:
     """
     Application entry point.
     """
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+
+    _mark("imports done")
     app = QApplication(sys.argv)
     
     window = MainWindow()
+    _mark("window created")
+    window.gemini_handler.ready.connect(lambda ok: _mark(f"model {'ready' if ok else 'unavailable'}"))
+    window.audio_ready.connect(lambda service: _mark(f"audio {'ready' if service else 'unavailable'}"))
     window.show()
+    # First event-loop turn after show(): the window has been mapped and painted
+    QTimer.singleShot(0, lambda: _on_shown(app))
     
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # frozen builds: the audio recorder process re-enters here
     main()
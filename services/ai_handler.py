@@ -1,123 +1,566 @@
-from typing import List, Optional, Union
+import collections
+import heapq
+import itertools
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set, Union
 from PIL import Image
-from PyQt6.QtCore import QThread, pyqtSignal, QObject
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL, SYSTEM_PROMPT, AUDIO_PROMPT
+from PyQt6.QtCore import pyqtSignal, QObject
+from config import (SYSTEM_PROMPT, AUDIO_PROMPT, IMAGE_MAX_EDGE,
+                    IMAGE_TOKEN_BUDGET, IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_ENCODE_WORKERS,
+                    FRAME_DIFF, FRAME_DIFF_TILE, FRAME_DIFF_THRESHOLD, FRAME_DIFF_MAX_RATIO,
+                    RESPONSE_CACHE, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SEC, RESPONSE_CACHE_PATH,
+                    STREAM_RESPONSES, REQUEST_QUEUE_SIZE, REQUEST_MAX_IMAGES, GEMINI_WORKERS, CONTEXT_TOKEN_BUDGET,
+                    CONTEXT_KEEP_MEDIA_TURNS, CONTEXT_KEEP_TURNS, CONTEXT_SUMMARY)
+from services.chat_context import ChatContext, strip_media
+from services.image_encoder import ImageEncoder
+from services.model_backend import ModelBackend, create_backend
+from services.response_cache import ResponseCache, make_key
+from services.screenshot_buffer import StoredFrame
+from utils.tracing import NULL_TRACE, Trace
 
+IMAGE_PROMPT = "Analyze these screenshots and provide a solution."
 
-class GeminiWorker(QThread):
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+
+class ScheduledRequest:
+    """
+    A queued model request: kind is "images", "text" or "audio". prepare, if
+    set, turns content into what is sent, on the request worker.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        content: Any,
+        use_cache: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        trace: Trace = NULL_TRACE,
+        prepare: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        self.kind = kind
+        self.content = content
+        self.use_cache = use_cache
+        self.priority = priority
+        self.trace = trace
+        self.prepare = prepare
+        self.enqueued_at = time.perf_counter()
+        self.generation = 0
+
+
+class RequestScheduler:
+    """
+    Bounded request queue for a single chat session:
+    - priority order, FIFO within a priority
+    - a new image request is merged into an image request that is still queued
+      (keeping the newest max_images images and the higher priority)
+    - cancel_all() drops queued work and bumps the generation, so results of
+      requests already in flight can be recognised as stale and discarded
+    - queue depth / wait time metrics
+    """
+
+    def __init__(self, max_size: int = 8, wait_window: int = 100, max_images: int = 16) -> None:
+        self.max_size = max_size
+        self.max_images = max_images
+        self.generation = 0
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._waits: Deque[float] = collections.deque(maxlen=wait_window)
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "dispatched": 0, "coalesced": 0, "dropped": 0, "cancelled": 0, "max_depth": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def submit(self, req: ScheduledRequest) -> bool:
+        """Queue a request. Returns False if it was rejected (queue full)."""
+        self.counters["submitted"] += 1
+        req.generation = self.generation
+        if req.kind == "images":
+            for i, (_, seq, queued) in enumerate(self._heap):
+                if queued.kind == "images":
+                    known = {id(img) for img in queued.content}
+                    queued.content.extend(img for img in req.content if id(img) not in known)
+                    if self.max_images > 0 and len(queued.content) > self.max_images:
+                        del queued.content[: len(queued.content) - self.max_images]
+                    queued.use_cache = queued.use_cache and req.use_cache
+                    if req.priority > queued.priority:
+                        queued.priority = req.priority
+                        self._heap[i] = (-queued.priority, seq, queued)
+                        heapq.heapify(self._heap)
+                    self.counters["coalesced"] += 1
+                    req.trace.finish(coalesced_into=queued.trace.id)
+                    print(f"[Scheduler] Coalesced into queued image request ({len(queued.content)} images)")
+                    return True
+        if len(self._heap) >= self.max_size:
+            self.counters["dropped"] += 1
+            req.trace.finish(dropped=True)
+            print(f"[Scheduler] Queue full ({self.max_size}); {req.kind} request dropped")
+            return False
+        heapq.heappush(self._heap, (-req.priority, next(self._seq), req))
+        self.counters["max_depth"] = max(self.counters["max_depth"], len(self._heap))
+        return True
+
+    def pop(self) -> Optional[ScheduledRequest]:
+        if not self._heap:
+            return None
+        _, _, req = heapq.heappop(self._heap)
+        now = time.perf_counter()
+        req.trace.add("queue", req.enqueued_at, now)
+        wait = now - req.enqueued_at
+        self._waits.append(wait)
+        self.counters["dispatched"] += 1
+        print(f"[Scheduler] Dispatch {req.kind} (waited {wait:.2f}s, {len(self._heap)} still queued)")
+        return req
+
+    def cancel_all(self) -> int:
+        """Drop every queued request and supersede the ones in flight."""
+        cancelled = len(self._heap)
+        for _, _, req in self._heap:
+            req.trace.finish(cancelled=True)
+        self._heap.clear()
+        self.generation += 1
+        self.counters["cancelled"] += cancelled
+        return cancelled
+
+    def is_current(self, req: ScheduledRequest) -> bool:
+        return req.generation == self.generation
+
+    def metrics(self) -> Dict[str, float]:
+        waits = sorted(self._waits)
+        m: Dict[str, float] = dict(self.counters, depth=len(self._heap))
+        if waits:
+            m["wait_p50"] = waits[len(waits) // 2]
+            m["wait_p95"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        return m
+
+
+class GeminiWorker(QObject):
+    """
+    One model request, run on a pooled thread (see GeminiHandler). Created on the
+    UI thread, so its signals are delivered there as queued events; completed
+    is always emitted last.
+    """
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
+    chunk_signal = pyqtSignal(str)
+    first_token_signal = pyqtSignal(float)  # seconds from submission to first chunk
+    completed = pyqtSignal()
 
-    def __init__(self, chat_session, content: Union[str, List[Union[str, Image.Image]]]) -> None:
+    def __init__(
+        self,
+        chat_session,
+        content: Union[str, List[Any]],
+        prepare: Optional[Callable[[Any], Any]] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_key: Optional[Callable[[], str]] = None,
+        stream: bool = False,
+        context: Optional[ChatContext] = None,
+        trace: Trace = NULL_TRACE,
+    ) -> None:
         super().__init__()
         self.chat_session = chat_session
         self.content = content
+        self.prepare = prepare
+        self.cache = cache
+        self.cache_key = cache_key
+        self.stream = stream
+        self.context = context
+        self.trace = trace
+        self.submitted_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def latency(self) -> Dict[str, float]:
+        """Queue wait in the pool, run time and total, in seconds (after completion)."""
+        started = self.started_at or self.submitted_at
+        finished = self.finished_at or started
+        return {
+            "wait": started - self.submitted_at,
+            "run": finished - started,
+            "total": finished - self.submitted_at,
+        }
 
     def run(self) -> None:
+        self.started_at = time.perf_counter()
         try:
+            self._run()
+            # Trim history after the answer is out, before the next request
+            # (summaries are made in the background, see ChatContext)
+            if self.context is not None:
+                with self.trace.span("context"):
+                    self.context.maintain(self.chat_session)
+        finally:
+            self.finished_at = time.perf_counter()
+            self.completed.emit()
+
+    def _run(self) -> None:
+        try:
+            trace = self.trace
+            if self.context is not None:
+                self.context.apply_summary(self.chat_session)
+            # Content hashing happens here too (images can be large)
+            key = None
+            if self.cache is not None and self.cache_key:
+                with trace.span("cache_lookup"):
+                    key = self.cache_key()
+                    cached = self.cache.get(key)
+                if cached is not None:
+                    print(f"[ResponseCache] hit {self.cache.stats()}")
+                    trace.set(cache_hit=True)
+                    self._record_cached_turn(cached)
+                    self.finished_signal.emit(cached)
+                    return
+
+            content = self.content
+            # Heavy content preparation (e.g. frame diffing) runs here, off the UI thread
+            if self.prepare is not None:
+                with trace.span("prepare"):
+                    content = self.prepare(content)
+            # Wait for pending image encodes (started on the encoder pool)
+            if isinstance(content, list):
+                with trace.span("encode_wait"):
+                    content = [p.result().as_part() if isinstance(p, Future) else p for p in content]
             # Send message to existing chat session
-            response = self.chat_session.send_message(self.content)
-            self.finished_signal.emit(response.text)
+            if self.stream:
+                text = self._send_streaming(content)
+            else:
+                with trace.span("model"):
+                    response = self.chat_session.send_message(content)
+                    text = response.text
+            if key is not None:
+                self.cache.put(key, text)
+            self.finished_signal.emit(text)
         except Exception as e:
             self.error_signal.emit(str(e))
 
+    def _send_streaming(self, content: Any) -> str:
+        sent_at = time.perf_counter()
+        response = self.chat_session.send_message(content, stream=True)
+        pieces: List[str] = []
+        for chunk in response:
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. safety/finish metadata)
+                continue
+            if not piece:
+                continue
+            if not pieces:
+                first_at = time.perf_counter()
+                ttft = first_at - self.submitted_at
+                print(f"[GeminiWorker] Time to first token: {ttft:.2f}s")
+                self.trace.add("ttft", sent_at, first_at)
+                self.first_token_signal.emit(ttft)
+            pieces.append(piece)
+            self.chunk_signal.emit(piece)
+        # Make sure the chat history sees a complete response
+        if hasattr(response, "resolve"):
+            response.resolve()
+        if pieces:
+            self.trace.add("stream", first_at, time.perf_counter())
+        return "".join(pieces)
+
+    def _record_cached_turn(self, text: str) -> None:
+        """
+        Keep chat history consistent for follow-ups even though the model was not
+        called: the user turn holds the prompt and parts a miss would have sent,
+        with attachments as placeholders (what the history keeps of old turns).
+        """
+        parts = [self.content] if isinstance(self.content, str) else strip_media(self.content)[0]
+        try:
+            self.chat_session.history = list(self.chat_session.history) + [
+                {"role": "user", "parts": [p for p in parts if p]},
+                {"role": "model", "parts": [text]},
+            ]
+        except Exception as e:
+            print(f"[ResponseCache] Could not record cached turn in history: {e}")
+
 class GeminiHandler(QObject):
-    response_received = pyqtSignal(str)
+    response_received = pyqtSignal(str)  # full answer (also emitted at the end of a stream)
+    response_chunk = pyqtSignal(str)  # streamed piece of the answer
+    first_token = pyqtSignal(float)  # time to first token, seconds
     error_occurred = pyqtSignal(str)
     processing_started = pyqtSignal()
+    queue_changed = pyqtSignal(int)  # number of requests waiting
+    ready = pyqtSignal(bool)  # backend loaded (False: not configured / failed)
+    _backend_loaded = pyqtSignal(object)  # from the loader thread
 
     def __init__(self) -> None:
         super().__init__()
-        self.worker: Optional[GeminiWorker] = None
+        self.worker: Optional[GeminiWorker] = None  # request in flight for the current session
+        self._running: Set[GeminiWorker] = set()  # includes superseded workers still finishing
+        self.scheduler = RequestScheduler(REQUEST_QUEUE_SIZE, max_images=REQUEST_MAX_IMAGES)
+        # Long-lived request threads: no thread start per request. The current session
+        # runs one request at a time; superseded ones finish alongside it.
+        self._executor = ThreadPoolExecutor(max_workers=max(1, GEMINI_WORKERS), thread_name_prefix="gemini")
+        self._latencies: Deque[Dict[str, float]] = collections.deque(maxlen=100)
+        self.backend: Optional[ModelBackend] = None
         self.chat_session = None
+        self.context: Optional[ChatContext] = None
+        self.active_trace: Trace = NULL_TRACE  # trace of the request whose output is being shown
         self.system_instruction = SYSTEM_PROMPT
-        self._init_model()
+        self.image_encoder = ImageEncoder(
+            max_edge=IMAGE_MAX_EDGE,
+            token_budget=IMAGE_TOKEN_BUDGET,
+            fmt=IMAGE_FORMAT,
+            quality=IMAGE_QUALITY,
+            workers=IMAGE_ENCODE_WORKERS,
+        )
+        self.response_cache: Optional[ResponseCache] = None
+        if RESPONSE_CACHE:
+            self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SEC, RESPONSE_CACHE_PATH or None)
+        # Digest of the conversation so far; text follow-ups are only cached within the same context
+        self._context_digest = ""
+        # SDK import + client setup is slow: load it in the background, queue requests meanwhile
+        self._loaded = False
+        self._backend_loaded.connect(self._on_backend_loaded)
+        self._executor.submit(self._load_backend)
 
-    def _init_model(self) -> None:
-        if not GEMINI_API_KEY or "YOUR_API_KEY" in GEMINI_API_KEY:
-            print("API Key missing!")
-            return
-            
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(GEMINI_MODEL, system_instruction=self.system_instruction)
-        self.reset_session()
+    def _load_backend(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            backend = create_backend(self.system_instruction)
+        except Exception as e:
+            print(f"[ModelBackend] Failed to initialise: {e}")
+            backend = None
+        print(f"[ModelBackend] Loaded in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        self._backend_loaded.emit(backend)
+
+    def _on_backend_loaded(self, backend: Optional[ModelBackend]) -> None:
+        self.backend = backend
+        self._loaded = True
+        if backend is not None:
+            self._start_session()
+        self.ready.emit(backend is not None)
+        self._dispatch_next()
+        self.queue_changed.emit(len(self.scheduler))
+
+    def _start_session(self) -> None:
+        if self.context is not None:
+            self.context.close()
+        self.chat_session = self.backend.start_chat(history=[])
+        self.context = self._new_context()
+        self._context_digest = ""
 
     def reset_session(self) -> None:
-        """Reset current chat session."""
-        if hasattr(self, 'model'):
-             self.chat_session = self.model.start_chat(history=[])
+        """Reset current chat session; queued and in-flight requests are superseded."""
+        cancelled = self.scheduler.cancel_all()
+        if cancelled or self.worker is not None:
+            print(f"[Scheduler] Reset: {cancelled} queued request(s) cancelled, in-flight answer discarded")
+        # A superseded worker keeps running against the old session; don't wait for it
+        self.worker = None
+        self.active_trace = NULL_TRACE
+        self.queue_changed.emit(0)
+        if self.backend is not None:
+             self._start_session()
              print("Chat session reset.")
 
-    def send_request(self, content: Union[str, List[Image.Image]]) -> None:
+    def _new_context(self) -> ChatContext:
+        backend = self.backend
+        summarize = None
+        if CONTEXT_SUMMARY:
+            # One-off request outside the conversation
+            summarize = lambda text: backend.start_chat(history=[]).send_message(text).text
+        return ChatContext(CONTEXT_TOKEN_BUDGET, CONTEXT_KEEP_MEDIA_TURNS, CONTEXT_KEEP_TURNS, summarize)
+
+    def send_request(
+        self,
+        content: Union[str, Sequence[Union[Image.Image, StoredFrame]]],
+        use_cache: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        trace: Trace = NULL_TRACE,
+    ) -> None:
         """
-        Universal method: accepts list of images (with default prompt) or text.
+        Universal method: accepts images or buffered screenshots (with default prompt) or text.
+        Requests made while another is in flight are queued, not dropped.
+        use_cache=False bypasses the response cache for this request.
         """
-        # Check worker state
-        if self.worker:
-            try:
-                if self.worker.isRunning():
-                    print("Gemini busy.")
-                    return
-            except RuntimeError:
-                # If C++ object is gone but Python ref remains
-                self.worker = None
-            except Exception:
-                self.worker = None
+        if isinstance(content, (list, tuple)) and content and isinstance(content[0], (Image.Image, StoredFrame)):
+            req = ScheduledRequest("images", list(content), use_cache, priority, trace)
+        else:
+            req = ScheduledRequest("text", content, use_cache, priority, trace)
+        self._submit(req)
 
-        self.processing_started.emit()
-
-        final_content = content
-        
-        # If images provided, append a default "Solve this" prompt
-        if isinstance(content, list) and content and isinstance(content[0], Image.Image):
-            # Copy images
-            imgs = [img.copy() for img in content]
-            # Message: images + text
-            final_content = imgs + ["Analyze these screenshots and provide a solution."]
-        
-        self.worker = GeminiWorker(self.chat_session, final_content)
-        self.worker.finished_signal.connect(self._on_success)
-        self.worker.error_signal.connect(self._on_error)
-        # Clear Python reference before deleting C++ object
-        self.worker.finished.connect(self._cleanup_worker)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.start()
-
-    def send_audio(self, wav_bytes: bytes, prompt: str) -> None:
+    def send_audio(
+        self,
+        audio_bytes: Any,
+        prompt: str,
+        mime_type: str = "audio/wav",
+        use_cache: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        trace: Trace = NULL_TRACE,
+        prepare: Optional[Callable[[bytes], Any]] = None,
+    ) -> None:
         """
-        Send audio (wav) + prompt.
+        Send audio (wav/flac/ogg) + prompt.
+        use_cache=False bypasses the response cache for this request.
+        prepare(audio_bytes), if given, runs on the request worker and returns what
+        is uploaded instead (anything with .data and .mime_type, e.g. AudioPayload);
+        the cache key is taken from the audio as recorded. With prepare,
+        audio_bytes may also be a reference that prepare reads (e.g. a
+        HistoryClip); such requests skip the cache, there is no content to key on.
         """
-        if self.worker:
-            try:
-                if self.worker.isRunning():
-                    print("Gemini busy.")
-                    return
-            except RuntimeError:
-                self.worker = None
-            except Exception:
-                self.worker = None
-
-        self.processing_started.emit()
-       
         content = [
-            {"mime_type": "audio/wav", "data": wav_bytes},
+            {"mime_type": mime_type, "data": audio_bytes},
             prompt or AUDIO_PROMPT,
         ]
+        use_cache = use_cache and isinstance(audio_bytes, (bytes, bytearray))
+        reduce = partial(self._prepare_audio_content, prepare) if prepare is not None else None
+        self._submit(ScheduledRequest("audio", content, use_cache, priority, trace, reduce))
 
-        self.worker = GeminiWorker(self.chat_session, content)
-        self.worker.finished_signal.connect(self._on_success)
-        self.worker.error_signal.connect(self._on_error)
-        self.worker.finished.connect(self._cleanup_worker)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.start()
+    def _submit(self, req: ScheduledRequest) -> None:
+        if not self.scheduler.submit(req):
+            self.error_occurred.emit("Too many pending requests; this one was dropped")
+            return
+        self._dispatch_next()
+        self.queue_changed.emit(len(self.scheduler))
 
-    def _cleanup_worker(self) -> None:
-        """Clear worker reference after completion."""
-        self.worker = None
+    def _dispatch_next(self) -> None:
+        if self.worker is not None or not self._loaded:
+            return
+        if self.backend is None:
+            if len(self.scheduler):
+                self.scheduler.cancel_all()
+                self.error_occurred.emit("Model is not available (check GEMINI_API_KEY)")
+            return
+        req = self.scheduler.pop()
+        if req is None:
+            return
 
-    def _on_success(self, text: str) -> None:
+        self.active_trace = req.trace
+        self.processing_started.emit()
+
+        prepare = None
+        model = self.backend.name if self.backend is not None else ""
+        content = req.content
+        if req.kind == "images":
+            # Screenshots + fixed prompt are self-contained: key ignores chat context
+            content = req.content + [IMAGE_PROMPT]
+            prepare = self._prepare_image_content
+            cache_key = lambda: make_key(self.system_instruction, model, req.content, IMAGE_PROMPT)
+        elif req.kind == "audio":
+            prepare = req.prepare
+            cache_key = lambda: make_key(self.system_instruction, model, req.content)
+        else:
+            # Context is captured at dispatch, after all earlier answers arrived
+            context = self._context_digest
+            cache_key = lambda: make_key(self.system_instruction, model, context, req.content)
+
+        self._start_worker(req, content, prepare, cache_key if req.use_cache else None)
+
+    def _prepare_image_content(self, content: List[Union[Image.Image, StoredFrame, str]]) -> List[Any]:
+        """
+        Runs on the worker thread: diff consecutive frames (crops of changed regions),
+        then queue every image part on the encoder pool; the prompt stays last.
+        Buffered screenshots stay compact; each is decompressed only while it is
+        diffed or encoded.
+        """
+        frames = [p for p in content if not isinstance(p, str)]
+        prompt = [p for p in content if isinstance(p, str)]
+        parts: List[Any] = list(frames)
+        if FRAME_DIFF and len(frames) > 1:
+            from services.frame_diff import build_diff_content  # NumPy: keep off the startup path
+
+            # Decoded one at a time; frames sent in full go to the encoder in stored form
+            parts = build_diff_content(
+                (f.image() if isinstance(f, StoredFrame) else f for f in frames),
+                tile=FRAME_DIFF_TILE,
+                threshold=FRAME_DIFF_THRESHOLD,
+                max_changed_ratio=FRAME_DIFF_MAX_RATIO,
+                cost=self.image_encoder.estimate_tokens,
+                full_frames=frames,
+            )
+        # Downscale/compress in the encoder pool; the worker waits on the futures
+        parts = [self.image_encoder.submit(p) if isinstance(p, (Image.Image, StoredFrame)) else p for p in parts]
+        # Message: images + text
+        return parts + prompt
+
+    @staticmethod
+    def _prepare_audio_content(prepare: Callable[[bytes], Any], parts: List[Any]) -> List[Any]:
+        """Runs on the worker thread: reduce the recorded audio for upload (downmix, VAD, resample, encode)."""
+        audio, prompt = parts
+        payload = prepare(audio["data"])
+        return [{"mime_type": payload.mime_type, "data": payload.data}, prompt]
+
+    def _start_worker(
+        self,
+        req: ScheduledRequest,
+        content: Any,
+        prepare: Optional[Callable[[Any], Any]],
+        cache_key: Optional[Callable[[], str]],
+    ) -> None:
+        worker = GeminiWorker(
+            self.chat_session, content, prepare, self.response_cache, cache_key,
+            stream=STREAM_RESPONSES, context=self.context, trace=req.trace,
+        )
+        worker.finished_signal.connect(partial(self._on_success, req))
+        worker.error_signal.connect(partial(self._on_error, req))
+        worker.chunk_signal.connect(partial(self._on_chunk, req))
+        worker.first_token_signal.connect(partial(self._on_first_token, req))
+        worker.completed.connect(partial(self._on_worker_completed, worker))
+        self.worker = worker
+        self._running.add(worker)
+        self._executor.submit(worker.run)
+
+    def _on_worker_completed(self, worker: GeminiWorker) -> None:
+        """Record latency, forget the worker and start the next queued request."""
+        latency = worker.latency
+        self._latencies.append(latency)
+        print(
+            f"[GeminiPool] Request done: wait {latency['wait'] * 1000:.1f} ms, "
+            f"run {latency['run']:.2f}s, total {latency['total']:.2f}s"
+        )
+        self._running.discard(worker)
+        if worker is self.worker:
+            self.worker = None
+            self.active_trace = NULL_TRACE
+        worker.trace.finish()
+        self._dispatch_next()
+        self.queue_changed.emit(len(self.scheduler))
+
+    def metrics(self) -> Dict[str, float]:
+        """Scheduler counters plus p50/p95 per-request latency (seconds)."""
+        m = self.scheduler.metrics()
+        for name in ("wait", "run", "total"):
+            values = sorted(lat[name] for lat in self._latencies)
+            if values:
+                m[f"task_{name}_p50"] = values[len(values) // 2]
+                m[f"task_{name}_p95"] = values[min(len(values) - 1, int(len(values) * 0.95))]
+        return m
+
+    def shutdown(self) -> None:
+        """Stop accepting work; requests in flight are abandoned."""
+        self.scheduler.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.image_encoder.shutdown()
+        if self.context is not None:
+            self.context.close()
+
+    def _on_chunk(self, req: ScheduledRequest, text: str) -> None:
+        if self.scheduler.is_current(req):
+            self.response_chunk.emit(text)
+
+    def _on_first_token(self, req: ScheduledRequest, seconds: float) -> None:
+        if self.scheduler.is_current(req):
+            self.first_token.emit(seconds)
+
+    def _on_success(self, req: ScheduledRequest, text: str) -> None:
+        if not self.scheduler.is_current(req):
+            print("[Scheduler] Discarded answer for a superseded request")
+            req.trace.set(superseded=True)
+            return
+        self._context_digest = make_key(self._context_digest, text)
+        req.trace.set(answer_chars=len(text))
         self.response_received.emit(text)
 
-    def _on_error(self, error_msg: str) -> None:
-        self.error_occurred.emit(error_msg)
+    def _on_error(self, req: ScheduledRequest, error_msg: str) -> None:
+        req.trace.set(error=error_msg)
+        if self.scheduler.is_current(req):
+            self.error_occurred.emit(error_msg)
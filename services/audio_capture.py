@@ -0,0 +1,112 @@
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+# Capture sources feeding a PCM16 ring writer: the WASAPI loopback device
+# (miniaudio) or a synthetic, clock-paced source for tests and benchmarks.
+# Shared by the in-process recorder thread and the recorder child process.
+
+Writer = Callable[[Any], None]
+StopFlag = Callable[[], bool]
+
+
+def _miniaudio():
+    import miniaudio
+    return miniaudio
+
+
+def device_format(samplerate_hint: int) -> Tuple[int, int]:
+    """(samplerate, channels) of the default capture device's first format."""
+    ma = _miniaudio()
+    captures = ma.Devices(backends=[ma.Backend.WASAPI]).get_captures()
+    if not captures:
+        raise RuntimeError("capture devices not found")
+    fmt = captures[0].get("formats", [{}])[0]
+    sr = int(fmt.get("samplerate", samplerate_hint) or samplerate_hint)
+    ch = int(fmt.get("channels", 2) or 2)
+    return sr, ch
+
+
+def run_device(write: Writer, samplerate: int, channels: int, stop: StopFlag) -> None:
+    """Capture from the default WASAPI device into write() until stop() is true."""
+    ma = _miniaudio()
+
+    def gen():
+        while True:
+            data = yield
+            write(data)
+            if stop():
+                return
+
+    g = gen()
+    next(g)
+
+    with ma.CaptureDevice(
+        input_format=ma.SampleFormat.SIGNED16,
+        nchannels=channels,
+        sample_rate=samplerate,
+        backends=[ma.Backend.WASAPI],
+    ) as cap:
+        cap.start(g)
+        while not stop():
+            time.sleep(0.1)
+        cap.stop()
+
+
+class SyntheticSource:
+    """
+    Stand-in for a capture device: delivers block_frames of PCM16 (tone + noise)
+    every block period on the real-time clock. Like a device with
+    device_buffer_ms of buffering, a consumer that comes back later than that
+    loses the overflowed blocks (overrun); those are counted as dropped.
+    """
+
+    def __init__(
+        self,
+        samplerate: int = 48000,
+        channels: int = 2,
+        block_frames: int = 480,
+        device_buffer_ms: float = 30.0,
+    ) -> None:
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block_frames = block_frames
+        self.device_buffer = device_buffer_ms / 1000
+        self.delivered = 0
+        self.dropped = 0
+        self.max_late = 0.0
+        # One second of signal, handed out block by block
+        rng = np.random.default_rng(1)
+        t = np.arange(samplerate) / samplerate
+        signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.02 * rng.standard_normal(t.size)
+        pcm = (np.repeat(signal[:, None], channels, axis=1) * 32767).astype(np.int16)
+        self._blocks = [pcm[i:i + block_frames].tobytes() for i in range(0, samplerate - block_frames + 1, block_frames)]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.delivered + self.dropped
+        return {
+            "delivered_blocks": self.delivered,
+            "dropped_blocks": self.dropped,
+            "dropout_pct": round(self.dropped / total * 100, 3) if total else 0.0,
+            "max_late_ms": round(self.max_late * 1000, 2),
+        }
+
+    def run(self, write: Writer, stop: StopFlag) -> None:
+        period = self.block_frames / self.samplerate
+        due = time.perf_counter() + period
+        while not stop():
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+                continue
+            late = now - due
+            self.max_late = max(self.max_late, late)
+            if late > self.device_buffer:
+                # The device buffer overflowed while nobody was reading
+                lost = int((late - self.device_buffer) / period) + 1
+                self.dropped += lost
+                due += lost * period
+            write(self._blocks[self.delivered % len(self._blocks)])
+            self.delivered += 1
+            due += period
@@ -0,0 +1,395 @@
+import collections
+import mmap
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Long-horizon audio history on disk, as a sequence of fixed-length segments:
+#
+#   head            64-byte header, memory-mapped by the writer and readers
+#   seg_00000042    raw PCM16 of segment 42 (preallocated, memory-mapped while written)
+#   seg_00000042.z  the same segment once sealed with zlib compression
+#
+# Segment k always holds frames [k * segment_frames, (k + 1) * segment_frames)
+# of the session, so locating any frame is arithmetic: no scan, no lookup
+# table. The writer publishes the total frame count with one aligned 64-bit
+# store after copying; readers only read frames below it. Retention advances
+# the first kept segment in the header before deleting files.
+
+_H_MAGIC, _H_SR, _H_CH, _H_SEGMENT_FRAMES, _H_WRITTEN, _H_FIRST_KEPT = range(6)
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+MAGIC = 0x41554849  # "AUHI"
+HEAD_NAME = "head"
+
+
+def _segment_path(root: Path, k: int, compressed: bool = False) -> Path:
+    return root / (f"seg_{k:08d}.z" if compressed else f"seg_{k:08d}")
+
+
+class _Sealed(NamedTuple):
+    index: int
+    path: Path
+    nbytes: int
+    sealed_at: float  # wall clock
+
+
+class HistoryClip(NamedTuple):
+    """Frames [start, stop) of the history, fixed when requested and read later (iter_pcm)."""
+    start: int
+    stop: int
+    samplerate: int
+    channels: int
+
+
+class HistoryWriter:
+    """
+    Appends PCM16 blocks to the segmented history (capture thread).
+    Only the current segment is mapped, so memory stays constant however long
+    the history is. Full segments are sealed on a background thread:
+    compressed (compress_level > 0), then dropped oldest-first once the
+    history is older than max_age_sec or bigger than max_bytes (0 = no limit).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_sec: float = 10.0,
+        compress_level: int = 1,
+        max_age_sec: float = 3600.0,
+        max_bytes: int = 0,
+    ) -> None:
+        self.root = Path(directory)
+        self.segment_sec = segment_sec
+        self.compress_level = compress_level
+        self.max_age_sec = max_age_sec
+        self.max_bytes = max_bytes
+        self._sealed: Deque[_Sealed] = collections.deque()
+        self._sealed_bytes = 0
+        self._sealer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-history")
+        self._lock = threading.Lock()  # sealed index (sealer thread vs stats())
+        self._head_file: Any = None
+        self._head: Optional[mmap.mmap] = None
+        self._hdr: Optional[np.ndarray] = None
+        self._seg_file: Any = None
+        self._seg: Optional[mmap.mmap] = None
+        self._seg_index = -1
+        self._written = 0
+        self._frame_bytes = 4
+        self._segment_frames = 0
+
+    def open(self, samplerate: int, channels: int) -> None:
+        """Start a new session history (previous segments are removed)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for path in self.root.glob("seg_*"):
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"[AudioHistory] Could not remove {path.name}: {e}")
+        # The head is rewritten in place: a reader may still have it mapped
+        head_path = self.root / HEAD_NAME
+        self._head_file = open(head_path, "r+b" if head_path.exists() else "w+b")
+        self._head_file.truncate(HEADER_BYTES)
+        self._head = mmap.mmap(self._head_file.fileno(), HEADER_BYTES)
+        self._hdr = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self._head)
+        self._frame_bytes = channels * 2
+        self._segment_frames = max(1, int(self.segment_sec * samplerate))
+        self._hdr[:] = 0
+        self._hdr[_H_SR] = samplerate
+        self._hdr[_H_CH] = channels
+        self._hdr[_H_SEGMENT_FRAMES] = self._segment_frames
+        self._hdr[_H_MAGIC] = MAGIC
+        self._open_segment(0)
+        age = f"{self.max_age_sec:.0f}s" if self.max_age_sec > 0 else "off"
+        size = f"{self.max_bytes // 2**20} MB" if self.max_bytes > 0 else "off"
+        print(
+            f"[AudioHistory] Recording to {self.root} ({self.segment_sec:.0f}s segments, "
+            f"zlib {self.compress_level or 'off'}, max age {age}, max size {size})"
+        )
+
+    def write(self, data: Any) -> None:
+        """Append raw interleaved PCM16 (any buffer-protocol object)."""
+        if self._seg is None:
+            return
+        src = memoryview(data).cast("B")
+        fb = self._frame_bytes
+        frames = src.nbytes // fb
+        pos = 0
+        while pos < frames:
+            offset = self._written - self._seg_index * self._segment_frames
+            n = min(frames - pos, self._segment_frames - offset)
+            self._seg[offset * fb:(offset + n) * fb] = src[pos * fb:(pos + n) * fb]
+            pos += n
+            self._written += n
+            self._hdr[_H_WRITTEN] = self._written  # publish
+            if offset + n == self._segment_frames:
+                self._rotate()
+
+    def close(self) -> None:
+        self._close_segment()
+        self._sealer.shutdown(wait=True)
+        if self._head is not None:
+            self._hdr = None
+            self._head.close()
+            self._head = None
+        if self._head_file is not None:
+            self._head_file.close()
+            self._head_file = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            sealed, nbytes = len(self._sealed), self._sealed_bytes
+        return {
+            "frames": self._written,
+            "sealed_segments": sealed,
+            "disk_mb": round(nbytes / 2**20, 2),
+        }
+
+    def _open_segment(self, k: int) -> None:
+        self._seg_file = open(_segment_path(self.root, k), "w+b")
+        self._seg_file.truncate(self._segment_frames * self._frame_bytes)
+        self._seg = mmap.mmap(self._seg_file.fileno(), self._segment_frames * self._frame_bytes)
+        self._seg_index = k
+
+    def _close_segment(self) -> None:
+        if self._seg is not None:
+            self._seg.close()
+            self._seg_file.close()
+            self._seg = None
+
+    def _rotate(self) -> None:
+        k = self._seg_index
+        self._close_segment()
+        self._sealer.submit(self._seal, k)
+        self._open_segment(k + 1)
+
+    def _seal(self, k: int) -> None:
+        """Sealer thread: compress a full segment, then apply retention."""
+        path = _segment_path(self.root, k)
+        try:
+            if self.compress_level > 0:
+                packed = _segment_path(self.root, k, compressed=True)
+                tmp = packed.with_suffix(".tmp")
+                tmp.write_bytes(zlib.compress(path.read_bytes(), self.compress_level))
+                os.replace(tmp, packed)  # readers look for .z first, then raw
+                try:
+                    path.unlink()
+                except OSError as e:  # e.g. open in a reader on Windows; the .z copy is used
+                    print(f"[AudioHistory] Could not remove raw segment {k}: {e}")
+                path = packed
+            entry = _Sealed(k, path, path.stat().st_size, time.time())
+        except OSError as e:
+            print(f"[AudioHistory] Failed to seal segment {k}: {e}")
+            return
+        with self._lock:
+            self._sealed.append(entry)
+            self._sealed_bytes += entry.nbytes
+        self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        cutoff = time.time() - self.max_age_sec if self.max_age_sec > 0 else None
+        while True:
+            with self._lock:
+                if not self._sealed:
+                    return
+                oldest = self._sealed[0]
+                too_big = self.max_bytes > 0 and self._sealed_bytes > self.max_bytes
+                too_old = cutoff is not None and oldest.sealed_at < cutoff
+                if not (too_big or too_old):
+                    return
+                self._sealed.popleft()
+                self._sealed_bytes -= oldest.nbytes
+            # Readers stop asking for the segment before its file goes away
+            if self._hdr is not None:
+                self._hdr[_H_FIRST_KEPT] = oldest.index + 1
+            try:
+                oldest.path.unlink()
+            except OSError as e:
+                print(f"[AudioHistory] Could not remove {oldest.path.name}: {e}")
+
+
+class HistoryReader:
+    """
+    Reads frame ranges of the history written by a HistoryWriter, in this or
+    another process: only the header is mapped; each touched segment is read
+    with one seek (raw) or one decompression (sealed), straight into the
+    result buffer.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.root = Path(directory)
+        self._head: Optional[mmap.mmap] = None
+        self._hdr: Optional[np.ndarray] = None
+
+    def _header(self) -> Optional[np.ndarray]:
+        if self._hdr is None:
+            try:
+                with open(self.root / HEAD_NAME, "rb") as f:
+                    self._head = mmap.mmap(f.fileno(), HEADER_BYTES, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+            self._hdr = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self._head)
+        return self._hdr if self._hdr[_H_MAGIC] == MAGIC else None
+
+    @property
+    def samplerate(self) -> int:
+        hdr = self._header()
+        return int(hdr[_H_SR]) if hdr is not None else 0
+
+    @property
+    def channels(self) -> int:
+        hdr = self._header()
+        return int(hdr[_H_CH]) if hdr is not None else 0
+
+    def span(self) -> Tuple[int, int]:
+        """(first, end) frame numbers currently readable."""
+        hdr = self._header()
+        if hdr is None:
+            return 0, 0
+        return int(hdr[_H_FIRST_KEPT]) * int(hdr[_H_SEGMENT_FRAMES]), int(hdr[_H_WRITTEN])
+
+    @property
+    def seconds_available(self) -> float:
+        first, end = self.span()
+        sr = self.samplerate
+        return (end - first) / sr if sr else 0.0
+
+    def read_ago(
+        self,
+        from_sec: float,
+        to_sec: float = 0.0,
+        prefix: Optional[Callable[[int], bytes]] = None,
+    ) -> Optional[bytearray]:
+        """
+        Audio from `from_sec` to `to_sec` seconds before the newest frame
+        (clamped to what is kept), as prefix(n_frames) + PCM16 in one
+        bytearray, filled in place (no further copy); None if nothing is available.
+        """
+        sr = self.samplerate
+        if not sr:
+            return None
+        _, end = self.span()
+        return self.read_frames(end - int(from_sec * sr), end - int(to_sec * sr), prefix)
+
+    def clip_ago(self, from_sec: float, to_sec: float = 0.0) -> Optional[HistoryClip]:
+        """The frame range of read_ago(from_sec, to_sec) as of now, without reading it."""
+        sr = self.samplerate
+        if not sr:
+            return None
+        first, end = self.span()
+        start, stop = max(first, end - int(from_sec * sr)), end - int(to_sec * sr)
+        if stop <= start:
+            return None
+        return HistoryClip(start, stop, sr, self.channels)
+
+    def iter_pcm(self, clip: HistoryClip, chunk_sec: float = 10.0) -> Iterator[np.ndarray]:
+        """
+        The clip as consecutive (frames x channels) int16 chunks of chunk_sec,
+        read one at a time (memory stays at one chunk); frames that retention
+        removed meanwhile are skipped.
+        """
+        step = max(1, int(chunk_sec * clip.samplerate))
+        for pos in range(clip.start, clip.stop, step):
+            data = self.read_frames(pos, min(clip.stop, pos + step))
+            if data is not None:
+                yield np.frombuffer(data, dtype=np.int16).reshape(-1, clip.channels)
+
+    def read_pcm_ago(self, from_sec: float, to_sec: float = 0.0) -> Optional[np.ndarray]:
+        """Like read_ago, as a (frames x channels) int16 array."""
+        data = self.read_ago(from_sec, to_sec)
+        if data is None:
+            return None
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+
+    def read_frames(
+        self,
+        start: int,
+        stop: int,
+        prefix: Optional[Callable[[int], bytes]] = None,
+    ) -> Optional[bytearray]:
+        """Frames [start, stop) of the session, clamped; see read_ago."""
+        hdr = self._header()
+        if hdr is None:
+            return None
+        seg_frames, fb = int(hdr[_H_SEGMENT_FRAMES]), int(hdr[_H_CH]) * 2
+        for _ in range(3):
+            first, end = self.span()
+            lo, hi = max(start, first), min(stop, end)
+            if hi <= lo:
+                return None
+            head = prefix(hi - lo) if prefix is not None else b""
+            out = bytearray(len(head) + (hi - lo) * fb)
+            out[: len(head)] = head
+            view = memoryview(out)[len(head):]
+            try:
+                pos = lo
+                while pos < hi:
+                    k = pos // seg_frames
+                    n = min(hi, (k + 1) * seg_frames) - pos
+                    dst = view[(pos - lo) * fb:(pos - lo + n) * fb]
+                    self._read_segment(k, (pos - k * seg_frames) * fb, dst)
+                    pos += n
+            except FileNotFoundError:
+                continue  # retention removed a segment meanwhile: clamp again
+            return out
+        return None
+
+    def _read_segment(self, k: int, offset: int, dst: memoryview) -> None:
+        # Sealing writes .z before removing the raw file: check .z, raw, then .z again
+        packed = _segment_path(self.root, k, compressed=True)
+        for path in (packed, _segment_path(self.root, k), packed):
+            try:
+                with open(path, "rb") as f:
+                    if path is packed:
+                        dst[:] = memoryview(zlib.decompress(f.read()))[offset:offset + dst.nbytes]
+                    else:
+                        f.seek(offset)
+                        f.readinto(dst)
+                return
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"segment {k} not found")
+
+    def close(self) -> None:
+        if self._head is not None:
+            self._hdr = None
+            self._head.close()
+            self._head = None
+
+
+def open_history(settings: Optional[Dict[str, Any]], samplerate: int, channels: int) -> Optional[HistoryWriter]:
+    """A HistoryWriter opened for this format, or None (disabled, or it could not be opened)."""
+    if settings is None:
+        return None
+    writer = HistoryWriter(**settings)
+    try:
+        writer.open(samplerate, channels)
+    except (OSError, ValueError) as e:
+        print(f"[AudioHistory] Disabled, could not open {writer.root}: {e}")
+        writer.close()
+        return None
+    return writer
+
+
+def tee(write: Callable[[Any], None], history: Optional[HistoryWriter]) -> Callable[[Any], None]:
+    """write() followed by history.write(); a failing history (disk full) is dropped, capture goes on."""
+    if history is None:
+        return write
+    failed = []
+
+    def both(data: Any) -> None:
+        write(data)
+        if not failed:
+            try:
+                history.write(data)
+            except (OSError, ValueError) as e:
+                failed.append(e)
+                print(f"[AudioHistory] Disabled after write error: {e}")
+
+    return both
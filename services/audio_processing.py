@@ -0,0 +1,319 @@
+import io
+import math
+import struct
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(num_frames: int, samplerate: int, channels: int, sample_width: int = 2) -> bytes:
+    """
+    Canonical 44-byte RIFF/WAVE header for integer PCM.
+    """
+    block_align = channels * sample_width
+    data_size = num_frames * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt chunk size
+        1,  # PCM
+        channels,
+        samplerate,
+        samplerate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_size,
+    )
+
+
+def encode_wav(pcm, samplerate: int, channels: int) -> bytes:
+    """
+    Build WAV bytes in memory from interleaved PCM16 (ndarray or any buffer-protocol object).
+    """
+    data = memoryview(pcm).cast("B")
+    num_frames = data.nbytes // (channels * 2)
+    return b"".join((wav_header(num_frames, samplerate, channels), data))
+
+
+def parse_wav(data: Any) -> Tuple[np.ndarray, int, int]:
+    """
+    (frames x channels int16 view, samplerate, channels) of PCM16 WAV bytes with
+    the canonical 44-byte header (as built by wav_header); no copy.
+    """
+    riff, _, wave_id, _, _, tag, channels, samplerate, _, _, bits, data_id, size = struct.unpack_from(
+        "<4sI4s4sIHHIIHH4sI", data
+    )
+    if riff != b"RIFF" or wave_id != b"WAVE" or tag != 1 or bits != 16 or data_id != b"data":
+        raise ValueError("not a canonical PCM16 WAV")
+    pcm = np.frombuffer(data, dtype=np.int16, count=size // 2, offset=WAV_HEADER_SIZE)
+    return pcm.reshape(-1, channels), samplerate, channels
+
+
+# -------- Upload payload reduction --------
+
+AUDIO_MIME_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "opus": "audio/ogg",
+}
+
+
+class AudioPayload(NamedTuple):
+    data: bytes
+    mime_type: str
+    samplerate: int
+    channels: int
+    duration_sec: float
+    bytes_before: int
+    bytes_after: int
+
+
+def downmix_to_mono(pcm: np.ndarray) -> np.ndarray:
+    """
+    frames x channels int16 -> frames float32 in [-1, 1] (channel average).
+    """
+    if pcm.ndim == 1:
+        return pcm.astype(np.float32) / 32768.0
+    mono = pcm.mean(axis=1, dtype=np.float32)
+    mono /= 32768.0
+    return mono
+
+
+def resample(signal: np.ndarray, sr_in: int, sr_out: int) -> np.ndarray:
+    """
+    Band-limited resampling of a 1-D or frames x channels float signal via the FFT
+    (spectrum truncated/zero-padded to the new length, so downsampling is anti-aliased).
+    """
+    if sr_in == sr_out or signal.shape[0] == 0:
+        return signal
+    n_in = signal.shape[0]
+    n_out = max(1, int(round(n_in * sr_out / sr_in)))
+    spectrum = np.fft.rfft(signal, axis=0)
+    keep = min(spectrum.shape[0], n_out // 2 + 1)
+    out = np.fft.irfft(spectrum[:keep], n=n_out, axis=0)
+    out *= n_out / n_in
+    return out.astype(np.float32, copy=False)
+
+
+class StreamResampler:
+    """
+    resample() for a signal fed in pieces (1-D or frames x channels, float):
+    blocks of ~block_sec are FFT-resampled with margin_sec of real signal on
+    both sides and cropped back to the block, so memory stays at one block
+    however long the input, and the output matches resampling the whole signal
+    at once except for the negligible tails of the ideal filter beyond the margin.
+    """
+
+    def __init__(self, sr_in: int, sr_out: int, block_sec: float = 5.0, margin_sec: float = 0.25) -> None:
+        self.sr_in = sr_in
+        self.sr_out = sr_out
+        # Block and margin are whole resampling periods, so every cut is exact
+        g = math.gcd(sr_in, sr_out)
+        self._step_in, self._step_out = sr_in // g, sr_out // g
+        self._block = max(1, int(block_sec * sr_in) // self._step_in) * self._step_in
+        self._margin = max(1, int(margin_sec * sr_in) // self._step_in) * self._step_in
+        self._buf: Optional[np.ndarray] = None  # input from frame _base on
+        self._base = 0
+        self._done = 0  # input frames already turned into output
+        self._total = 0
+
+    def push(self, signal: np.ndarray) -> np.ndarray:
+        """Feed the next piece; returns the output that is final so far (may be empty)."""
+        if self.sr_in == self.sr_out:
+            return signal
+        self._buf = signal if self._buf is None else np.concatenate((self._buf, signal))
+        self._total += signal.shape[0]
+        out = []
+        while self._total - self._done >= self._block + self._margin:
+            out.append(self._emit(self._done + self._block + self._margin, self._block * self._step_out // self._step_in))
+            self._done += self._block
+            drop = max(0, self._done - self._margin) - self._base
+            self._buf = self._buf[drop:]
+            self._base += drop
+        return np.concatenate(out) if out else self._buf[:0]
+
+    def flush(self) -> np.ndarray:
+        """Output for the rest of the input (call once, at the end)."""
+        if self.sr_in == self.sr_out or self._buf is None or self._total == self._done:
+            return np.zeros((0,) + (self._buf.shape[1:] if self._buf is not None else ()), dtype=np.float32)
+        want = int(round(self._total * self.sr_out / self.sr_in)) - self._done * self._step_out // self._step_in
+        return self._emit(self._total, want)
+
+    def _emit(self, hi: int, frames_out: int) -> np.ndarray:
+        lo = max(0, self._done - self._margin)
+        piece = resample(self._buf[lo - self._base: hi - self._base], self.sr_in, self.sr_out)
+        offset = (self._done - lo) * self._step_out // self._step_in
+        return piece[offset: offset + frames_out]
+
+
+def to_pcm16(signal: np.ndarray) -> np.ndarray:
+    return (np.clip(signal, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def trim_silence(
+    signal: np.ndarray,
+    samplerate: int,
+    frame_ms: float = 20.0,
+    margin_db: float = 10.0,
+    floor_db: float = -50.0,
+    pad_ms: float = 200.0,
+    max_gap_ms: float = 600.0,
+) -> np.ndarray:
+    """
+    Energy-based voice activity trimming of a float signal (1-D or frames x channels):
+    - frame RMS in dB; active = above max(noise floor + margin, absolute floor)
+    - activity is padded by pad_ms on both sides (keeps word onsets/tails)
+    - leading/trailing silence is dropped, internal gaps are shortened to max_gap_ms
+    Returns the input unchanged if no activity is found.
+    """
+    frame = max(1, int(samplerate * frame_ms / 1000))
+    n = signal.shape[0] // frame
+    if n == 0:
+        return signal
+    frames = signal[: n * frame].reshape(n, -1)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    db = 20.0 * np.log10(rms + 1e-10)
+    threshold = max(float(np.percentile(db, 10)) + margin_db, floor_db)
+    active = db > threshold
+    if not active.any():
+        return signal
+
+    pad = int(pad_ms / frame_ms)
+    if pad > 0:
+        active = np.convolve(active, np.ones(2 * pad + 1, dtype=bool), mode="same") > 0
+
+    # Inactive runs as [start, end) frame ranges
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], (~active).view(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    max_gap = int(max_gap_ms / frame_ms)
+    leading = starts == 0
+    trailing = ends == n
+    inner = ~(leading | trailing) & (ends - starts > max_gap)
+    # Drop whole leading/trailing runs; keep the edges of long inner gaps
+    half = max_gap // 2
+    drop_starts = np.where(inner, starts + half, starts)
+    drop_ends = np.where(inner, ends - (max_gap - half), ends)
+    sel = leading | trailing | inner
+    delta = np.zeros(n + 1, dtype=np.int32)
+    np.add.at(delta, drop_starts[sel], 1)
+    np.add.at(delta, drop_ends[sel], -1)
+    keep = np.cumsum(delta[:n]) == 0
+
+    # Gather kept runs with slice copies (far cheaper than a per-sample boolean mask)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], keep.view(np.int8), [0]))))
+    bounds = edges.reshape(-1, 2) * frame
+    if keep[-1]:
+        # Remainder after the last whole frame follows that frame
+        bounds[-1, 1] = signal.shape[0]
+    return np.concatenate([signal[a:b] for a, b in bounds])
+
+
+def _encode_with_soundfile(pcm16: np.ndarray, samplerate: int, fmt: str) -> Optional[bytes]:
+    try:
+        import soundfile as sf
+    except ImportError:
+        print(f"[AudioProcessing] soundfile not installed; '{fmt}' unavailable, sending WAV")
+        return None
+    buf = io.BytesIO()
+    try:
+        if fmt == "flac":
+            sf.write(buf, pcm16, samplerate, format="FLAC", subtype="PCM_16")
+        else:
+            sf.write(buf, pcm16, samplerate, format="OGG", subtype="OPUS")
+    except Exception as e:
+        print(f"[AudioProcessing] {fmt} encode failed ({e}); sending WAV")
+        return None
+    return buf.getvalue()
+
+
+def reduce_audio(
+    chunks: Iterable[np.ndarray],
+    samplerate: int,
+    mono: bool = True,
+    target_samplerate: Optional[int] = 16000,
+    fmt: str = "wav",
+    vad: bool = False,
+    vad_max_gap_ms: float = 600.0,
+    max_bytes: int = 0,
+) -> AudioPayload:
+    """
+    Shrink PCM16 audio, given as consecutive frames x channels chunks, for upload:
+    downmix and resample chunk by chunk -> trim silence (optional) -> encode
+    (wav / flac / opus). Only the reduced signal is ever held whole. With
+    max_bytes, the newest audio that fits as 16-bit PCM is kept.
+    """
+    sr = target_samplerate if target_samplerate and target_samplerate < samplerate else samplerate
+    resampler = StreamResampler(samplerate, sr)
+    pieces: List[np.ndarray] = []
+    frames = channels = 0
+    for pcm in chunks:
+        if pcm.ndim == 1:
+            pcm = pcm.reshape(-1, 1)
+        frames += pcm.shape[0]
+        channels = pcm.shape[1]
+        if mono and channels > 1:
+            signal = downmix_to_mono(pcm)
+        else:
+            signal = pcm.astype(np.float32) / 32768.0
+            if channels == 1:
+                signal = signal.reshape(-1)
+        pieces.append(resampler.push(signal))
+    pieces.append(resampler.flush())
+    bytes_before = WAV_HEADER_SIZE + frames * channels * 2
+    channels = 1 if mono else max(1, channels)
+    signal = np.concatenate(pieces) if frames else np.zeros(0, dtype=np.float32)
+    del pieces
+
+    if vad:
+        signal = trim_silence(signal, sr, max_gap_ms=vad_max_gap_ms)
+
+    pcm16 = to_pcm16(signal)
+    del signal
+    if max_bytes:
+        limit = max(0, (max_bytes - WAV_HEADER_SIZE) // (channels * 2))
+        if pcm16.shape[0] > limit:
+            print(f"[AudioProcessing] Upload capped at {max_bytes // 1024} KB: keeping the last {limit / sr:.1f}s")
+            pcm16 = pcm16[pcm16.shape[0] - limit:]
+    fmt = fmt.strip().lower()
+    data = None
+    if fmt in ("flac", "opus"):
+        data = _encode_with_soundfile(pcm16, sr, fmt)
+    if data is None:
+        fmt = "wav"
+        data = encode_wav(pcm16, sr, channels)
+
+    return AudioPayload(
+        data=data,
+        mime_type=AUDIO_MIME_TYPES[fmt],
+        samplerate=sr,
+        channels=channels,
+        duration_sec=pcm16.shape[0] / sr,
+        bytes_before=bytes_before,
+        bytes_after=len(data),
+    )
+
+
+def prepare_audio_payload(
+    pcm: np.ndarray,
+    samplerate: int,
+    mono: bool = True,
+    target_samplerate: Optional[int] = 16000,
+    fmt: str = "wav",
+    vad: bool = False,
+    vad_max_gap_ms: float = 600.0,
+    max_bytes: int = 0,
+    chunk_sec: float = 10.0,
+) -> AudioPayload:
+    """
+    Shrink a frames x channels PCM16 snapshot for upload (reduce_audio over
+    chunk_sec slices of it).
+    """
+    step = max(1, int(chunk_sec * samplerate))
+    chunks = (pcm[i:i + step] for i in range(0, max(1, pcm.shape[0]), step))
+    return reduce_audio(chunks, samplerate, mono, target_samplerate, fmt, vad, vad_max_gap_ms, max_bytes)
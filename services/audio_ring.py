@@ -0,0 +1,132 @@
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+class PcmRing:
+    """
+    Fixed-capacity PCM16 ring buffer, one writer thread and any number of readers.
+    - storage is preallocated once (int16, frames x channels)
+    - write() copies each capture block in place with one slice assignment
+      (two when it wraps) and then publishes the new total frame count; no lock
+      on the capture path
+    - reads return the last N frames with at most two slice copies, and retry
+      if the writer lapped the range meanwhile (as SharedPcmRing)
+    Only the newest capacity - guard_frames are readable, so the block being
+    written never overlaps a read; give at least one capture block of guard when
+    reading from another thread.
+    """
+
+    def __init__(self, capacity_frames: int, channels: int, guard_frames: int = 0) -> None:
+        if capacity_frames <= 0 or channels <= 0:
+            raise ValueError("capacity_frames and channels must be positive")
+        if not 0 <= guard_frames < capacity_frames:
+            raise ValueError("guard_frames must be in [0, capacity_frames)")
+        self.capacity_frames = int(capacity_frames)
+        self.channels = int(channels)
+        self.guard_frames = int(guard_frames)
+        self._frame_bytes = self.channels * 2
+        # bytearray: slice assignment takes bytes or miniaudio's array.array as is
+        self._store = bytearray(self.capacity_frames * self._frame_bytes)
+        self._buf = np.frombuffer(self._store, dtype=np.int16).reshape(self.capacity_frames, self.channels)
+        self._raw = memoryview(self._store)
+        self._pos = 0  # next byte offset to write (writer side)
+        self._written = 0  # total frames published
+
+    @property
+    def frames_available(self) -> int:
+        return min(self._written, self.capacity_frames - self.guard_frames)
+
+    def write(self, data: Any) -> None:
+        """Append raw interleaved PCM16 (any buffer-protocol object, e.g. miniaudio's array)."""
+        if isinstance(data, (np.ndarray, memoryview)):
+            data = memoryview(data).cast("B")
+        n = len(data) * getattr(data, "itemsize", 1)  # bytes, bytearray, array.array
+        frame_bytes = self._frame_bytes
+        frames = n // frame_bytes
+        if frames == 0:
+            return
+        start = self._pos
+        end = start + n
+        if end <= len(self._store) and n == frames * frame_bytes:
+            # Common case: a whole block that does not wrap
+            self._store[start:end] = data
+            self._pos = end % len(self._store)
+        else:
+            self._write_split(memoryview(data).cast("B"), frames)
+        self._written += frames  # publish
+
+    def _write_split(self, src: memoryview, frames: int) -> None:
+        """Wrapping, oversized or ragged blocks."""
+        frame_bytes = self._frame_bytes
+        cap = self.capacity_frames
+        if frames >= cap:
+            # Block alone fills the whole ring: keep only its tail
+            src = src[(frames - cap) * frame_bytes: frames * frame_bytes]
+            frames = cap
+        n = frames * frame_bytes
+        start = self._pos
+        first = min(n, len(self._store) - start)
+        self._raw[start:start + first] = src[:first]
+        if first < n:
+            self._raw[: n - first] = src[first:n]
+        self._pos = (start + n) % len(self._store)
+
+    def _read(self, frames: int, copy: Callable[[int, int], Any]) -> Any:
+        """copy(n, start_frame) the newest n frames; retried if overwritten meanwhile."""
+        cap = self.capacity_frames
+        readable = cap - self.guard_frames
+        for _ in range(8):
+            written = self._written
+            n = max(0, min(int(frames), written, readable))
+            result = copy(n, (written - n) % cap)
+            # Oldest frame read must still be out of the writer's reach
+            if self._written - (written - n) <= readable:
+                return result
+        raise RuntimeError("audio ring overwritten during every read attempt")
+
+    def read_last(self, frames: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return the most recent `frames` frames (clamped to what is buffered).
+        If `out` is given it must be a writable int16 array with at least
+        frames * channels elements; data is copied straight into it.
+        """
+        ch = self.channels
+        cap = self.capacity_frames
+
+        def copy(n: int, start: int) -> np.ndarray:
+            if out is None:
+                result = np.empty((n, ch), dtype=np.int16)
+            else:
+                result = out.reshape(-1)[: n * ch].reshape(n, ch)
+            first = min(n, cap - start)
+            result[:first] = self._buf[start:start + first]
+            if first < n:
+                result[first:] = self._buf[: n - first]
+            return result
+
+        return self._read(frames, copy)
+
+    def read_last_bytes(self, frames: int, prefix: Optional[Callable[[int], bytes]] = None) -> bytes:
+        """
+        Return the most recent `frames` frames as bytes, optionally preceded by
+        prefix(n_frames) (e.g. a WAV header). The ring is joined straight from
+        its memory, so the result is produced with a single copy.
+        """
+        fb = self._frame_bytes
+        total = len(self._store)
+
+        def copy(n: int, start_frame: int) -> bytes:
+            head = prefix(n) if prefix is not None else b""
+            start = start_frame * fb
+            end = start + n * fb
+            if end <= total:
+                return b"".join((head, self._raw[start:end]))
+            return b"".join((head, self._raw[start:], self._raw[: end - total]))
+
+        return self._read(frames, copy)
+
+    def clear(self) -> None:
+        """Forget the buffered audio (call from the writer thread, or while it is stopped)."""
+        self._pos = 0
+        self._written = 0
@@ -1,15 +1,19 @@
 import datetime
 import wave
 from pathlib import Path
-from typing import Optional, Deque, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 
 import os
 import threading
 import numpy as np
-import soundcard as sc
-import miniaudio as ma
 import time
-import collections
+
+from services.audio_capture import SyntheticSource, device_format, run_device
+from services.audio_history import HistoryClip, HistoryReader, open_history, tee
+from services.audio_ring import PcmRing
+from services.audio_processing import (AudioPayload, WAV_HEADER_SIZE, parse_wav, prepare_audio_payload,
+                                       reduce_audio, wav_header)
+from utils.tracing import NULL_TRACE, Trace
 
 # --- Numpy 2.x compatibility for soundcard (uses np.fromstring in binary mode) ---
 if hasattr(np, "fromstring"):
@@ -24,10 +28,23 @@ if hasattr(np, "fromstring"):
 # -------------------------------------------------------------------------------
 
 
+# Audio backends are imported on first use: both are slow to import and
+# soundcard needs a running audio server just to load.
+def _miniaudio():
+    import miniaudio
+    return miniaudio
+
+
+def _soundcard():
+    import soundcard
+    return soundcard
+
+
 class AudioService:
     """
     Loopback capture helper:
-    - background ring buffer (miniaudio WASAPI)
+    - background ring buffer (miniaudio WASAPI), recorded on a thread or in a
+      child process writing to shared memory (AUDIO_RECORDER_MODE)
     - on demand: return last N seconds as WAV bytes
     - sync save fallback (soundcard)
     """
@@ -44,7 +61,35 @@ class AudioService:
         self._default_force_samplerate = 48000
         # Ring buffer length (seconds) — keep last ~40s
         self._buffer_duration_sec = 40.0
-        self._recorder: Optional[_RingRecorder] = None
+        self._recorder: Optional[Union["_RingRecorder", "ProcessRecorder"]] = None
+        # "thread" (in-process) or "process" (child process + shared-memory ring)
+        self._recorder_mode = os.getenv("AUDIO_RECORDER_MODE", "thread").strip().lower() or "thread"
+        # "device" (loopback capture) or "synthetic" (generated tone, for tests and benchmarks)
+        self._source = os.getenv("AUDIO_SOURCE", "device").strip().lower() or "device"
+        # Long-horizon history: segmented files on disk, recorded next to the ring
+        self._history_settings: Optional[Dict[str, Any]] = None
+        self._history: Optional[HistoryReader] = None
+        if os.getenv("AUDIO_HISTORY", "").strip().lower() in ("1", "true", "yes", "on"):
+            history_dir = os.getenv("AUDIO_HISTORY_DIR", "").strip() or "audio_history"
+            self._history_settings = {
+                "directory": history_dir,
+                "segment_sec": float(self._read_int_env("AUDIO_HISTORY_SEGMENT_SEC", 10)),
+                "compress_level": self._read_int_env("AUDIO_HISTORY_ZLIB_LEVEL", 1),
+                "max_age_sec": float(self._read_int_env("AUDIO_HISTORY_MAX_AGE_SEC", 3600)),
+                "max_bytes": self._read_int_env("AUDIO_HISTORY_MAX_MB", 1024) * 2**20,
+            }
+            self._history = HistoryReader(history_dir)
+        # Keep a copy of every sent snippet on disk (debug only)
+        self._debug_save = os.getenv("AUDIO_DEBUG_SAVE", "").strip().lower() in ("1", "true", "yes", "on")
+        # Upload reduction (speech model does not need 48 kHz stereo)
+        self._upload_mono = os.getenv("AUDIO_UPLOAD_MONO", "1").strip().lower() not in ("0", "false", "no", "off")
+        self._upload_samplerate = self._read_int_env("AUDIO_UPLOAD_SAMPLERATE", 16000)
+        self._upload_format = os.getenv("AUDIO_UPLOAD_FORMAT", "wav").strip().lower() or "wav"
+        # Inline request limit is 20 MB after base64 (+33%): newest audio that fits as PCM16
+        self._upload_max_bytes = self._read_int_env("AUDIO_UPLOAD_MAX_MB", 14) * 2**20
+        # Voice-activity trimming: drop edge silence, shorten long pauses
+        self._vad = os.getenv("AUDIO_VAD", "1").strip().lower() not in ("0", "false", "no", "off")
+        self._vad_max_gap_ms = float(self._read_int_env("AUDIO_VAD_MAX_GAP_MS", 600))
 
     # -------- Public API --------
 
@@ -85,44 +130,175 @@ class AudioService:
         if self._recorder and self._recorder.is_alive():
             return
         backend = os.getenv("AUDIO_BACKEND", self._default_backend).strip().lower()
-        if backend != "miniaudio":
+        if backend != "miniaudio" and self._source != "synthetic":
             print("[AudioService] Background recording is miniaudio-only; set AUDIO_BACKEND=miniaudio")
             return
-        self._recorder = _RingRecorder(
-            buffer_seconds=self._buffer_duration_sec,
-            samplerate_hint=self._default_force_samplerate,
-        )
+        if self._recorder is not None:
+            self._recorder.stop()
+        if self._recorder_mode == "process":
+            from services.audio_shm import ProcessRecorder
+
+            self._recorder = ProcessRecorder(
+                buffer_seconds=self._buffer_duration_sec,
+                samplerate_hint=self._default_force_samplerate,
+                source=self._source,
+                history=self._history_settings,
+            )
+        else:
+            self._recorder = _RingRecorder(
+                buffer_seconds=self._buffer_duration_sec,
+                samplerate_hint=self._default_force_samplerate,
+                source=self._source,
+                history=self._history_settings,
+            )
         self._recorder.start()
 
+    def recorder_stats(self) -> Dict[str, float]:
+        """Dropout counters of the capture source (synthetic source only)."""
+        return self._recorder.stats() if self._recorder is not None else {}
+
+    def shutdown(self) -> None:
+        """Stop the background recorder (and its process, if any)."""
+        if self._recorder is not None:
+            self._recorder.stop()
+            self._recorder = None
+        if self._history is not None:
+            self._history.close()
+
     def get_last_audio_wav_bytes(self, seconds: float = 30.0) -> Optional[bytes]:
         """
-        Return last N seconds as WAV bytes. Uses background ring buffer.
+        Return last N seconds as WAV bytes, built in memory from the ring buffer
+        (in process mode: read straight out of shared memory, one copy).
+        Longer than the ring: read from the disk history, if enabled.
         """
+        if seconds > self._buffer_duration_sec and self._history is not None:
+            return self.get_audio_range_wav_bytes(seconds, 0.0)
         if not self._recorder or not self._recorder.is_alive():
             print("[AudioService] Recorder not running; starting now")
             self.ensure_recorder_running()
             return None
-        pcm_bytes, sr, channels = self._recorder.get_last_pcm(seconds)
-        if pcm_bytes is None:
+        if seconds > self._buffer_duration_sec:
+            print(f"[AudioService] Only the last {self._buffer_duration_sec:.0f}s are kept; set AUDIO_HISTORY=1 for more")
+        wav_bytes = self._recorder.get_last_wav_bytes(seconds)
+        if wav_bytes is None:
             print("[AudioService] No data in buffer")
             return None
-        try:
-            with wave.open(self._temp_wav_path(), "wb") as wf:
-                wf.setnchannels(channels)
-                wf.setsampwidth(2)
-                wf.setframerate(sr)
-                wf.writeframes(pcm_bytes)
-            with open(self._temp_wav_path(), "rb") as f:
-                return f.read()
-        except Exception as e:
-            print(f"[AudioService] Failed to build WAV bytes: {e}")
+        if self._debug_save:
+            self._persist_debug_audio(wav_bytes)
+        return wav_bytes
+
+    def get_audio_range_wav_bytes(self, from_sec: float, to_sec: float = 0.0) -> Optional[bytes]:
+        """
+        Return the audio from `from_sec` to `to_sec` seconds ago as WAV bytes.
+        Read from the disk history (segment files located by arithmetic, one
+        seek or decompression each); without history, only the ring's span.
+        """
+        if self._history is not None:
+            reader = self._history
+            sr, ch = reader.samplerate, reader.channels
+            wav_bytes = reader.read_ago(from_sec, to_sec, prefix=lambda n: wav_header(n, sr, ch))
+        else:
+            pcm, sr, ch = self._read_range_pcm(from_sec, to_sec)
+            wav_bytes = None if pcm is None else b"".join((wav_header(pcm.shape[0], sr, ch), memoryview(pcm)))
+        if wav_bytes is None:
+            print("[AudioService] No audio in the requested range")
             return None
+        if self._debug_save:
+            self._persist_debug_audio(wav_bytes)
+        return wav_bytes
 
-    def _temp_wav_path(self) -> str:
-        self._save_dir.mkdir(parents=True, exist_ok=True)
-        return str(self._save_dir / "temp_last.wav")
+    def snapshot_audio(self, seconds: float) -> Optional[Union[bytes, HistoryClip]]:
+        """
+        The last N seconds for prepare_upload(), cheap enough for the UI thread:
+        WAV bytes copied out of the ring or, beyond the ring with the disk
+        history on, the history's frame range (read by prepare_upload).
+        """
+        if seconds > self._buffer_duration_sec and self._history is not None:
+            clip = self._history.clip_ago(seconds)
+            if clip is None:
+                print("[AudioService] No audio in the requested range")
+            return clip
+        return self.get_last_audio_wav_bytes(seconds)
+
+    def prepare_upload(self, audio: Union[bytes, HistoryClip], trace: Trace = NULL_TRACE) -> AudioPayload:
+        """
+        Reduce a snapshot_audio() result for upload (mono, resampled, optionally
+        FLAC/Opus), keeping the newest audio that fits AUDIO_UPLOAD_MAX_MB.
+        History clips are read and reduced chunk by chunk. CPU-heavy: called on
+        the request worker, not the UI thread.
+        """
+        if isinstance(audio, HistoryClip):
+            sr, ch = audio.samplerate, audio.channels
+            frames = audio.stop - audio.start
+        else:
+            pcm, sr, ch = parse_wav(audio)
+            frames = pcm.shape[0]
+        keep = self._max_upload_frames(sr, ch) or frames
+        if frames > keep:
+            print(f"[AudioService] Upload limit: sending the last {keep / sr:.0f}s of {frames / sr:.0f}s")
+        t0 = time.perf_counter()
+        options = dict(
+            mono=self._upload_mono,
+            target_samplerate=self._upload_samplerate or None,
+            fmt=self._upload_format,
+            vad=self._vad,
+            vad_max_gap_ms=self._vad_max_gap_ms,
+            max_bytes=self._upload_max_bytes,
+        )
+        with trace.span("audio_encode"):
+            if isinstance(audio, HistoryClip):
+                clip = audio._replace(start=max(audio.start, audio.stop - keep))
+                payload = reduce_audio(self._history.iter_pcm(clip), sr, **options)
+            else:
+                payload = prepare_audio_payload(pcm[max(0, frames - keep):], sr, **options)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        print(
+            f"[AudioService] Audio payload: {min(frames, keep) / sr:.1f}s -> {payload.duration_sec:.1f}s, "
+            f"{payload.bytes_before} -> {payload.bytes_after} bytes "
+            f"({payload.mime_type}, {payload.samplerate} Hz, ch={payload.channels}, {elapsed_ms:.1f} ms)"
+        )
+        trace.set(audio_sec=round(payload.duration_sec, 2), audio_bytes=payload.bytes_after)
+        if self._debug_save:
+            self._persist_debug_audio(payload.data, payload.mime_type.split("/")[-1])
+        return payload
+
+    def _max_upload_frames(self, samplerate: int, channels: int) -> int:
+        """Input frames whose reduced PCM16 fits the upload limit (the hard maximum duration); 0 = no limit."""
+        if not self._upload_max_bytes:
+            return 0
+        target = self._upload_samplerate
+        sr_out = target if target and target < samplerate else samplerate
+        ch_out = 1 if self._upload_mono else channels
+        frames_out = (self._upload_max_bytes - WAV_HEADER_SIZE) // (ch_out * 2)
+        return int(frames_out * samplerate / sr_out)
+
+    def _read_range_pcm(self, from_sec: float, to_sec: float) -> Tuple[Optional[np.ndarray], int, int]:
+        """(frames x channels int16, samplerate, channels): ring if it covers the range, else history."""
+        if from_sec > self._buffer_duration_sec and self._history is not None:
+            reader = self._history
+            return reader.read_pcm_ago(from_sec, to_sec), reader.samplerate, reader.channels
+        if self._recorder is None:
+            return None, self._default_force_samplerate, 2
+        if from_sec > self._buffer_duration_sec:
+            print(f"[AudioService] Only the last {self._buffer_duration_sec:.0f}s are kept; set AUDIO_HISTORY=1 for more")
+        pcm, sr, ch = self._recorder.get_last_pcm(from_sec)
+        skip = int(to_sec * sr)
+        if pcm is not None and skip > 0:
+            pcm = pcm[: max(0, pcm.shape[0] - skip)] if pcm.shape[0] > skip else None
+        return pcm, sr, ch
+
+    def _persist_debug_audio(self, data: bytes, ext: str = "wav") -> None:
+        try:
+            self._save_dir.mkdir(parents=True, exist_ok=True)
+            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            path = self._save_dir / f"last_audio_{ts}.{ext}"
+            path.write_bytes(data)
+            print(f"[AudioService] Debug audio saved: {path}")
+        except Exception as e:
+            print(f"[AudioService] Failed to save debug audio: {e}")
 
     def _record_with_miniaudio(self, duration_sec: float) -> Optional[str]:
+        ma = _miniaudio()
         devices = ma.Devices(backends=[ma.Backend.WASAPI])
         captures = devices.get_captures()
         if not captures:
@@ -201,6 +377,7 @@ class AudioService:
         return self._save_wav(audio_f, samplerate)
 
     def _select_loopback_microphone(self):
+        sc = _soundcard()
         devices = sc.all_microphones(include_loopback=True)
         if not devices:
             return None
@@ -244,6 +421,17 @@ class AudioService:
         except ValueError:
             return self._default_duration_sec
 
+    @staticmethod
+    def _read_int_env(name: str, default: int) -> int:
+        raw = os.getenv(name, "").strip()
+        if not raw:
+            return default
+        try:
+            return int(raw)
+        except ValueError:
+            print(f"[AudioService] WARNING: invalid {name}='{raw}'")
+            return default
+
     def _read_samplerate_override_soundcard(self, mic) -> int:
         raw = os.getenv("AUDIO_FORCE_SAMPLERATE", "").strip()
         if raw:
@@ -306,77 +494,82 @@ class AudioService:
 
 class _RingRecorder(threading.Thread):
     """
-    Background recorder on miniaudio (WASAPI capture); stores raw PCM16 bytes in a ring buffer.
+    Background recorder thread: captures from miniaudio (WASAPI) or a synthetic
+    source and stores raw PCM16 in a preallocated ring buffer (and, given
+    HistoryWriter settings, in the disk history too).
     """
 
-    def __init__(self, buffer_seconds: float, samplerate_hint: int) -> None:
+    def __init__(
+        self,
+        buffer_seconds: float,
+        samplerate_hint: int,
+        source: str = "device",
+        history: Optional[Dict[str, Any]] = None,
+    ) -> None:
         super().__init__(daemon=True)
         self.buffer_seconds = buffer_seconds
         self.samplerate_hint = samplerate_hint
-        self._lock = threading.Lock()
-        self._pcm: Deque[bytes] = collections.deque()
-        self._total_bytes = 0
-        self._max_bytes = None  # type: Optional[int]
+        self.source = source
+        self.history = history
+        self._ring: Optional[PcmRing] = None
         self._sr = samplerate_hint
         self._channels = 2
         self._stop_flag = threading.Event()
+        self._synthetic: Optional[SyntheticSource] = None
 
     def run(self) -> None:
         try:
-            devices = ma.Devices(backends=[ma.Backend.WASAPI])
-            captures = devices.get_captures()
-            if not captures:
-                print("[RingRecorder] capture devices not found")
-                return
-            chosen = captures[0]
-            # Use the first supported format
-            fmt = chosen.get("formats", [{}])[0]
-            sr = int(fmt.get("samplerate", self.samplerate_hint) or self.samplerate_hint)
-            ch = int(fmt.get("channels", 2) or 2)
+            if self.source == "synthetic":
+                src = SyntheticSource(self.samplerate_hint, 2)
+                self._synthetic = src
+                sr, ch = src.samplerate, src.channels
+            else:
+                sr, ch = device_format(self.samplerate_hint)
             self._sr = sr
             self._channels = ch
-            self._max_bytes = int(self.buffer_seconds * self._sr * self._channels * 2)
-
-            buffers: list[bytes] = []
-
-            def gen():
-                while True:
-                    data = yield
-                    with self._lock:
-                        self._pcm.append(bytes(data))
-                        self._total_bytes += len(data)
-                        while self._max_bytes is not None and self._total_bytes > self._max_bytes and self._pcm:
-                            dropped = self._pcm.popleft()
-                            self._total_bytes -= len(dropped)
-                    if self._stop_flag.is_set():
-                        return
-
-            g = gen()
-            next(g)
-
-            with ma.CaptureDevice(
-                input_format=ma.SampleFormat.SIGNED16,
-                nchannels=ch,
-                sample_rate=sr,
-                backends=[ma.Backend.WASAPI],
-            ) as cap:
-                cap.start(g)
-                while not self._stop_flag.is_set():
-                    time.sleep(0.1)
-                cap.stop()
+            # Readers keep 250 ms (far more than one capture block) clear of the writer
+            guard = sr // 4
+            ring = PcmRing(int(self.buffer_seconds * sr) + guard, ch, guard_frames=guard)
+            self._ring = ring
+            # Capture goes on without the history if it cannot be opened
+            writer = open_history(self.history, sr, ch)
+            write = tee(ring.write, writer)
+            try:
+                if self._synthetic is not None:
+                    self._synthetic.run(write, self._stop_flag.is_set)
+                else:
+                    run_device(write, sr, ch, self._stop_flag.is_set)
+            finally:
+                if writer is not None:
+                    writer.close()
         except Exception as e:
             print(f"[RingRecorder] Error: {e}")
 
+    def stats(self) -> Dict[str, float]:
+        return self._synthetic.stats() if self._synthetic is not None else {}
+
     def stop(self) -> None:
         self._stop_flag.set()
-
-    def get_last_pcm(self, seconds: float) -> Tuple[Optional[bytes], int, int]:
-        with self._lock:
-            if not self._pcm:
-                return None, self._sr, self._channels
-            needed = int(seconds * self._sr * self._channels * 2)
-            data = b"".join(self._pcm)
-            if len(data) > needed > 0:
-                data = data[-needed:]
-            return data, self._sr, self._channels
-
+        if self.is_alive():
+            self.join(timeout=2.0)
+
+    def get_last_pcm(self, seconds: float) -> Tuple[Optional[np.ndarray], int, int]:
+        """Return (frames x channels int16 array, samplerate, channels) for the last N seconds."""
+        ring = self._ring
+        if ring is None or ring.frames_available == 0:
+            return None, self._sr, self._channels
+        needed = int(seconds * self._sr)
+        if needed <= 0:
+            needed = ring.frames_available
+        return ring.read_last(needed), self._sr, self._channels
+
+    def get_last_wav_bytes(self, seconds: float) -> Optional[bytes]:
+        """Return the last N seconds as in-memory WAV bytes (header + PCM, one copy)."""
+        ring = self._ring
+        if ring is None or ring.frames_available == 0:
+            return None
+        needed = int(seconds * self._sr)
+        if needed <= 0:
+            needed = ring.frames_available
+        sr, ch = self._sr, self._channels
+        return ring.read_last_bytes(needed, prefix=lambda n: wav_header(n, sr, ch))
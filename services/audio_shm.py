@@ -0,0 +1,352 @@
+import atexit
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from services.audio_capture import SyntheticSource, device_format, run_device
+from services.audio_history import open_history, tee
+
+# Header: int64 slots in front of the PCM data
+_H_MAGIC, _H_STATE, _H_SR, _H_CH, _H_CAPACITY, _H_WRITTEN, _H_STOP = range(7)
+_H_DELIVERED, _H_DROPPED, _H_MAX_LATE_US = range(7, 10)
+HEADER_SLOTS = 16
+HEADER_BYTES = HEADER_SLOTS * 8
+MAGIC = 0x50434D52  # "PCMR"
+
+STATE_STARTING, STATE_READY, STATE_FAILED = 0, 1, -1
+
+
+class SharedPcmRing:
+    """
+    PCM16 ring in a multiprocessing.shared_memory block: one writer process,
+    readers in other processes, no locks and no pickling.
+    - the writer copies a block into the ring, then publishes the new total
+      frame count with one aligned 64-bit store
+    - readers snapshot the total, copy straight out of shared memory, re-read
+      the total and retry if the writer lapped the range meanwhile (seqlock-style)
+    Only the newest capacity - guard frames are readable, so a block being
+    written (not yet published) never overlaps a validated read.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._hdr = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self._data = shm.buf[HEADER_BYTES:]
+        self._written = 0  # writer side
+
+    @classmethod
+    def create(cls, data_bytes: int) -> "SharedPcmRing":
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + int(data_bytes))
+        ring = cls(shm, owner=True)
+        ring._hdr[:] = 0
+        ring._hdr[_H_MAGIC] = MAGIC
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedPcmRing":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+        ring = cls(shm, owner=False)
+        if ring._hdr[_H_MAGIC] != MAGIC:
+            raise RuntimeError(f"{name} is not a PCM ring")
+        return ring
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def state(self) -> int:
+        return int(self._hdr[_H_STATE])
+
+    @property
+    def samplerate(self) -> int:
+        return int(self._hdr[_H_SR])
+
+    @property
+    def channels(self) -> int:
+        return int(self._hdr[_H_CH]) or 1
+
+    @property
+    def capacity_frames(self) -> int:
+        return int(self._hdr[_H_CAPACITY])
+
+    @property
+    def guard_frames(self) -> int:
+        return self.samplerate // 4  # 250 ms: far more than one capture block
+
+    @property
+    def frames_available(self) -> int:
+        if self.state != STATE_READY:
+            return 0
+        return min(int(self._hdr[_H_WRITTEN]), self.capacity_frames - self.guard_frames)
+
+    @property
+    def stop_requested(self) -> bool:
+        return bool(self._hdr[_H_STOP])
+
+    def request_stop(self) -> None:
+        self._hdr[_H_STOP] = 1
+
+    # -------- Writer side --------
+
+    def configure(self, samplerate: int, channels: int) -> None:
+        """Publish the format the ring was sized for (capacity includes the guard)."""
+        self._hdr[_H_SR] = samplerate
+        self._hdr[_H_CH] = channels
+        self._hdr[_H_CAPACITY] = len(self._data) // (channels * 2)
+        self._hdr[_H_WRITTEN] = 0
+        self._hdr[_H_STATE] = STATE_READY
+
+    def fail(self) -> None:
+        self._hdr[_H_STATE] = STATE_FAILED
+
+    def write(self, data: Any) -> None:
+        """Append raw interleaved PCM16 (any buffer-protocol object)."""
+        src = memoryview(data).cast("B")
+        fb = self.channels * 2
+        cap = self.capacity_frames
+        frames = src.nbytes // fb
+        if frames == 0:
+            return
+        if frames >= cap:
+            src = src[(frames - cap) * fb: frames * fb]
+            frames = cap
+        n = frames * fb
+        start = self._written % cap * fb
+        first = min(n, cap * fb - start)
+        self._data[start:start + first] = src[:first]
+        if first < n:
+            self._data[: n - first] = src[first:n]
+        self._written += frames
+        self._hdr[_H_WRITTEN] = self._written  # publish
+
+    def publish_stats(self, stats: Dict[str, float]) -> None:
+        self._hdr[_H_DELIVERED] = int(stats.get("delivered_blocks", 0))
+        self._hdr[_H_DROPPED] = int(stats.get("dropped_blocks", 0))
+        self._hdr[_H_MAX_LATE_US] = int(stats.get("max_late_ms", 0.0) * 1000)
+
+    # -------- Reader side --------
+
+    def _read(self, frames: int, copy: Callable[[int, int, int], Any]) -> Any:
+        """copy(n, start_byte, end_byte) the newest n frames; retried if overwritten meanwhile."""
+        fb = self.channels * 2
+        cap = self.capacity_frames
+        for _ in range(8):
+            written = int(self._hdr[_H_WRITTEN])
+            n = max(0, min(int(frames), written, cap - self.guard_frames))
+            start = (written - n) % cap * fb
+            result = copy(n, start, start + n * fb)
+            # Oldest frame read must still be out of the writer's reach
+            if int(self._hdr[_H_WRITTEN]) - (written - n) <= cap - self.guard_frames:
+                return result
+        raise RuntimeError("audio ring overwritten during every read attempt")
+
+    def read_last(self, frames: int) -> np.ndarray:
+        """The newest `frames` frames (clamped) as a (frames x channels) int16 copy."""
+        ch = self.channels
+
+        def copy(n: int, start: int, end: int) -> np.ndarray:
+            out = np.empty((n, ch), dtype=np.int16)
+            raw = memoryview(out).cast("B")
+            total = self.capacity_frames * ch * 2
+            if end <= total:
+                raw[:] = self._data[start:end]
+            else:
+                raw[: total - start] = self._data[start:total]
+                raw[total - start:] = self._data[: end - total]
+            return out
+
+        return self._read(frames, copy)
+
+    def read_last_bytes(self, frames: int, prefix: Optional[Callable[[int], bytes]] = None) -> bytes:
+        """The newest `frames` frames as bytes after prefix(n) (e.g. a WAV header), in one copy."""
+        ch = self.channels
+
+        def copy(n: int, start: int, end: int) -> bytes:
+            head = prefix(n) if prefix is not None else b""
+            total = self.capacity_frames * ch * 2
+            if end <= total:
+                return b"".join((head, self._data[start:end]))
+            return b"".join((head, self._data[start:total], self._data[: end - total]))
+
+        return self._read(frames, copy)
+
+    def source_stats(self) -> Dict[str, float]:
+        delivered, dropped = int(self._hdr[_H_DELIVERED]), int(self._hdr[_H_DROPPED])
+        total = delivered + dropped
+        return {
+            "delivered_blocks": delivered,
+            "dropped_blocks": dropped,
+            "dropout_pct": round(dropped / total * 100, 3) if total else 0.0,
+            "max_late_ms": int(self._hdr[_H_MAX_LATE_US]) / 1000,
+        }
+
+    def close(self) -> None:
+        del self._hdr
+        self._data.release()
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def recorder_main(
+    shm_name: str,
+    source: str,
+    samplerate: int,
+    channels: int,
+    history: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Child process: capture into the shared ring (and history) in the format
+    the parent sized it for, until asked to stop or orphaned.
+    """
+    ring = SharedPcmRing.attach(shm_name)
+    writer = None
+    parent = mp.parent_process()
+    checked = [time.monotonic()]
+
+    def stop() -> bool:
+        if ring.stop_requested:
+            return True
+        now = time.monotonic()
+        if parent is not None and now - checked[0] > 0.5:
+            checked[0] = now
+            return not parent.is_alive()
+        return False
+
+    try:
+        # Capture goes on without the history if it cannot be opened
+        writer = open_history(history, samplerate, channels)
+        ring.configure(samplerate, channels)
+        if source == "synthetic":
+            src = SyntheticSource(samplerate, channels)
+            write_both = tee(ring.write, writer)
+
+            def write(data: Any) -> None:
+                write_both(data)
+                ring.publish_stats(src.stats())
+
+            src.run(write, stop)
+        else:
+            run_device(tee(ring.write, writer), samplerate, channels, stop)
+    except Exception as e:
+        ring.fail()
+        print(f"[AudioRecorderProcess] Error: {e}", flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+        ring.close()
+
+
+class ProcessRecorder:
+    """
+    Ring recorder running in a child process (own GIL: UI, PIL and NumPy work
+    in this process cannot delay the capture callback, nor the reverse).
+    Same read API as the in-process recorder thread.
+    """
+
+    def __init__(
+        self,
+        buffer_seconds: float,
+        samplerate_hint: int,
+        source: str = "device",
+        history: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.buffer_seconds = buffer_seconds
+        self.samplerate_hint = samplerate_hint
+        self.source = source
+        self.history = history  # HistoryWriter settings, run in the child
+        self._ring: Optional[SharedPcmRing] = None
+        self._proc: Optional[Any] = None
+        self._format = (samplerate_hint, 2)
+
+    def start(self) -> None:
+        if self._proc is not None or self._ring is not None:
+            self.stop()  # restart
+        # The device format is read here so the ring holds buffer_seconds whatever
+        # the rate and channel count, plus the guard readers keep clear of the writer
+        try:
+            if self.source == "synthetic":
+                sr, ch = self.samplerate_hint, 2
+            else:
+                sr, ch = device_format(self.samplerate_hint)
+        except Exception as e:
+            print(f"[ProcessRecorder] Error: {e}")
+            return
+        self._format = (sr, ch)
+        frames = int(self.buffer_seconds * sr) + sr // 4
+        self._ring = SharedPcmRing.create(frames * ch * 2)
+        ctx = mp.get_context("spawn")
+        self._proc = ctx.Process(
+            target=recorder_main,
+            args=(self._ring.name, self.source, sr, ch, self.history),
+            name="audio-recorder",
+            daemon=True,
+        )
+        self._proc.start()
+        atexit.register(self.stop)  # unregistered in stop()
+        print(f"[ProcessRecorder] Recorder process {self._proc.pid} ({self.source}, {sr} Hz, ch={ch})")
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._ring is None or self._ring.state == STATE_FAILED or not self.is_alive():
+                return False
+            if self._ring.state == STATE_READY:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self) -> None:
+        atexit.unregister(self.stop)
+        if self._proc is not None:
+            if self._ring is not None:
+                self._ring.request_stop()
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._proc = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def stats(self) -> Dict[str, float]:
+        return self._ring.source_stats() if self._ring is not None else {}
+
+    def get_last_pcm(self, seconds: float) -> Tuple[Optional[np.ndarray], int, int]:
+        """Return (frames x channels int16 array, samplerate, channels) for the last N seconds."""
+        ring = self._ring
+        if ring is None or ring.frames_available == 0:
+            return None, self._format[0], self._format[1]
+        sr, ch = ring.samplerate, ring.channels
+        needed = int(seconds * sr)
+        if needed <= 0:
+            needed = ring.frames_available
+        return ring.read_last(needed), sr, ch
+
+    def get_last_wav_bytes(self, seconds: float) -> Optional[bytes]:
+        """Return the last N seconds as in-memory WAV bytes (header + PCM, one copy)."""
+        from services.audio_processing import wav_header
+
+        ring = self._ring
+        if ring is None or ring.frames_available == 0:
+            return None
+        sr, ch = ring.samplerate, ring.channels
+        needed = int(seconds * sr)
+        if needed <= 0:
+            needed = ring.frames_available
+        return ring.read_last_bytes(needed, prefix=lambda n: wav_header(n, sr, ch))
@@ -0,0 +1,260 @@
+import io
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from PIL import Image
+from services.image_encoder import TOKENS_PER_TILE, estimate_image_tokens
+from services.screenshot_buffer import StoredFrame
+
+CHARS_PER_TOKEN = 4
+AUDIO_TOKENS_PER_SEC = 32  # Gemini audio accounting
+COMPRESSED_AUDIO_BYTES_PER_SEC = 4000  # rough, for non-WAV clips
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference: keep facts, "
+    "code, decisions and open questions, drop pleasantries. Be brief.\n\n"
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+Turn = Dict[str, Any]  # {"role": "user" | "model", "parts": [...]}
+
+
+def _part_info(part: Any) -> Tuple[str, Optional[str], Any]:
+    """(text, mime_type, data) for a str, blob dict, PIL image or SDK Part."""
+    if isinstance(part, str):
+        return part, None, None
+    if isinstance(part, (Image.Image, StoredFrame)):
+        return "", "image/png", part
+    if isinstance(part, dict):
+        if "mime_type" in part:
+            return "", part["mime_type"], part.get("data")
+        return str(part.get("text", "")), None, None
+    inline = getattr(part, "inline_data", None)
+    if inline is not None and inline.mime_type:
+        return "", inline.mime_type, inline.data
+    return getattr(part, "text", "") or "", None, None
+
+
+def _turn_fields(turn: Any) -> Tuple[str, List[Any]]:
+    if isinstance(turn, dict):
+        return turn.get("role", "user"), list(turn.get("parts", []))
+    return turn.role, list(turn.parts)
+
+
+def media_tokens(mime_type: str, data: Any) -> int:
+    """Upload token estimate for an inline image/audio part."""
+    if mime_type.startswith("image/"):
+        try:
+            size = data.size if isinstance(data, (Image.Image, StoredFrame)) else Image.open(io.BytesIO(data)).size
+            return estimate_image_tokens(*size)
+        except Exception:
+            return TOKENS_PER_TILE
+    if mime_type.startswith("audio/"):
+        if not isinstance(data, (bytes, bytearray)):
+            return AUDIO_TOKENS_PER_SEC
+        if data[:4] == b"RIFF" and len(data) >= 44:
+            byte_rate = struct.unpack_from("<I", data, 28)[0] or 1
+            seconds = (len(data) - 44) / byte_rate
+        else:
+            seconds = len(data) / COMPRESSED_AUDIO_BYTES_PER_SEC
+        return max(1, int(seconds * AUDIO_TOKENS_PER_SEC))
+    return TOKENS_PER_TILE
+
+
+def turn_tokens(turn: Any) -> int:
+    _, parts = _turn_fields(turn)
+    total = 0
+    for part in parts:
+        text, mime, data = _part_info(part)
+        total += media_tokens(mime, data) if mime else max(1, len(text) // CHARS_PER_TOKEN)
+    return total
+
+
+def placeholder(mime_type: str) -> str:
+    if mime_type.startswith("image/"):
+        return "[screenshot sent earlier; no longer attached]"
+    if mime_type.startswith("audio/"):
+        return "[audio clip sent earlier; no longer attached]"
+    return f"[{mime_type} attachment sent earlier; no longer attached]"
+
+
+def strip_media(parts: List[Any]) -> Tuple[List[str], int]:
+    """(parts with attachments replaced by placeholders, placeholders inserted); runs of screenshots collapse into one."""
+    new_parts: List[str] = []
+    inserted = 0
+    for part in parts:
+        text, mime, _ = _part_info(part)
+        if not mime:
+            new_parts.append(text)
+        elif not new_parts or new_parts[-1] != placeholder(mime):
+            new_parts.append(placeholder(mime))
+            inserted += 1
+    return new_parts, inserted
+
+
+def transcript(turns: List[Any]) -> str:
+    """Plain-text rendering of turns (media shown as placeholders)."""
+    lines = []
+    for turn in turns:
+        role, parts = _turn_fields(turn)
+        texts = []
+        for part in parts:
+            text, mime, _ = _part_info(part)
+            texts.append(placeholder(mime) if mime else text)
+        lines.append(f"{role}: " + "\n".join(t for t in texts if t))
+    return "\n\n".join(lines)
+
+
+class ChatContext:
+    """
+    Keeps a chat session's history bounded, run after each turn (on the request thread):
+    - attachments older than the last keep_media_turns user turns become text placeholders
+    - over token_budget, the oldest turns (all but the last keep_turns exchanges)
+      are dropped at once; with summarize(text) they are summarized on a
+      background thread and the summary is put at the head of the history by
+      the first apply_summary()/maintain() after it is ready (no request waits for it)
+    - per-turn token estimates for the remaining history
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 12000,
+        keep_media_turns: int = 1,
+        keep_turns: int = 4,
+        summarize: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        self.token_budget = token_budget
+        self.keep_media_turns = keep_media_turns
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        self.turn_tokens: List[int] = []
+        self.placeholders = 0
+        self.folded_turns = 0
+        self.summaries = 0
+        self._lock = threading.Lock()
+        # One summary at a time, each one extending the previous
+        self._summarizer: Optional[ThreadPoolExecutor] = None
+        if summarize is not None:
+            self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+        self._summary = ""  # covers every turn folded so far
+        self._summary_pending = False  # ready but not yet in the history
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.turn_tokens)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "turns": len(self.turn_tokens),
+            "tokens": self.total_tokens,
+            "placeholders": self.placeholders,
+            "folded_turns": self.folded_turns,
+            "summaries": self.summaries,
+        }
+
+    def maintain(self, chat_session: Any) -> None:
+        """Apply the policy to chat_session.history in place (history get/set)."""
+        with self._lock:
+            try:
+                history = list(chat_session.history)
+                changed = self._insert_summary(history)
+                changed = self._strip_old_media(history) or changed
+                tokens = [turn_tokens(t) for t in history]
+                if self.token_budget and sum(tokens) > self.token_budget:
+                    folded, tokens = self._fold(history, tokens)
+                    changed = changed or folded is not history
+                    history = folded
+                self.turn_tokens = tokens
+                if changed:
+                    chat_session.history = history
+                    print(f"[ChatContext] History now {len(history)} turns, ~{sum(tokens)} tokens {self.stats()}")
+            except Exception as e:
+                print(f"[ChatContext] Could not maintain history: {e}")
+
+    def apply_summary(self, chat_session: Any) -> None:
+        """Put a finished background summary into the history (before the next send)."""
+        with self._lock:
+            if not self._summary_pending:
+                return
+            try:
+                history = list(chat_session.history)
+                self._insert_summary(history)
+                self.turn_tokens = [turn_tokens(t) for t in history]
+                chat_session.history = history
+            except Exception as e:
+                print(f"[ChatContext] Could not apply summary: {e}")
+
+    def close(self) -> None:
+        if self._summarizer is not None:
+            self._summarizer.shutdown(wait=False, cancel_futures=True)
+
+    def _insert_summary(self, history: List[Any]) -> bool:
+        if not self._summary_pending:
+            return False
+        head = [
+            {"role": "user", "parts": [SUMMARY_PREFIX + self._summary]},
+            {"role": "model", "parts": ["OK."]},
+        ]
+        history[: _summary_head_len(history)] = head
+        self._summary_pending = False
+        return True
+
+    def _summarize(self, text: str) -> None:
+        """Summarizer thread: fold text into the running summary."""
+        previous = self._summary
+        if previous:
+            text = transcript([{"role": "user", "parts": [SUMMARY_PREFIX + previous]}]) + "\n\n" + text
+        try:
+            summary = self.summarize(SUMMARY_PROMPT + text)
+        except Exception as e:
+            print(f"[ChatContext] Summary failed ({e}); old turns stay dropped")
+            return
+        with self._lock:
+            self._summary = summary
+            self._summary_pending = True
+            self.summaries += 1
+
+    def _strip_old_media(self, history: List[Any]) -> bool:
+        if self.keep_media_turns < 0:
+            return False
+        user_turns = [i for i, t in enumerate(history) if _turn_fields(t)[0] == "user"]
+        old = user_turns[:max(0, len(user_turns) - self.keep_media_turns)]
+        changed = False
+        for i in old:
+            role, parts = _turn_fields(history[i])
+            mimes = [mime for _, mime, _ in map(_part_info, parts) if mime]
+            if not mimes:
+                continue
+            new_parts, inserted = strip_media(parts)
+            self.placeholders += inserted
+            # Never an empty text part: the API rejects it on the next send
+            history[i] = {"role": role, "parts": [p for p in new_parts if p] or [placeholder(mimes[0])]}
+            changed = True
+        return changed
+
+    def _fold(self, history: List[Any], tokens: List[int]) -> Tuple[List[Any], List[int]]:
+        # An existing summary head stays in front until a newer summary replaces it
+        head = _summary_head_len(history)
+        keep_from = max(head, len(history) - 2 * self.keep_turns)
+        # Fold whole exchanges until the rest fits in half the budget (room to grow)
+        cut = head
+        while cut < keep_from and sum(tokens[cut:]) > self.token_budget // 2:
+            cut += 2
+        cut = min(cut, keep_from)
+        if cut == head:
+            return history, tokens
+        folded = history[head:cut]
+        self.folded_turns += cut - head
+        if self._summarizer is not None:
+            self._summarizer.submit(self._summarize, transcript(folded))
+        return history[:head] + history[cut:], tokens[:head] + tokens[cut:]
+
+
+def _summary_head_len(history: List[Any]) -> int:
+    """2 if history starts with a summary exchange, else 0."""
+    if len(history) < 2:
+        return 0
+    role, parts = _turn_fields(history[0])
+    first = _part_info(parts[0])[0] if parts else ""
+    return 2 if role == "user" and first.startswith(SUMMARY_PREFIX) else 0
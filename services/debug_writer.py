@@ -0,0 +1,94 @@
+import queue
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+from PIL import Image
+
+
+class DebugImageWriter(threading.Thread):
+    """
+    Background PNG dumper for debug screenshots:
+    - bounded queue; submit() never blocks (image is skipped when full)
+    - configurable zlib level
+    - retention cap by file count and/or total size (oldest deleted first)
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        compress_level: int = 1,
+        max_files: int = 50,
+        max_bytes: int = 0,
+        queue_size: int = 4,
+        pattern: str = "snap_*.png",
+    ) -> None:
+        super().__init__(daemon=True, name="debug-writer")
+        self.output_dir = Path(output_dir)
+        self.compress_level = max(0, min(9, int(compress_level)))
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue[Optional[Tuple[Image.Image, str]]]" = queue.Queue(maxsize=queue_size)
+        self._pattern = pattern
+        self._files: List[Tuple[Path, int]] = []  # oldest first
+        self._total_bytes = 0
+        self.dropped = 0
+
+    def submit(self, img: Image.Image, filename: str) -> bool:
+        """Queue an image for writing. The image must not be modified afterwards."""
+        try:
+            self._queue.put_nowait((img, filename))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"[DebugWriter] Queue full, skipped {filename}")
+            return False
+
+    def stop(self) -> None:
+        """Finish pending writes, then exit."""
+        self._queue.put(None)
+
+    def run(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._scan_existing()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            img, filename = item
+            path = self.output_dir / filename
+            try:
+                img.save(path, format="PNG", compress_level=self.compress_level)
+                size = path.stat().st_size
+            except Exception as e:
+                print(f"[DebugWriter] Failed to write {path}: {e}")
+                continue
+            # Same name written again (overwrite): replace the old entry
+            for i, (old_path, old_size) in enumerate(self._files):
+                if old_path == path:
+                    del self._files[i]
+                    self._total_bytes -= old_size
+                    break
+            self._files.append((path, size))
+            self._total_bytes += size
+            self._enforce_retention()
+            print(f"Screenshot saved: {path}")
+
+    def _scan_existing(self) -> None:
+        files = sorted(self.output_dir.glob(self._pattern), key=lambda p: p.stat().st_mtime)
+        self._files = [(p, p.stat().st_size) for p in files]
+        self._total_bytes = sum(size for _, size in self._files)
+        self._enforce_retention()
+
+    def _enforce_retention(self) -> None:
+        while self._files and (
+            (self.max_files and len(self._files) > self.max_files)
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            path, size = self._files.pop(0)
+            self._total_bytes -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"[DebugWriter] Failed to delete {path}: {e}")
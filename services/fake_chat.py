@@ -0,0 +1,79 @@
+import random
+import time
+from typing import Any, Iterator, List, Optional
+
+
+class FakeResponse:
+    """
+    Mimics a google.generativeai response: .text for the full answer and,
+    when streamed, iteration over chunks (each with .text) as they "arrive".
+    """
+
+    def __init__(self, chunks: List[str], first_chunk_delay: float, chunk_delay: float, stream: bool) -> None:
+        self._chunks = chunks
+        self._first_chunk_delay = first_chunk_delay
+        self._chunk_delay = chunk_delay
+        self._consumed = not stream
+        if not stream:
+            time.sleep(first_chunk_delay + chunk_delay * max(0, len(chunks) - 1))
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def __iter__(self) -> Iterator["FakeResponse"]:
+        for i, chunk in enumerate(self._chunks):
+            time.sleep(self._first_chunk_delay if i == 0 else self._chunk_delay)
+            yield _FakeChunk(chunk)
+        self._consumed = True
+
+    def resolve(self) -> None:
+        if not self._consumed:
+            for _ in self:
+                pass
+
+
+class _FakeChunk:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class FakeChatSession:
+    """
+    Local stand-in for a chat session, for exercising the request/stream/render
+    path without the network. Replies echo the request size, split into chunks;
+    a failure_rate share of requests raise after the first-chunk delay.
+    """
+
+    def __init__(
+        self,
+        first_chunk_delay: float = 0.3,
+        chunk_delay: float = 0.02,
+        chunk_count: int = 20,
+        reply: Optional[str] = None,
+        reply_chars: int = 0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_count = chunk_count
+        self.reply = reply
+        self.reply_chars = reply_chars
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self.history: List[Any] = []
+
+    def send_message(self, content: Any, stream: bool = False) -> FakeResponse:
+        parts = content if isinstance(content, list) else [content]
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            time.sleep(self.first_chunk_delay)
+            raise RuntimeError("Fake model: simulated failure")
+        text = self.reply or f"Fake answer for {len(parts)} part(s). " * self.chunk_count
+        if self.reply_chars:
+            text = (text * (self.reply_chars // len(text) + 1))[:self.reply_chars]
+        step = max(1, len(text) // self.chunk_count)
+        chunks = [text[i:i + step] for i in range(0, len(text), step)]
+        self.history.append({"role": "user", "parts": parts})
+        self.history.append({"role": "model", "parts": [text]})
+        return FakeResponse(chunks, self.first_chunk_delay, self.chunk_delay, stream)
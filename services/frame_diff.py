@@ -0,0 +1,131 @@
+from collections import deque
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom (pixels, right/bottom exclusive)
+
+
+def _gray(img: Image.Image, tile: int) -> np.ndarray:
+    """Grayscale uint8 array, edge-padded to a multiple of the tile size."""
+    a = np.asarray(img.convert("L"))
+    pad_h = -a.shape[0] % tile
+    pad_w = -a.shape[1] % tile
+    if pad_h or pad_w:
+        a = np.pad(a, ((0, pad_h), (0, pad_w)), mode="edge")
+    return a
+
+
+def changed_tiles(prev: np.ndarray, curr: np.ndarray, tile: int = 32, threshold: int = 12) -> np.ndarray:
+    """
+    Boolean (rows x cols) grid of tiles whose max pixel difference exceeds threshold.
+    Inputs are same-shape grayscale uint8 arrays padded to the tile size (see _gray).
+    """
+    rows, cols = prev.shape[0] // tile, prev.shape[1] // tile
+    diff = np.maximum(prev, curr)
+    diff -= np.minimum(prev, curr)  # |a - b| without leaving uint8
+    return diff.reshape(rows, tile, cols, tile).max(axis=(1, 3)) > threshold
+
+
+def tile_boxes(grid: np.ndarray, tile: int, size: Tuple[int, int], merge_gap: int = 1) -> List[Box]:
+    """
+    Bounding boxes (pixels) of connected changed-tile groups; tiles up to
+    merge_gap apart are joined so nearby edits become one crop.
+    """
+    rows, cols = grid.shape
+    seen = np.zeros_like(grid)
+    boxes: List[Box] = []
+    for r0, c0 in zip(*np.nonzero(grid)):
+        if seen[r0, c0]:
+            continue
+        seen[r0, c0] = True
+        queue = deque([(r0, c0)])
+        top, left, bottom, right = r0, c0, r0, c0
+        while queue:
+            r, c = queue.popleft()
+            top, bottom = min(top, r), max(bottom, r)
+            left, right = min(left, c), max(right, c)
+            r_lo, r_hi = max(0, r - merge_gap), min(rows, r + merge_gap + 1)
+            c_lo, c_hi = max(0, c - merge_gap), min(cols, c + merge_gap + 1)
+            window = grid[r_lo:r_hi, c_lo:c_hi] & ~seen[r_lo:r_hi, c_lo:c_hi]
+            for dr, dc in zip(*np.nonzero(window)):
+                seen[r_lo + dr, c_lo + dc] = True
+                queue.append((r_lo + dr, c_lo + dc))
+        width, height = size
+        boxes.append((
+            int(left) * tile,
+            int(top) * tile,
+            min(width, (int(right) + 1) * tile),
+            min(height, (int(bottom) + 1) * tile),
+        ))
+    return boxes
+
+
+def build_diff_content(
+    images: Iterable[Image.Image],
+    tile: int = 32,
+    threshold: int = 12,
+    max_changed_ratio: float = 0.5,
+    max_regions: int = 8,
+    cost: Optional[Callable[[Tuple[int, int]], int]] = None,
+    full_frames: Optional[Sequence[Any]] = None,
+) -> List[Any]:
+    """
+    Message parts for a screenshot sequence: the first frame in full, later
+    frames as crops of the regions that changed since the previous frame
+    (with their coordinates). A frame falls back to full when its size differs,
+    when more than max_changed_ratio of it changed, or when cost(size) (e.g.
+    upload tokens) of the crops is not below that of the full frame.
+    images may be a lazy iterable (frames are not all held at once).
+    full_frames[k], if given, is sent instead of frame k's image when it goes in full.
+    """
+    def full(k: int, img: Image.Image) -> Any:
+        return full_frames[k] if full_frames is not None else img
+
+    frames = iter(images)
+    first = next(frames)
+    parts: List[Any] = [full(0, first)]
+    prev_size, prev_gray = first.size, _gray(first, tile)
+    del first
+    for k, curr in enumerate(frames, start=1):
+        curr_gray = _gray(curr, tile)
+        label = f"Screenshot {k + 1}"
+        same_size, prev_size = prev_size == curr.size, curr.size
+        if not same_size:
+            parts += [f"{label} (full):", full(k, curr)]
+            prev_gray = curr_gray
+            continue
+
+        grid = changed_tiles(prev_gray, curr_gray, tile, threshold)
+        prev_gray = curr_gray
+        ratio = float(grid.mean()) if grid.size else 1.0
+        if ratio == 0.0:
+            parts.append(f"{label}: no visible change from screenshot {k}.")
+            continue
+        if ratio > max_changed_ratio:
+            parts += [f"{label} (full):", full(k, curr)]
+            continue
+
+        boxes = tile_boxes(grid, tile, curr.size)
+        if len(boxes) > max_regions:
+            # Too fragmented: one crop covering all changes
+            boxes = [(
+                min(b[0] for b in boxes),
+                min(b[1] for b in boxes),
+                max(b[2] for b in boxes),
+                max(b[3] for b in boxes),
+            )]
+        if cost is not None and sum(cost((b[2] - b[0], b[3] - b[1])) for b in boxes) >= cost(curr.size):
+            parts += [f"{label} (full):", full(k, curr)]
+            continue
+        parts.append(
+            f"{label}: same {curr.width}x{curr.height} screen as screenshot {k}; "
+            f"only the changed regions are shown, with their position on screen."
+        )
+        for left, top, right, bottom in boxes:
+            parts += [
+                f"Region x={left}, y={top}, {right - left}x{bottom - top} px:",
+                curr.crop((left, top, right, bottom)),
+            ]
+    return parts
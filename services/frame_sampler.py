@@ -0,0 +1,141 @@
+import collections
+import math
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+from services.screenshot import ScreenshotService, bgra_to_image, capture_target
+from services.screenshot_buffer import StoredFrame
+from utils.image_utils import dhash, hamming
+
+
+class FrameSampler:
+    """
+    Background screen sampler: grabs `mode` (a capture mode, as for the hotkeys:
+    hints such as the cursor or foreground window are read at each sample) at a
+    low rate on the service's capture thread, downscales by an integer factor to at most
+    max_edge (Image.reduce: a few ms even for 4K), and keeps the last
+    ring_size distinct frames compressed in memory. A sample within `threshold`
+    dHash bits of the newest kept frame is skipped (threshold < 0 keeps every
+    sample). last(k) returns frames without touching the screen.
+    """
+
+    def __init__(
+        self,
+        service: ScreenshotService,
+        fps: float = 1.0,
+        max_edge: int = 1280,
+        ring_size: int = 30,
+        threshold: int = 6,
+        compress_level: int = 1,
+        report_every_sec: float = 0.0,
+        mode: str = "primary",
+        exclude_hwnd: int = 0,
+    ) -> None:
+        self.service = service
+        self.mode = mode
+        self.exclude_hwnd = exclude_hwnd  # never sampled as the foreground window
+        self.interval = 1.0 / max(0.01, fps)
+        self.max_edge = max_edge
+        self.threshold = threshold
+        self.compress_level = compress_level
+        self.report_every_sec = report_every_sec
+        self._ring: Deque[Tuple[StoredFrame, int]] = collections.deque(maxlen=max(1, ring_size))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Counters (written by the sampler thread only)
+        self.samples = 0
+        self.kept = 0
+        self.skipped = 0
+        self.errors = 0
+        self.grab_sec = 0.0  # wall time waiting for grabs on the capture thread
+        self.cpu_sec = 0.0  # CPU time of the sampler thread (convert, hash, compress)
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="frame-sampler", daemon=True)
+        self._thread.start()
+        print(
+            f"[FrameSampler] Sampling {self.mode} every {self.interval:.2f}s, "
+            f"max edge {self.max_edge}, ring {self._ring.maxlen}"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def last(self, k: int) -> Tuple[StoredFrame, ...]:
+        """The newest k kept frames, oldest first."""
+        with self._lock:
+            frames = [f for f, _ in self._ring]
+        return tuple(frames[-k:]) if k > 0 else ()
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(f.nbytes for f, _ in self._ring)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(1e-9, time.perf_counter() - self._started_at) if self._started_at else 0.0
+        return {
+            "samples": self.samples,
+            "kept": self.kept,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "ring_frames": len(self._ring),
+            "ring_mb": round(self.nbytes / 2**20, 2),
+            "grab_ms": round(self.grab_sec / self.samples * 1000, 2) if self.samples else 0.0,
+            "cpu_ms": round(self.cpu_sec / self.samples * 1000, 2) if self.samples else 0.0,
+            "cpu_pct": round((self.cpu_sec + self.grab_sec) / elapsed * 100, 2) if elapsed else 0.0,
+        }
+
+    def _run(self) -> None:
+        next_at = time.perf_counter()
+        next_report = next_at + self.report_every_sec
+        while not self._stop.is_set():
+            try:
+                self._sample()
+            except Exception as e:
+                self.errors += 1
+                print(f"[FrameSampler] Sample failed: {e}")
+            now = time.perf_counter()
+            if self.report_every_sec and now >= next_report:
+                next_report = now + self.report_every_sec
+                print(f"[FrameSampler] {self.stats()}")
+            # Fixed rate; after a stall, skip missed ticks instead of bursting
+            next_at = max(next_at + self.interval, now)
+            self._stop.wait(next_at - now)
+
+    def _sample(self) -> None:
+        target = capture_target(self.mode, self.exclude_hwnd)
+        t0 = time.perf_counter()
+        sct_img = self.service.grab_async(target).result(timeout=5.0)
+        self.grab_sec += time.perf_counter() - t0
+        self.samples += 1
+
+        cpu0 = time.thread_time()
+        img = bgra_to_image(sct_img)  # decoded into its own buffer, not a view of the grab
+        factor = math.ceil(max(img.size) / self.max_edge) if self.max_edge else 1
+        if factor > 1:
+            img = img.reduce(factor)
+        h = dhash(img) if self.threshold >= 0 else 0
+        with self._lock:
+            newest = self._ring[-1][1] if self._ring else None
+        if newest is not None and self.threshold >= 0 and hamming(h, newest) <= self.threshold:
+            self.skipped += 1
+        else:
+            frame = StoredFrame(img)
+            frame.compact(self.compress_level)
+            with self._lock:
+                self._ring.append((frame, h))
+            self.kept += 1
+        self.cpu_sec += time.thread_time() - cpu0
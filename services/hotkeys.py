@@ -1,12 +1,15 @@
-import keyboard
+import time
 from PyQt6.QtCore import QObject, pyqtSignal
 
 class HotkeyListener(QObject):
-    add_to_stack_signal = pyqtSignal()
-    analyze_stack_signal = pyqtSignal()
+    # Capture hotkeys carry the perf_counter() time of the key press (hotkey -> grab latency)
+    add_to_stack_signal = pyqtSignal(float)
+    analyze_stack_signal = pyqtSignal(float)
+    add_window_signal = pyqtSignal(float)  # Ctrl+Alt+W: foreground window only
     clear_buffer_signal = pyqtSignal()
     toggle_click_through_signal = pyqtSignal() # Ctrl+Alt+Z
     save_audio_signal = pyqtSignal()  # Ctrl+Alt+A
+    save_audio_lookback_signal = pyqtSignal()  # Ctrl+Alt+Shift+A: longer span, from the disk history
 
     def __init__(self) -> None:
         super().__init__()
@@ -14,18 +17,22 @@ class HotkeyListener(QObject):
 
     def start(self) -> None:
         try:
-            keyboard.add_hotkey("ctrl+alt+s", lambda: self.add_to_stack_signal.emit())
-            keyboard.add_hotkey("ctrl+alt+space", lambda: self.analyze_stack_signal.emit())
+            import keyboard
+            keyboard.add_hotkey("ctrl+alt+s", lambda: self.add_to_stack_signal.emit(time.perf_counter()))
+            keyboard.add_hotkey("ctrl+alt+w", lambda: self.add_window_signal.emit(time.perf_counter()))
+            keyboard.add_hotkey("ctrl+alt+space", lambda: self.analyze_stack_signal.emit(time.perf_counter()))
             keyboard.add_hotkey("ctrl+alt+x", lambda: self.clear_buffer_signal.emit())
             keyboard.add_hotkey("ctrl+alt+z", lambda: self.toggle_click_through_signal.emit())
             keyboard.add_hotkey("ctrl+alt+a", lambda: self.save_audio_signal.emit())
+            keyboard.add_hotkey("ctrl+alt+shift+a", lambda: self.save_audio_lookback_signal.emit())
             
             self._is_active = True
-            print("Hotkeys: S=Add, Space=Analyze, X=Clear, Z=OverlayMode, A=SaveAudio")
+            print("Hotkeys: S=Add, W=AddWindow, Space=Analyze, X=Clear, Z=OverlayMode, A=SaveAudio, Shift+A=SaveAudioLookback")
         except Exception as e:
             print(f"Failed to bind hotkeys: {e}")
 
     def stop(self) -> None:
         if self._is_active:
+            import keyboard
             keyboard.unhook_all()
             self._is_active = False
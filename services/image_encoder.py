@@ -0,0 +1,143 @@
+import collections
+import io
+import math
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple, Tuple, Union
+from PIL import Image
+from services.screenshot_buffer import StoredFrame
+
+# Gemini image accounting: <=384px on both sides is one 258-token unit,
+# larger images are split into 768x768 tiles of 258 tokens each.
+TOKENS_PER_TILE = 258
+TILE_SIZE = 768
+SMALL_IMAGE_EDGE = 384
+
+IMAGE_MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+
+class EncodedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    size: Tuple[int, int]
+    original_size: Tuple[int, int]
+    encode_ms: float
+
+    def as_part(self) -> dict:
+        """Inline blob part accepted by send_message."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    if width <= SMALL_IMAGE_EDGE and height <= SMALL_IMAGE_EDGE:
+        return TOKENS_PER_TILE
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE) * TOKENS_PER_TILE
+
+
+def fit_size(width: int, height: int, max_edge: int = 0, token_budget: int = 0) -> Tuple[int, int]:
+    """
+    Largest size (aspect preserved, never upscaled) within max_edge and token_budget.
+    0 disables a limit.
+    """
+    scale = 1.0
+    if max_edge and max(width, height) > max_edge:
+        scale = max_edge / max(width, height)
+    if token_budget:
+        # Token count only changes at tile boundaries: try those scales, largest first
+        candidates = {scale}
+        for edge in (width, height):
+            for k in range(1, math.ceil(edge * scale / TILE_SIZE) + 1):
+                candidates.add(min(scale, k * TILE_SIZE / edge))
+        candidates.add(min(scale, SMALL_IMAGE_EDGE / max(width, height)))
+        for s in sorted(candidates, reverse=True):
+            if estimate_image_tokens(int(width * s), int(height * s)) <= token_budget:
+                scale = s
+                break
+        else:
+            scale = min(candidates)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class ImageEncoder:
+    """
+    Model-ready image encoding:
+    - downscale to max_edge / token budget
+    - JPEG or WebP at a tunable quality
+    - encoding runs in a thread pool (PIL releases the GIL while resizing/encoding)
+    - results cached per image / buffered frame object (LRU), so re-sending a buffered image is free
+    """
+
+    def __init__(
+        self,
+        max_edge: int = 1920,
+        token_budget: int = 0,
+        fmt: str = "jpeg",
+        quality: int = 85,
+        workers: int = 2,
+        cache_size: int = 32,
+    ) -> None:
+        self.max_edge = max_edge
+        self.token_budget = token_budget
+        self.fmt = fmt.strip().lower() if fmt.strip().lower() in IMAGE_MIME_TYPES else "jpeg"
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="img-encode")
+        self._cache_size = cache_size
+        # id(img) -> (weakref to img, future); PIL images are unhashable
+        self._cache: "collections.OrderedDict[int, Tuple[weakref.ref, Future]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def estimate_tokens(self, size: Tuple[int, int]) -> int:
+        """Upload token estimate for an image of this size after downscaling."""
+        return estimate_image_tokens(*fit_size(size[0], size[1], self.max_edge, self.token_budget))
+
+    def submit(self, img: Union[Image.Image, StoredFrame]) -> "Future[EncodedImage]":
+        """Queue encoding (or return the cached result) for an image that will not be modified."""
+        key = id(img)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0]() is img:
+                self._cache.move_to_end(key)
+                return entry[1]
+            future = self._executor.submit(self.encode, img)
+            self._cache[key] = (weakref.ref(img), future)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return future
+
+    def encode(self, img: Union[Image.Image, StoredFrame]) -> EncodedImage:
+        """Synchronous encode (runs on the calling thread, no caching)."""
+        t0 = time.perf_counter()
+        if isinstance(img, StoredFrame):
+            img = img.image()
+        original_size = img.size
+        target = fit_size(img.width, img.height, self.max_edge, self.token_budget)
+        if target != img.size:
+            img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        buf = io.BytesIO()
+        if self.fmt == "jpeg":
+            img.save(buf, format="JPEG", quality=self.quality)
+        elif self.fmt == "webp":
+            img.save(buf, format="WEBP", quality=self.quality)
+        else:
+            img.save(buf, format="PNG", compress_level=1)
+        data = buf.getvalue()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
+        print(
+            f"[ImageEncoder] {original_size[0]}x{original_size[1]} -> {target[0]}x{target[1]} "
+            f"{self.fmt} q={self.quality}: {len(data) / 1024:.0f} KB, "
+            f"~{estimate_image_tokens(*target)} tokens in {elapsed_ms:.1f} ms"
+        )
+        return EncodedImage(data, IMAGE_MIME_TYPES[self.fmt], target, original_size, elapsed_ms)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
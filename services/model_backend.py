@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+from config import (GEMINI_API_KEY, GEMINI_MODEL, MODEL_BACKEND, FAKE_MODEL_FIRST_TOKEN_MS,
+                    FAKE_MODEL_TOKENS_PER_SEC, FAKE_MODEL_REPLY_TOKENS, FAKE_MODEL_FAILURE_PCT)
+from services.fake_chat import FakeChatSession
+
+CHARS_PER_TOKEN = 4  # rough, for sizing fake replies
+TOKENS_PER_CHUNK = 8
+
+
+class ModelBackend(ABC):
+    """
+    What GeminiHandler needs from a model: a name (part of cache keys) and
+    chat sessions. A session has .history (list, assignable) and
+    send_message(content, stream=False) returning a response with .text
+    that, when streamed, iterates over chunks with .text.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def start_chat(self, history: Optional[List[Any]] = None) -> Any:
+        """A new chat session, optionally seeded with history."""
+
+
+class GeminiBackend(ModelBackend):
+    def __init__(self, api_key: str, model_name: str, system_instruction: str) -> None:
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.name = model_name
+        self._model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+    def start_chat(self, history: Optional[List[Any]] = None) -> Any:
+        return self._model.start_chat(history=history or [])
+
+
+class FakeBackend(ModelBackend):
+    """
+    In-process stand-in for load and latency testing: replies after
+    first_token_ms, then streams at tokens_per_sec; failure_pct of requests fail.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        first_token_ms: int = 400,
+        tokens_per_sec: int = 80,
+        reply_tokens: int = 200,
+        failure_pct: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.first_token_ms = first_token_ms
+        self.tokens_per_sec = max(1, tokens_per_sec)
+        self.reply_tokens = max(1, reply_tokens)
+        self.failure_pct = failure_pct
+        self.seed = seed
+
+    def start_chat(self, history: Optional[List[Any]] = None) -> FakeChatSession:
+        chunk_count = max(1, self.reply_tokens // TOKENS_PER_CHUNK)
+        session = FakeChatSession(
+            first_chunk_delay=self.first_token_ms / 1000,
+            chunk_delay=TOKENS_PER_CHUNK / self.tokens_per_sec,
+            chunk_count=chunk_count,
+            reply_chars=self.reply_tokens * CHARS_PER_TOKEN,
+            failure_rate=self.failure_pct / 100,
+            seed=self.seed,
+        )
+        session.history = list(history or [])
+        return session
+
+
+def create_backend(system_instruction: str, name: str = MODEL_BACKEND) -> Optional[ModelBackend]:
+    """Backend selected in config (MODEL_BACKEND); None if it cannot be used."""
+    if name == "fake":
+        print(
+            f"[ModelBackend] Fake model: first token {FAKE_MODEL_FIRST_TOKEN_MS} ms, "
+            f"{FAKE_MODEL_TOKENS_PER_SEC} tok/s, {FAKE_MODEL_FAILURE_PCT}% failures"
+        )
+        return FakeBackend(FAKE_MODEL_FIRST_TOKEN_MS, FAKE_MODEL_TOKENS_PER_SEC,
+                           FAKE_MODEL_REPLY_TOKENS, FAKE_MODEL_FAILURE_PCT)
+    if name != "gemini":
+        print(f"[ModelBackend] Unknown MODEL_BACKEND '{name}', using gemini")
+    if not GEMINI_API_KEY or "YOUR_API_KEY" in GEMINI_API_KEY:
+        print("API Key missing!")
+        return None
+    return GeminiBackend(GEMINI_API_KEY, GEMINI_MODEL, system_instruction)
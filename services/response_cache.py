@@ -0,0 +1,140 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+from PIL import Image
+
+_DIGEST_INFO_KEY = "_content_digest"
+
+
+def image_digest(img: Image.Image) -> str:
+    """
+    Pixel-content digest, memoized on the image (img.info) so re-sends hash once.
+    The memo is tied to the object: copies/crops inherit info but recompute.
+    """
+    memo = img.info.get(_DIGEST_INFO_KEY)
+    if memo is not None and memo[0] == id(img):
+        return memo[1]
+    h = hashlib.blake2b(f"{img.mode}:{img.size}".encode(), digest_size=20)
+    h.update(img.tobytes())
+    digest = h.hexdigest()
+    img.info[_DIGEST_INFO_KEY] = (id(img), digest)
+    return digest
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Stable content hash over strings, bytes, PIL images, buffered screenshots,
+    inline blob dicts ({"mime_type", "data"}) and nested lists/tuples of those.
+    """
+    h = hashlib.blake2b(digest_size=20)
+
+    def feed(tag: bytes, data: bytes) -> None:
+        h.update(tag + len(data).to_bytes(8, "little"))
+        h.update(data)
+
+    def walk(part: Any) -> None:
+        if part is None:
+            feed(b"n", b"")
+        elif isinstance(part, str):
+            feed(b"s", part.encode("utf-8"))
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            feed(b"b", bytes(part) if isinstance(part, memoryview) else part)
+        elif isinstance(part, Image.Image):
+            feed(b"i", image_digest(part).encode())
+        elif hasattr(part, "digest") and hasattr(part, "image"):
+            # Buffered screenshot (StoredFrame): same key as its image
+            feed(b"i", part.digest().encode())
+        elif isinstance(part, dict):
+            feed(b"d", str(part.get("mime_type", "")).encode())
+            walk(part.get("data"))
+        elif isinstance(part, (list, tuple)):
+            feed(b"l", str(len(part)).encode())
+            for p in part:
+                walk(p)
+        else:
+            feed(b"r", repr(part).encode())
+
+    for p in parts:
+        walk(p)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of model answers keyed by make_key():
+    - size cap (oldest evicted) and TTL
+    - optional JSON persistence (rewritten on each insert)
+    - hit / miss counters
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_sec: float = 86400.0, path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "collections.OrderedDict[str, Tuple[float, str]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_sec) and time.time() - created > self.ttl_sec
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            items = sorted(data.items(), key=lambda kv: kv[1][0])
+            for key, (created, text) in items[-self.max_entries:]:
+                if not self._expired(created):
+                    self._entries[key] = (created, text)
+            print(f"[ResponseCache] Loaded {len(self._entries)} entries from {self.path}")
+        except Exception as e:
+            print(f"[ResponseCache] Failed to load {self.path}: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(dict(self._entries), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[ResponseCache] Failed to save {self.path}: {e}")
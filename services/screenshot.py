@@ -1,33 +1,256 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
-import mss
-import mss.tools
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, Union
 from PIL import Image
-from config import DEBUG_SCREENSHOTS_DIR
+from config import (DEBUG_SCREENSHOTS_DIR, DEBUG_SCREENSHOTS, DEBUG_PNG_COMPRESS_LEVEL,
+                    DEBUG_SCREENSHOTS_MAX_FILES, DEBUG_SCREENSHOTS_MAX_MB, DEBUG_WRITER_QUEUE_SIZE,
+                    CAPTURE_REGION)
+from services.debug_writer import DebugImageWriter
+from utils.tracing import NULL_TRACE, Trace
+from utils.window_utils import (get_cursor_pos, get_display_layout, get_foreground_window_rect,
+                                wait_for_compositor)
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom (virtual-screen pixels)
+
+CAPTURE_MODES = ("primary", "cursor", "all", "region", "window")
+MIN_REGION_EDGE = 32  # smaller window/region crops fall back to the monitor under the cursor
+
+
+class CaptureTarget(NamedTuple):
+    """
+    What to grab. Hints are read on the UI thread when the hotkey fires:
+    - "primary": the primary monitor
+    - "cursor":  the monitor under the cursor
+    - "all":     every monitor, stitched (mss virtual screen)
+    - "region":  a fixed rectangle (CAPTURE_REGION)
+    - "window":  the foreground window's rectangle
+    """
+    mode: str = "primary"
+    cursor: Optional[Tuple[int, int]] = None
+    window: Optional[Box] = None
+    region: Optional[Box] = None
+
+
+def parse_region(text: str) -> Optional[Box]:
+    """"x,y,width,height" -> (left, top, right, bottom); None if empty or invalid."""
+    try:
+        x, y, w, h = (int(v) for v in text.split(","))
+    except ValueError:
+        if text.strip():
+            print(f"WARNING: invalid capture region '{text}', expected x,y,width,height")
+        return None
+    return (x, y, x + w, y + h) if w > 0 and h > 0 else None
+
+
+def capture_target(mode: str, exclude_hwnd: int = 0) -> CaptureTarget:
+    """Snapshot the hints mode needs (cursor, foreground window) at hotkey time."""
+    if mode not in CAPTURE_MODES:
+        print(f"WARNING: unknown capture mode '{mode}', using primary")
+        mode = "primary"
+    if mode == "primary" or mode == "all":
+        return CaptureTarget(mode)
+    return CaptureTarget(
+        mode,
+        cursor=get_cursor_pos(),
+        window=get_foreground_window_rect(exclude_hwnd) if mode == "window" else None,
+        region=parse_region(CAPTURE_REGION) if mode == "region" else None,
+    )
+
+
+def resolve_region(target: CaptureTarget, monitors: List[dict]) -> dict:
+    """mss monitor dict for a target (monitors[0] is the virtual screen, [1] the primary)."""
+    virtual = monitors[0]
+    primary = monitors[1] if len(monitors) > 1 else virtual
+    if target.mode == "all":
+        return virtual
+    if target.mode in ("region", "window"):
+        box = target.region if target.mode == "region" else target.window
+        if box is not None:
+            left = max(box[0], virtual["left"])
+            top = max(box[1], virtual["top"])
+            right = min(box[2], virtual["left"] + virtual["width"])
+            bottom = min(box[3], virtual["top"] + virtual["height"])
+            if right - left >= MIN_REGION_EDGE and bottom - top >= MIN_REGION_EDGE:
+                return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        target = target._replace(mode="cursor")  # no usable rectangle
+    if target.mode == "cursor" and target.cursor is not None:
+        x, y = target.cursor
+        for m in monitors[1:]:
+            if m["left"] <= x < m["left"] + m["width"] and m["top"] <= y < m["top"] + m["height"]:
+                return m
+    return primary
+
+
+def _default_backend() -> Any:
+    import mss
+    return mss.mss()
+
+
+class CaptureEngine:
+    """
+    Long-lived capture handle with cached monitor geometry.
+    Re-opened only when the display layout changes or a grab fails.
+    Not thread-safe: mss handles are bound to the thread that created them,
+    so an engine must only be used from a single (capture) thread.
+    """
+
+    def __init__(self, backend_factory: Optional[Callable[[], Any]] = None) -> None:
+        self._backend_factory = backend_factory or _default_backend
+        self._sct: Any = None
+        self._monitors: List[dict] = []
+        self._layout: Optional[Tuple[int, ...]] = None
+
+    @property
+    def monitors(self) -> List[dict]:
+        self._ensure_open()
+        return self._monitors
+
+    def grab(self, monitor: Union[int, dict] = 1) -> Any:
+        """Grab a monitor (mss indexing: 0 = all monitors, 1 = primary) or a region dict."""
+        self._ensure_open()
+        try:
+            return self._sct.grab(self._monitors[monitor] if isinstance(monitor, int) else monitor)
+        except Exception as e:
+            # Stale handle (display change, session switch, ...): reopen once
+            print(f"[CaptureEngine] Grab failed ({e}); reopening")
+            self.close()
+            self._ensure_open()
+            return self._sct.grab(self._monitors[monitor] if isinstance(monitor, int) else monitor)
+
+    def invalidate(self) -> None:
+        """Force monitor geometry (and handle) refresh on next grab."""
+        self._layout = None
+        self.close()
+
+    def close(self) -> None:
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception:
+                pass
+        self._sct = None
+        self._monitors = []
+
+    def _ensure_open(self) -> None:
+        layout = get_display_layout()
+        if self._sct is not None and layout == self._layout:
+            return
+        self.close()
+        self._sct = self._backend_factory()
+        self._monitors = list(self._sct.monitors)
+        self._layout = layout
+
 
 class ScreenshotService:
-    def __init__(self, output_dir: str = DEBUG_SCREENSHOTS_DIR) -> None:
+    """
+    Screen capture on a dedicated thread that owns a persistent CaptureEngine.
+    UI code submits requests via capture_async() and never blocks on the grab.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = DEBUG_SCREENSHOTS_DIR,
+        backend_factory: Optional[Callable[[], Any]] = None,
+        save_debug: bool = DEBUG_SCREENSHOTS,
+    ) -> None:
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        self._debug_writer: Optional[DebugImageWriter] = None
+        if save_debug:
+            self._debug_writer = DebugImageWriter(
+                str(self.output_dir),
+                compress_level=DEBUG_PNG_COMPRESS_LEVEL,
+                max_files=DEBUG_SCREENSHOTS_MAX_FILES,
+                max_bytes=DEBUG_SCREENSHOTS_MAX_MB * 1024 * 1024,
+                queue_size=DEBUG_WRITER_QUEUE_SIZE,
+            )
+            self._debug_writer.start()
+        self._engine = CaptureEngine(backend_factory)  # capture thread only
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
 
-    def take_screenshot(self, filename: str = "debug_snap.png") -> Tuple[str, Image.Image]:
+    def capture_async(
+        self,
+        filename: str = "debug_snap.png",
+        trace: Trace = NULL_TRACE,
+        after_hide: bool = False,
+        target: CaptureTarget = CaptureTarget(),
+    ) -> "Future[Tuple[str, Image.Image]]":
         """
-        Capture primary monitor.
-        Returns: (file_path, PIL Image)
+        Queue a capture of target (default: the primary monitor); resolves to
+        (file_path, PIL Image). file_path is "" when debug dumping is off.
+        after_hide: a window was just hidden, let the compositor present a frame
+        without it first. img.info["grab_started_at"] is the perf_counter() time
+        the grab began.
         """
-        file_path = self.output_dir / filename
-        
-        with mss.mss() as sct:
-            # Grab first monitor
-            monitor = sct.monitors[1]
-            sct_img = sct.grab(monitor)
-            
-            # Save to disk (debug)
-            mss.tools.to_png(sct_img.rgb, sct_img.size, output=str(file_path))
-            
-            # Convert to PIL Image for in-memory use
-            img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
-            
-        print(f"Screenshot saved: {file_path}")
-        return str(file_path), img
+        return self._executor.submit(self._capture, filename, trace, after_hide, target)
+
+    def prewarm(self) -> Future:
+        """Open the capture handle ahead of the first capture (in the background)."""
+        return self._executor.submit(lambda: self._engine.monitors)
+
+    def grab_async(self, monitor: Union[int, dict, CaptureTarget] = 1) -> Future:
+        """
+        Queue a raw grab (backend screenshot object) on the capture thread; a
+        CaptureTarget is resolved against the monitor layout there.
+        """
+        if isinstance(monitor, CaptureTarget):
+            return self._executor.submit(self._grab_target, monitor)
+        return self._executor.submit(self._engine.grab, monitor)
+
+    def _grab_target(self, target: CaptureTarget) -> Any:
+        return self._engine.grab(resolve_region(target, self._engine.monitors))
+
+    def take_screenshot(
+        self, filename: str = "debug_snap.png", target: CaptureTarget = CaptureTarget()
+    ) -> Tuple[str, Image.Image]:
+        """
+        Capture target, the primary monitor by default (blocking wrapper around capture_async).
+        Returns: (file_path or "", PIL Image)
+        """
+        return self.capture_async(filename, target=target).result()
+
+    def shutdown(self) -> None:
+        self._executor.submit(self._engine.close)
+        self._executor.shutdown(wait=False)
+        if self._debug_writer:
+            self._debug_writer.stop()
+
+    def _capture(
+        self,
+        filename: str,
+        trace: Trace = NULL_TRACE,
+        after_hide: bool = False,
+        target: CaptureTarget = CaptureTarget(),
+    ) -> Tuple[str, Image.Image]:
+        if after_hide:
+            with trace.span("compositor"):
+                wait_for_compositor()
+        region = resolve_region(target, self._engine.monitors)
+        trace.set(capture_mode=target.mode, capture_size=(region["width"], region["height"]))
+        grab_started_at = time.perf_counter()
+        with trace.span("grab"):
+            sct_img = self._engine.grab(region)
+
+        # Single BGRA -> RGB conversion straight from the grab buffer
+        with trace.span("convert"):
+            img = bgra_to_image(sct_img)
+        img.info["grab_started_at"] = grab_started_at
+
+        # Debug dump happens on the writer thread, off the capture path
+        file_path = ""
+        if self._debug_writer:
+            with trace.span("debug_submit"):
+                if self._debug_writer.submit(img, filename):
+                    file_path = str(self.output_dir / filename)
+        return file_path, img
+
 
+def bgra_to_image(sct_img: Any) -> Image.Image:
+    """
+    Wrap a backend BGRA screenshot as an RGB PIL image with one C-level conversion.
+    Reads `raw` directly (mss `.bgra`/`.rgb` would each copy/convert in Python).
+    """
+    raw = getattr(sct_img, "raw", None)
+    if raw is None:
+        raw = sct_img.bgra
+    return Image.frombuffer("RGB", sct_img.size, raw, "raw", "BGRX", 0, 1)
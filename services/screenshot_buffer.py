@@ -0,0 +1,175 @@
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from PIL import Image
+from services.response_cache import image_digest
+from utils.image_utils import dhash, hamming
+
+
+class StoredFrame:
+    """
+    One buffered capture. Starts out holding the decoded image; compact() swaps it
+    for zlib-compressed pixels (lossless; screen content shrinks ~10x). Treat it as
+    immutable: image() hands out a shared (decoded or freshly decompressed) image
+    that callers must not modify.
+    """
+
+    def __init__(self, img: Image.Image) -> None:
+        self.size = img.size
+        self.mode = img.mode
+        self._image: Optional[Image.Image] = img
+        self._data: Optional[bytes] = None
+        self._digest: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held: encoded size once compacted, raw pixel size before."""
+        data = self._data
+        if data is not None:
+            return len(data)
+        return self.size[0] * self.size[1] * len(self.mode)
+
+    @property
+    def compacted(self) -> bool:
+        return self._data is not None
+
+    def image(self) -> Image.Image:
+        with self._lock:
+            img, data = self._image, self._data
+        if img is not None:
+            return img
+        return Image.frombytes(self.mode, self.size, zlib.decompress(data))
+
+    def digest(self) -> str:
+        """Pixel-content digest, same value as response_cache.image_digest of the image."""
+        if self._digest is None:
+            self._digest = image_digest(self.image())
+        return self._digest
+
+    def compact(self, compress_level: int = 1) -> None:
+        with self._lock:
+            img = self._image
+        if img is None:
+            return
+        self.digest()  # hash while the pixels are at hand
+        data = zlib.compress(img.tobytes(), compress_level)
+        with self._lock:
+            self._data = data
+            self._image = None
+
+
+class ScreenshotBuffer:
+    """
+    Ordered screenshot buffer with perceptual-hash deduplication.
+    A capture within `threshold` Hamming bits of a buffered one is a near-duplicate:
+    - policy "replace": the older copy is removed and the new one appended
+    - policy "drop": the new capture is discarded
+    threshold < 0 disables deduplication.
+    Captures are compacted on a background thread (compact=True). Once the
+    compacted captures exceed max_bytes (0 = unlimited), the oldest are evicted,
+    never the newest; captures still waiting for compaction do not count.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 4,
+        policy: str = "replace",
+        hash_size: int = 16,
+        max_bytes: int = 0,
+        compact: bool = True,
+        compress_level: int = 1,
+        on_evict: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.policy = policy if policy in ("replace", "drop") else "replace"
+        self.hash_size = hash_size
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.on_evict = on_evict  # called after background evictions (compactor thread)
+        self._frames: List[StoredFrame] = []
+        self._hashes: List[int] = []
+        self.dedup_count = 0
+        self.evicted_count = 0
+        self._lock = threading.Lock()  # frame list is also trimmed from the compactor thread
+        self._compactor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="shot-compact") if compact else None
+        )
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __bool__(self) -> bool:
+        return bool(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by all buffered captures (compacted or not)."""
+        return sum(f.nbytes for f in self._frames)
+
+    def add(self, img: Image.Image) -> bool:
+        """Add a capture. Returns False if it was a near-duplicate."""
+        h = dhash(img, self.hash_size) if self.threshold >= 0 else 0
+        frame = StoredFrame(img)
+        # Scan and replace under one lock: the compactor thread may evict meanwhile
+        with self._lock:
+            dup = -1
+            if self.threshold >= 0:
+                dup = next((i for i, other in enumerate(self._hashes) if hamming(h, other) <= self.threshold), -1)
+            if dup >= 0:
+                self.dedup_count += 1
+                print(f"[ScreenshotBuffer] Near-duplicate of #{dup + 1} ({self.policy})")
+                if self.policy == "drop":
+                    return False
+                del self._frames[dup]
+                del self._hashes[dup]
+            self._frames.append(frame)
+            self._hashes.append(h)
+            if self._compactor is None and self.max_bytes:
+                self._trim()
+        if self._compactor is not None:
+            self._compactor.submit(self._compact, frame)
+        return dup < 0
+
+    def _compact(self, frame: StoredFrame) -> None:
+        """Compactor thread: compress one capture, then enforce the memory ceiling."""
+        with self._lock:
+            if frame not in self._frames:
+                return  # evicted, replaced or cleared meanwhile
+        frame.compact(self.compress_level)
+        if self.max_bytes:
+            with self._lock:
+                evicted = self._trim()
+            if evicted and self.on_evict is not None:
+                self.on_evict()
+
+    def _trim(self) -> int:
+        """Evict the oldest captures while over max_bytes (caller holds the lock); returns how many."""
+        evicted = 0
+        while len(self._frames) > 1:
+            held = sum(f.nbytes for f in self._frames if f.compacted or self._compactor is None)
+            if held <= self.max_bytes:
+                break
+            del self._frames[0]
+            del self._hashes[0]
+            self.evicted_count += 1
+            evicted += 1
+            print(f"[ScreenshotBuffer] Over {self.max_bytes / 2**20:.0f} MB; evicted the oldest capture")
+        return evicted
+
+    def frames(self) -> Tuple[StoredFrame, ...]:
+        """Immutable snapshot of the buffered captures, oldest first (no pixel copies)."""
+        with self._lock:
+            return tuple(self._frames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self._hashes.clear()
+        self.dedup_count = 0
+        self.evicted_count = 0
+
+    def shutdown(self) -> None:
+        if self._compactor is not None:
+            self._compactor.shutdown(wait=False)
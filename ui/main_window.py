@@ -1,49 +1,134 @@
 import sys
 import os
+import threading
 import time
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 from PIL import Image
 
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, 
+from PyQt6.QtWidgets import (QMainWindow, QLabel, QVBoxLayout, 
                              QWidget, QTextEdit, QHBoxLayout, QLineEdit)
-from PyQt6.QtCore import Qt, QEvent
+from PyQt6.QtCore import Qt, QEvent, QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor
 
-from services.screenshot import ScreenshotService
+from config import (SCREENSHOT_DEDUP_THRESHOLD, SCREENSHOT_DEDUP_POLICY, SCREENSHOT_BUFFER_MAX_MB,
+                    SCREENSHOT_BUFFER_COMPACT, SCREENSHOT_BUFFER_ZLIB_LEVEL, STREAM_RENDER_INTERVAL_MS,
+                    TRACING, TRACE_OVERLAY, CAPTURE_HIDE_MODE, CAPTURE_HIDE_TIMEOUT_MS, CAPTURE_HIDE_POLL_MS,
+                    FRAME_SAMPLER, FRAME_SAMPLER_FPS, FRAME_SAMPLER_MAX_EDGE, FRAME_SAMPLER_RING,
+                    FRAME_SAMPLER_ATTACH, FRAME_SAMPLER_THRESHOLD, FRAME_SAMPLER_REPORT_SEC,
+                    CAPTURE_MODE_ADD, CAPTURE_MODE_ANALYZE, AUDIO_SNIPPET_SEC, AUDIO_LOOKBACK_SEC)
+from services.frame_sampler import FrameSampler
+from services.screenshot import CaptureTarget, ScreenshotService, capture_target
+from services.screenshot_buffer import ScreenshotBuffer
 from services.hotkeys import HotkeyListener
 from services.ai_handler import GeminiHandler
-from services.audio_service import AudioService
-from utils.window_utils import apply_window_privacy, set_click_through
+from utils import tracing
+from utils.tracing import NULL_TRACE, Trace
+from utils.window_utils import apply_window_privacy, is_window_shown, set_click_through
+
+if TYPE_CHECKING:
+    from services.audio_service import AudioService
 
 class MainWindow(QMainWindow):
+    # (on_done callback, (capture Future, hotkey time, trace)) — emitted from the capture thread
+    capture_finished = pyqtSignal(object, object)
+    # AudioService or None — emitted from the audio startup thread
+    audio_ready = pyqtSignal(object)
+    # Screenshots evicted over the memory ceiling — emitted from the compactor thread
+    buffer_evicted = pyqtSignal()
+
     def __init__(self) -> None:
         super().__init__()
         
-        self.image_buffer: List[Image.Image] = []
+        self.image_buffer = ScreenshotBuffer(
+            SCREENSHOT_DEDUP_THRESHOLD,
+            SCREENSHOT_DEDUP_POLICY,
+            max_bytes=SCREENSHOT_BUFFER_MAX_MB * 2**20,
+            compact=SCREENSHOT_BUFFER_COMPACT,
+            compress_level=SCREENSHOT_BUFFER_ZLIB_LEVEL,
+            on_evict=self.buffer_evicted.emit,
+        )
         self.click_through_enabled = False  # State flag
+        self._pending_captures = 0
+        self._hidden_for_capture = False
+        self._capture_mode = CAPTURE_HIDE_MODE
+        self._excluded_from_capture = False  # set by _enable_privacy_mode
+        self.last_hotkey_to_grab_ms: Optional[float] = None
+        self._queued_requests = 0
+        # Streaming answer state: chunks are buffered and flushed by a timer
+        self._stream_active = False
+        self._stream_pending: List[str] = []
+        self._stream_ttft: Optional[float] = None
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setInterval(STREAM_RENDER_INTERVAL_MS)
+        self._stream_timer.timeout.connect(self._flush_stream)
         
         self.screenshot_service = ScreenshotService()
         self.hotkey_listener = HotkeyListener()
-        self.gemini_handler = GeminiHandler()
-        self.audio_service = AudioService()
-        self.audio_service.ensure_recorder_running()
+        self.gemini_handler = GeminiHandler()  # model loads in the background
+        self.audio_service: Optional["AudioService"] = None  # see _start_audio
+        self.frame_sampler: Optional[FrameSampler] = None  # FRAME_SAMPLER
         
         self._connect_signals()
         self._setup_window_properties()
         self._setup_ui()
         self._enable_privacy_mode()
         
+        # Everything else starts once the window is up
+        QTimer.singleShot(0, self._start_background_services)
+
+    def _start_background_services(self) -> None:
         self.hotkey_listener.start()
+        self.screenshot_service.prewarm()
+        threading.Thread(target=self._start_audio, name="audio-init", daemon=True).start()
+        if FRAME_SAMPLER:
+            if not self._excluded_from_capture:
+                print("[MainWindow] Window is not excluded from capture; sampled frames will include it")
+            self.frame_sampler = FrameSampler(
+                self.screenshot_service,
+                fps=FRAME_SAMPLER_FPS,
+                max_edge=FRAME_SAMPLER_MAX_EDGE,
+                ring_size=FRAME_SAMPLER_RING,
+                threshold=FRAME_SAMPLER_THRESHOLD,
+                report_every_sec=FRAME_SAMPLER_REPORT_SEC,
+                # Its frames stand in for the Ctrl+Alt+Space capture: sample the same target
+                mode=CAPTURE_MODE_ANALYZE,
+                exclude_hwnd=int(self.winId()),
+            )
+            self.frame_sampler.start()
+
+    def _start_audio(self) -> None:
+        """Audio startup thread: import the audio stack and start the ring recorder."""
+        try:
+            from services.audio_service import AudioService
+            service = AudioService()
+            service.ensure_recorder_running()
+        except Exception as e:
+            print(f"[MainWindow] Audio unavailable: {e}")
+            service = None
+        self.audio_ready.emit(service)
+
+    def _on_audio_ready(self, service: Optional["AudioService"]) -> None:
+        self.audio_service = service
 
     def _connect_signals(self) -> None:
         self.hotkey_listener.add_to_stack_signal.connect(self.handle_add_to_stack)
         self.hotkey_listener.analyze_stack_signal.connect(self.handle_analyze_stack)
+        self.hotkey_listener.add_window_signal.connect(self.handle_add_window)
         self.hotkey_listener.clear_buffer_signal.connect(self.handle_clear_buffer)
         self.hotkey_listener.toggle_click_through_signal.connect(self.handle_toggle_click_through)
         self.hotkey_listener.save_audio_signal.connect(self.handle_save_audio)
+        self.hotkey_listener.save_audio_lookback_signal.connect(self.handle_save_audio_lookback)
+        self.capture_finished.connect(self._on_capture_finished)
+        self.audio_ready.connect(self._on_audio_ready)
+        self.buffer_evicted.connect(self._update_buffer_badge)
         
         self.gemini_handler.response_received.connect(self.display_solution)
+        self.gemini_handler.response_chunk.connect(self.display_chunk)
+        self.gemini_handler.first_token.connect(self._on_first_token)
         self.gemini_handler.error_occurred.connect(self.display_error)
         self.gemini_handler.processing_started.connect(self.show_loading)
+        self.gemini_handler.queue_changed.connect(self._on_queue_changed)
+        self.gemini_handler.ready.connect(self._on_model_ready)
 
     def _setup_window_properties(self) -> None:
         self.setWindowTitle("Code Assistant")
@@ -60,7 +145,7 @@ class MainWindow(QMainWindow):
 
         # Header
         header_layout = QHBoxLayout()
-        self.status_label = QLabel("Ready")
+        self.status_label = QLabel("Starting...")
         self.status_label.setStyleSheet("color: #cccccc; font-size: 14px; font-weight: bold;")
         header_layout.addWidget(self.status_label)
         
@@ -71,6 +156,12 @@ class MainWindow(QMainWindow):
         header_layout.addWidget(self.buffer_badge)
         layout.addLayout(header_layout)
 
+        # Optional latency stats line (TRACING + TRACE_OVERLAY)
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("color: #888888; font-size: 11px;")
+        self.stats_label.setVisible(TRACING and TRACE_OVERLAY)
+        layout.addWidget(self.stats_label)
+
         # Content Area
         self.content_area = QTextEdit()
         self.content_area.setReadOnly(True)
@@ -123,7 +214,8 @@ class MainWindow(QMainWindow):
     def _enable_privacy_mode(self) -> None:
         try:
             hwnd = int(self.winId())
-            apply_window_privacy(hwnd)
+            self._excluded_from_capture = apply_window_privacy(hwnd)
+            print(f"Excluded from screen capture: {self._excluded_from_capture}")
         except Exception as e:
             print(f"Failed to get HWND: {e}")
 
@@ -166,49 +258,160 @@ class MainWindow(QMainWindow):
         self.content_area.append(f"\n\n**You:** {text}")
         self.chat_input.clear()
         
-        self.gemini_handler.send_request(text)
+        self.gemini_handler.send_request(text, trace=tracing.start_trace("chat"))
 
     # --- Capture Logic ---
-    def _perform_capture(self) -> Optional[Image.Image]:
-        self.hide()
-        QApplication.processEvents()
-        time.sleep(0.15)
+    def _perform_capture(
+        self,
+        on_done: Callable[[Optional[Image.Image]], None],
+        trace: Trace = NULL_TRACE,
+        pressed_at: float = 0.0,
+        target: CaptureTarget = CaptureTarget(),
+    ) -> None:
+        """
+        Get the window out of the way (see CAPTURE_HIDE_MODE) and hand the grab of
+        target to the capture thread; on_done(img) runs on the UI thread. Never blocks.
+        """
+        self._pending_captures += 1
+        pressed_at = pressed_at or time.perf_counter()
+        if self._capture_mode == "auto" and self._excluded_from_capture:
+            # Window is invisible to screen capture: grab right away, keep it on screen
+            self._submit_capture(on_done, trace, pressed_at, target, after_hide=False)
+            return
+        with trace.span("hide"):
+            self._hidden_for_capture = True
+            self.hide()
+        hidden_at = time.perf_counter()
+        if self._capture_mode == "delay":
+            QTimer.singleShot(
+                CAPTURE_HIDE_TIMEOUT_MS,
+                lambda: self._on_hidden(on_done, trace, pressed_at, target, hidden_at, timed_out=False),
+            )
+            return
+        self._poll_hidden(on_done, trace, pressed_at, target, hidden_at)
+
+    def _poll_hidden(
+        self,
+        on_done: Callable[[Optional[Image.Image]], None],
+        trace: Trace,
+        pressed_at: float,
+        target: CaptureTarget,
+        hidden_at: float,
+    ) -> None:
+        gone = not self.isVisible() and is_window_shown(int(self.winId())) is not True
+        timed_out = (time.perf_counter() - hidden_at) * 1000 >= CAPTURE_HIDE_TIMEOUT_MS
+        if gone or timed_out:
+            self._on_hidden(on_done, trace, pressed_at, target, hidden_at, timed_out and not gone)
+            return
+        QTimer.singleShot(
+            CAPTURE_HIDE_POLL_MS, lambda: self._poll_hidden(on_done, trace, pressed_at, target, hidden_at)
+        )
+
+    def _on_hidden(
+        self,
+        on_done: Callable[[Optional[Image.Image]], None],
+        trace: Trace,
+        pressed_at: float,
+        target: CaptureTarget,
+        hidden_at: float,
+        timed_out: bool,
+    ) -> None:
+        trace.add("hide_wait", hidden_at, time.perf_counter())
+        if timed_out:
+            print(f"[Capture] Window still shown after {CAPTURE_HIDE_TIMEOUT_MS} ms; capturing anyway")
+        self._submit_capture(on_done, trace, pressed_at, target, after_hide=True)
+
+    def _submit_capture(
+        self,
+        on_done: Callable[[Optional[Image.Image]], None],
+        trace: Trace,
+        pressed_at: float,
+        target: CaptureTarget,
+        after_hide: bool,
+    ) -> None:
+        timestamp = int(time.time() * 1000)
+        future = self.screenshot_service.capture_async(f"snap_{timestamp}.png", trace, after_hide, target)
+        future.add_done_callback(lambda f: self.capture_finished.emit(on_done, (f, pressed_at, trace)))
+
+    def _on_capture_finished(self, on_done: Callable[[Optional[Image.Image]], None], result: tuple) -> None:
+        future, pressed_at, trace = result
         img = None
         try:
-            timestamp = int(time.time())
-            _, img = self.screenshot_service.take_screenshot(f"snap_{timestamp}.png")
+            _, img = future.result()
+            grab_started_at = img.info.get("grab_started_at")
+            if grab_started_at:
+                trace.add("hotkey_to_grab", pressed_at, grab_started_at)
+                self.last_hotkey_to_grab_ms = (grab_started_at - pressed_at) * 1000
+                print(f"[Capture] Hotkey -> grab: {self.last_hotkey_to_grab_ms:.1f} ms")
         except Exception as e:
             print(f"Capture failed: {e}")
         finally:
-            self.show()
-            # If we were in overlay mode, ensure click-through is restored after show()
-            if self.click_through_enabled:
-                hwnd = int(self.winId())
-                set_click_through(hwnd, True)
-                
-            self.activateWindow()
-        return img
+            self._pending_captures -= 1
+            if self._pending_captures == 0 and self._hidden_for_capture:
+                self._hidden_for_capture = False
+                self.show()
+                # If we were in overlay mode, ensure click-through is restored after show()
+                if self.click_through_enabled:
+                    hwnd = int(self.winId())
+                    set_click_through(hwnd, True)
+
+                self.activateWindow()
+        on_done(img)
 
-    def handle_add_to_stack(self) -> None:
+    def handle_add_to_stack(self, pressed_at: float = 0.0, mode: str = CAPTURE_MODE_ADD) -> None:
         print("Adding to stack...")
-        img = self._perform_capture()
+        trace = tracing.start_trace("add")
+        # Cursor / foreground window are read now, before the window hides
+        target = capture_target(mode, int(self.winId()))
+        self._perform_capture(lambda img: self._on_stack_capture(img, trace), trace, pressed_at, target)
+
+    def handle_add_window(self, pressed_at: float = 0.0) -> None:
+        self.handle_add_to_stack(pressed_at, mode="window")
+
+    def _on_stack_capture(self, img: Optional[Image.Image], trace: Trace = NULL_TRACE) -> None:
         if img:
-            self.image_buffer.append(img)
+            with trace.span("dedup"):
+                added = self.image_buffer.add(img)
             self._update_buffer_badge()
-            self.status_label.setText("Image Added")
+            status = "Image Added" if added else "Duplicate Skipped"
+            if self.last_hotkey_to_grab_ms is not None:
+                status += f" ({self.last_hotkey_to_grab_ms:.0f} ms)"
+            self.status_label.setText(status)
+            trace.set(added=added)
+        trace.finish()
+        self._update_stats_line()
 
-    def handle_analyze_stack(self) -> None:
+    def handle_analyze_stack(self, pressed_at: float = 0.0) -> None:
         print("Analyze request...")
+        trace = tracing.start_trace("analyze")
+        if not self.image_buffer and self.frame_sampler is not None:
+            recent = self.frame_sampler.last(FRAME_SAMPLER_ATTACH)
+            if recent:
+                # Already captured in the background: no hide, no grab
+                trace.set(images=len(recent), sampled=True)
+                print(f"Attaching {len(recent)} sampled frames")
+                self.gemini_handler.send_request(recent, trace=trace)
+                return
         if not self.image_buffer:
-            img = self._perform_capture()
-            if img:
-                self.image_buffer.append(img)
-        
+            target = capture_target(CAPTURE_MODE_ANALYZE, int(self.winId()))
+            self._perform_capture(lambda img: self._on_analyze_capture(img, trace), trace, pressed_at, target)
+            return
+        self._send_image_buffer(trace)
+
+    def _on_analyze_capture(self, img: Optional[Image.Image], trace: Trace = NULL_TRACE) -> None:
+        if img:
+            with trace.span("dedup"):
+                self.image_buffer.add(img)
+        self._send_image_buffer(trace)
+
+    def _send_image_buffer(self, trace: Trace = NULL_TRACE) -> None:
         if not self.image_buffer:
+            trace.finish()
             return
 
-        images_to_send = list(self.image_buffer) 
-        self.gemini_handler.send_request(images_to_send)
+        frames = self.image_buffer.frames()
+        trace.set(images=len(frames))
+        self.gemini_handler.send_request(frames, trace=trace)
         
         self.image_buffer.clear()
         self._update_buffer_badge()
@@ -216,48 +419,132 @@ class MainWindow(QMainWindow):
     def handle_clear_buffer(self) -> None:
         self.image_buffer.clear()
         self.gemini_handler.reset_session()
+        if self._stream_active:
+            self._end_stream()
         self._update_buffer_badge()
         self.status_label.setText("Buffer & Context Cleared")
         self.content_area.setPlainText("Stack and history cleared.")
 
     def _update_buffer_badge(self) -> None:
         count = len(self.image_buffer)
-        self.buffer_badge.setText(f"Buffered: {count}")
+        deduped = self.image_buffer.dedup_count
+        text = f"Buffered: {count} (dedup {deduped})" if deduped else f"Buffered: {count}"
+        if self.image_buffer.evicted_count:
+            text += f" (evicted {self.image_buffer.evicted_count})"
+        if self._queued_requests:
+            text += f" | Queued: {self._queued_requests}"
+        self.buffer_badge.setText(text)
         style_color = "#007acc" if count > 0 else "#444444"
         self.buffer_badge.setStyleSheet(f"background-color: {style_color}; color: white; padding: 4px 8px; border-radius: 4px; font-weight: bold;")
 
+    def _on_model_ready(self, ok: bool) -> None:
+        if self.status_label.text() == "Starting...":
+            self.status_label.setText("Ready" if ok else "Model unavailable")
+
+    def _on_queue_changed(self, queued: int) -> None:
+        self._queued_requests = queued
+        self._update_buffer_badge()
+        # Emitted after each request completes, i.e. after its trace was recorded
+        self._update_stats_line()
+
     def show_loading(self) -> None:
+        self._stream_ttft = None
         self.status_label.setText("Thinking...")
         self.status_label.setStyleSheet("color: #3498db; font-size: 14px; font-weight: bold;")
 
     def display_solution(self, text: str) -> None:
-        self.status_label.setText("Solution Ready")
+        ready = "Solution Ready"
+        if self._stream_active:
+            # Text already rendered chunk by chunk; just drain the tail
+            self._end_stream()
+            if self._stream_ttft is not None:
+                ready += f" (first token {self._stream_ttft:.2f}s)"
+        else:
+            with self.gemini_handler.active_trace.span("render"):
+                self.content_area.append(f"\n\n**Gemini:**\n{text}")
+                sb = self.content_area.verticalScrollBar()
+                sb.setValue(sb.maximum())
+        self.status_label.setText(ready)
         self.status_label.setStyleSheet("color: #2ecc71; font-size: 14px; font-weight: bold;")
-        self.content_area.append(f"\n\n**Gemini:**\n{text}")
-        sb = self.content_area.verticalScrollBar()
-        sb.setValue(sb.maximum())
+
+    def display_chunk(self, text: str) -> None:
+        if not self._stream_active:
+            self._stream_active = True
+            self.content_area.append("\n\n**Gemini:**\n")
+            self._stream_timer.start()
+        self._stream_pending.append(text)
+
+    def _on_first_token(self, seconds: float) -> None:
+        self._stream_ttft = seconds
+        self.status_label.setText(f"Answering... (first token {seconds:.2f}s)")
+
+    def _flush_stream(self) -> None:
+        if not self._stream_pending:
+            return
+        with self.gemini_handler.active_trace.span("render"):
+            cursor = QTextCursor(self.content_area.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText("".join(self._stream_pending))
+            self._stream_pending.clear()
+            sb = self.content_area.verticalScrollBar()
+            sb.setValue(sb.maximum())
+
+    def _end_stream(self) -> None:
+        self._stream_timer.stop()
+        self._flush_stream()
+        self._stream_active = False
 
     def display_error(self, error: str) -> None:
+        if self._stream_active:
+            self._end_stream()
         self.status_label.setText("Error")
         self.status_label.setStyleSheet("color: #e74c3c; font-size: 14px; font-weight: bold;")
         self.content_area.append(f"\nError: {error}")
 
+    def _update_stats_line(self) -> None:
+        if TRACING and TRACE_OVERLAY:
+            self.stats_label.setText(tracing.recorder.summary())
+
     def keyPressEvent(self, event: QEvent) -> None:
         if event.key() == Qt.Key.Key_Escape:
             self.hotkey_listener.stop()
+            if self.frame_sampler is not None:
+                self.frame_sampler.stop()
+            self.screenshot_service.shutdown()
+            self.gemini_handler.shutdown()
+            self.image_buffer.shutdown()
+            if self.audio_service is not None:
+                self.audio_service.shutdown()
             self.close()
 
     # --- Audio ---
     def handle_save_audio(self) -> None:
+        self._send_audio(AUDIO_SNIPPET_SEC)
+
+    def handle_save_audio_lookback(self) -> None:
+        self._send_audio(AUDIO_LOOKBACK_SEC)
+
+    def _send_audio(self, seconds: float) -> None:
+        if self.audio_service is None:
+            self.display_error("Audio is not available yet")
+            return
+        service = self.audio_service
+        trace = tracing.start_trace("audio")
         try:
-            self.audio_service.ensure_recorder_running()
-            wav_bytes = self.audio_service.get_last_audio_wav_bytes(seconds=30)
-            if not wav_bytes:
+            service.ensure_recorder_running()
+            # Only a ring copy or a history frame range here; reading the history,
+            # downmix, VAD and resampling run on the request worker
+            with trace.span("audio_snapshot"):
+                audio = service.snapshot_audio(seconds)
+            if not audio:
+                trace.finish(error="no audio")
                 self.display_error("Audio not captured")
                 return
-            self.gemini_handler.send_audio(wav_bytes, prompt="")
+            self.gemini_handler.send_audio(
+                audio, prompt="", trace=trace, prepare=lambda a: service.prepare_upload(a, trace)
+            )
             self.status_label.setText("Audio Sent")
             self.status_label.setStyleSheet("color: #2ecc71; font-size: 14px; font-weight: bold;")
-            self.content_area.append("\nAudio: last ~30s sent to Gemini")
+            self.content_area.append(f"\nAudio: last ~{seconds:.0f}s sent to Gemini")
         except Exception as e:
             self.display_error(f"Audio send failed: {e}")
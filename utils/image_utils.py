@@ -0,0 +1,19 @@
+from PIL import Image
+
+
+def dhash(img: Image.Image, hash_size: int = 16) -> int:
+    """
+    Difference hash: downscale to (hash_size+1) x hash_size grayscale and
+    record whether each cell is brighter than its right neighbour.
+    Returns a hash_size*hash_size-bit integer.
+    """
+    import numpy as np  # deferred: not needed until the first screenshot
+
+    small = img.resize((hash_size + 1, hash_size), Image.Resampling.BOX, reducing_gap=4.0).convert("L")
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
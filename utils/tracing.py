@@ -0,0 +1,200 @@
+import collections
+import itertools
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from config import TRACING, TRACE_PATH
+
+# Per-request tracing: a Trace collects timed spans from any thread (UI, capture,
+# request pool) and, when finished, is appended to a JSONL file and folded into
+# rolling p50/p95 per stage. With TRACING off, start_trace() returns NULL_TRACE,
+# whose span() hands back one shared no-op context manager.
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: "Trace", name: str) -> None:
+        self._trace = trace
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._trace.add(self._name, self._start, time.perf_counter())
+
+
+class Trace:
+    """One user action (e.g. Ctrl+Alt+Space) from hotkey to rendered answer."""
+
+    enabled = True
+
+    def __init__(self, trace_id: int, kind: str, recorder: "TraceRecorder") -> None:
+        self.id = trace_id
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.attrs: Dict[str, Any] = {}
+        self._spans: List[Tuple[str, float, float, str]] = []
+        self._recorder = recorder
+        self._finished = False
+
+    def span(self, name: str) -> _Span:
+        """Context manager timing a stage (repeated names are summed in aggregates)."""
+        return _Span(self, name)
+
+    def add(self, name: str, start: float, end: float) -> None:
+        """Record a stage measured elsewhere (perf_counter timestamps)."""
+        self._spans.append((name, start, end, threading.current_thread().name))
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, **attrs: Any) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        self.attrs.update(attrs)
+        self._recorder.record(self, time.perf_counter())
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = collections.defaultdict(float)
+        for name, start, end, _ in self._spans:
+            totals[name] += end - start
+        return totals
+
+    def to_dict(self, end: float) -> Dict[str, Any]:
+        """JSON record; repeated spans (e.g. render flushes) are merged with a count."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for name, start, stop, thread in self._spans:
+            entry = merged.get(name)
+            if entry is None:
+                merged[name] = {
+                    "name": name,
+                    "start_ms": round((start - self.started) * 1000, 3),
+                    "dur_ms": round((stop - start) * 1000, 3),
+                    "thread": thread,
+                }
+            else:
+                entry["dur_ms"] = round(entry["dur_ms"] + (stop - start) * 1000, 3)
+                entry["count"] = entry.get("count", 1) + 1
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "time": self.wall_start,
+            "total_ms": round((end - self.started) * 1000, 3),
+            "spans": list(merged.values()),
+            "attrs": self.attrs,
+        }
+
+
+class _NullTrace:
+    """Stand-in when tracing is off: every call is a no-op."""
+
+    enabled = False
+    id = 0
+    kind = ""
+
+    def span(self, name: str) -> _NullSpan:
+        return _NULL_SPAN
+
+    def add(self, name: str, start: float, end: float) -> None:
+        pass
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def finish(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TraceRecorder:
+    """JSONL sink + rolling per-stage latency windows per trace kind (thread-safe)."""
+
+    def __init__(self, path: Optional[str] = None, window: int = 200) -> None:
+        self.path = Path(path) if path else None
+        self._window = window
+        self._stages: Dict[Tuple[str, str], Deque[float]] = {}  # (kind, stage) -> seconds
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self, kind: str) -> Trace:
+        return Trace(next(self._ids), kind, self)
+
+    def record(self, trace: Trace, end: float) -> None:
+        data = trace.to_dict(end)
+        with self._lock:
+            stages = dict(trace.stage_totals(), total=end - trace.started)
+            for name, seconds in stages.items():
+                key = (trace.kind, name)
+                self._stages.setdefault(key, collections.deque(maxlen=self._window)).append(seconds)
+            self._write(data)
+
+    def percentiles(self, kind: str = "analyze") -> Dict[str, Dict[str, float]]:
+        """{stage: {"p50", "p95", "count"}} in seconds over the rolling window, for one trace kind."""
+        with self._lock:
+            out = {}
+            for (k, name), values in self._stages.items():
+                if k != kind:
+                    continue
+                ordered = sorted(values)
+                out[name] = {
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "count": len(ordered),
+                }
+            return out
+
+    def summary(
+        self, kind: str = "analyze", stages: Tuple[str, ...] = ("grab", "encode_wait", "ttft", "render", "total")
+    ) -> str:
+        """One-line p50/p95 summary, e.g. for an on-screen stats line."""
+        stats = self.percentiles(kind)
+        items = []
+        for name in stages:
+            if name in stats:
+                s = stats[name]
+                items.append(f"{name} {s['p50'] * 1000:.0f}/{s['p95'] * 1000:.0f}")
+        return f"{kind} p50/p95 ms: " + "  ".join(items) if items else ""
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(data, ensure_ascii=False) + "\n")
+            self._file.flush()
+        except Exception as e:
+            print(f"[Tracing] Failed to write {self.path}: {e}")
+
+
+recorder = TraceRecorder(TRACE_PATH)
+
+
+def start_trace(kind: str) -> Any:
+    """New Trace for a user action, or NULL_TRACE when tracing is off."""
+    return recorder.start(kind) if TRACING else NULL_TRACE
@@ -1,26 +1,103 @@
 import sys
 import ctypes
 from ctypes import wintypes
+from typing import Optional, Tuple
 from config import WDA_EXCLUDEFROMCAPTURE
 
 # Click-Through constants
 GWL_EXSTYLE = -20
 WS_EX_LAYERED = 0x80000
 WS_EX_TRANSPARENT = 0x20  # Window becomes click-through
+DWMWA_EXTENDED_FRAME_BOUNDS = 9
+DWMWA_CLOAKED = 14
 
-def apply_window_privacy(hwnd: int) -> None:
+def apply_window_privacy(hwnd: int) -> bool:
     """
     Apply privacy mode (WDA_EXCLUDEFROMCAPTURE).
     Window is excluded from screen capture by other apps.
+    Returns True only if the exclusion is in effect (Windows 10 2004+).
     """
     if sys.platform != "win32":
-        return
+        return False
 
     try:
         user32 = ctypes.windll.user32
-        user32.SetWindowDisplayAffinity(wintypes.HWND(hwnd), WDA_EXCLUDEFROMCAPTURE)
+        if not user32.SetWindowDisplayAffinity(wintypes.HWND(hwnd), WDA_EXCLUDEFROMCAPTURE):
+            return False
+        affinity = wintypes.DWORD()
+        if not user32.GetWindowDisplayAffinity(wintypes.HWND(hwnd), ctypes.byref(affinity)):
+            return False
+        return affinity.value == WDA_EXCLUDEFROMCAPTURE
     except Exception as e:
         print(f"Error applying window privacy: {e}")
+        return False
+
+def is_window_shown(hwnd: int) -> Optional[bool]:
+    """
+    Whether the window is still visible to the desktop compositor
+    (visible and not DWM-cloaked). None if it cannot be determined.
+    """
+    if sys.platform != "win32":
+        return None
+
+    try:
+        if not ctypes.windll.user32.IsWindowVisible(wintypes.HWND(hwnd)):
+            return False
+        cloaked = wintypes.DWORD()
+        ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            wintypes.HWND(hwnd), DWMWA_CLOAKED, ctypes.byref(cloaked), ctypes.sizeof(cloaked)
+        )
+        return not cloaked.value
+    except Exception:
+        return None
+
+def wait_for_compositor() -> None:
+    """
+    Block until the compositor has presented its next frame (DwmFlush), so a
+    window hidden just before is gone from the screen. Call off the UI thread.
+    """
+    if sys.platform != "win32":
+        return
+
+    try:
+        ctypes.windll.dwmapi.DwmFlush()
+    except Exception:
+        pass
+
+def get_cursor_pos() -> Optional[Tuple[int, int]]:
+    """Cursor position in virtual-screen pixels. None if unavailable."""
+    if sys.platform != "win32":
+        return None
+
+    try:
+        point = wintypes.POINT()
+        if not ctypes.windll.user32.GetCursorPos(ctypes.byref(point)):
+            return None
+        return point.x, point.y
+    except Exception:
+        return None
+
+def get_foreground_window_rect(exclude_hwnd: int = 0) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (left, top, right, bottom) of the foreground window in virtual-screen pixels,
+    without the drop shadow. None if unavailable, minimized or exclude_hwnd.
+    """
+    if sys.platform != "win32":
+        return None
+
+    try:
+        user32 = ctypes.windll.user32
+        hwnd = user32.GetForegroundWindow()
+        if not hwnd or hwnd == exclude_hwnd or user32.IsIconic(hwnd):
+            return None
+        rect = wintypes.RECT()
+        if ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            wintypes.HWND(hwnd), DWMWA_EXTENDED_FRAME_BOUNDS, ctypes.byref(rect), ctypes.sizeof(rect)
+        ) != 0 and not user32.GetWindowRect(wintypes.HWND(hwnd), ctypes.byref(rect)):
+            return None
+        return rect.left, rect.top, rect.right, rect.bottom
+    except Exception:
+        return None
 
 def set_click_through(hwnd: int, enable: bool) -> None:
     """
@@ -46,3 +123,27 @@ def set_click_through(hwnd: int, enable: bool) -> None:
     except Exception as e:
         print(f"Error toggling click-through: {e}")
 
+
+# GetSystemMetrics indices for the virtual screen
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+SM_CMONITORS = 80
+
+def get_display_layout() -> Optional[Tuple[int, ...]]:
+    """
+    Cheap signature of the display layout (virtual screen rect + monitor count).
+    Changes when monitors are added/removed/rearranged. None if unavailable.
+    """
+    if sys.platform != "win32":
+        return None
+
+    try:
+        user32 = ctypes.windll.user32
+        return tuple(
+            user32.GetSystemMetrics(i)
+            for i in (SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN, SM_CMONITORS)
+        )
+    except Exception:
+        return None